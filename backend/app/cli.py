@@ -0,0 +1,30 @@
+"""
+Tareas de mantenimiento fuera del servidor.
+
+Uso (desde backend/):
+
+    python -m app.cli create-schema
+
+`create-schema` crea las tablas e índices que falten. Sirve para el deploy
+con CREATE_SCHEMA_ON_STARTUP=0, así cada worker arranca sin tocar la base.
+"""
+
+import argparse
+
+from app import models  # noqa: F401 (registra las tablas en Base.metadata)
+from app.db import create_schema, engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("create-schema", help="crear tablas e índices que falten")
+    args = parser.parse_args()
+
+    if args.command == "create-schema":
+        create_schema()
+        print(f"Esquema al día en {engine.url.render_as_string(hide_password=True)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,48 @@
 import os
 
 
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off", "")
+
+
 class Settings:
     def __init__(self) -> None:
         self.upload_dir = os.getenv("UPLOAD_DIR", "uploads")
+        self.cache_dir = os.getenv("CACHE_DIR", "cache")
+        self.output_dir = os.getenv("OUTPUT_DIR", "outputs")
+        # CSV a partir de este tamaño se procesan por bloques (memoria acotada)
+        self.stream_csv_threshold_bytes = int(
+            float(os.getenv("STREAM_CSV_THRESHOLD_MB", "64")) * 1024 * 1024
+        )
+        self.stream_chunk_rows = int(os.getenv("STREAM_CHUNK_ROWS", "100000"))
+        # Procesos del pool que ejecuta los jobs de limpieza
+        self.job_workers = int(os.getenv("JOB_WORKERS", str(os.cpu_count() or 2)))
+        # Procesos para parsear en paralelo las hojas de un XLSX (1 = secuencial)
+        self.xlsx_sheet_workers = int(
+            os.getenv("XLSX_SHEET_WORKERS", str(min(4, os.cpu_count() or 1)))
+        )
+        # Hilos para bcrypt (libera el GIL): el login no bloquea el event loop
+        self.auth_hash_workers = int(
+            os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+        )
+        # Caché token -> usuario de get_current_user (0 la desactiva)
+        self.auth_cache_size = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+        self.auth_cache_ttl_seconds = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+        # Pool de conexiones a la base (PostgreSQL; SQLite usa el suyo)
+        self.db_pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        self.db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        # Segundos tras los que se recicla una conexión (-1 = nunca)
+        self.db_pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+        self.db_pool_pre_ping = _env_flag("DB_POOL_PRE_PING", True)
+        # Crear tablas/índices que falten al arrancar; con 0 se hace aparte
+        # con `python -m app.cli create-schema` (p. ej. en el deploy)
+        self.create_schema_on_startup = _env_flag("CREATE_SCHEMA_ON_STARTUP", True)
+        # Precargar pandas/pyarrow/... en segundo plano tras arrancar
+        self.warm_up_imports = _env_flag("WARM_UP_IMPORTS", True)
 
 
 settings = Settings()
@@ -0,0 +1,66 @@
+"""
+Importación diferida de módulos pesados (pandas, pyarrow, openpyxl, bcrypt...).
+
+`lazy_import("app.services.clean_output")` devuelve un proxy que importa el
+módulo en el primer acceso a uno de sus atributos. Las rutas lo usan para los
+servicios de datos: importar `app.main` (arranque de cada worker) solo carga
+FastAPI y SQLAlchemy, y /health responde sin esperar a pandas. Las librerías
+se cargan en el primer request que las usa o antes, con `start_warm_up` en
+segundo plano tras el arranque.
+
+Seguro entre hilos: `importlib.import_module` serializa la importación de
+cada módulo, así un request y el warm-up no lo importan dos veces.
+"""
+
+import importlib
+import logging
+import threading
+from types import ModuleType
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+_registry: List["LazyModule"] = []
+
+
+class LazyModule:
+    """Proxy de un módulo que se importa al usarlo."""
+
+    def __init__(self, name: str) -> None:
+        self._lazy_name = name
+        self._lazy_module = None
+
+    def _load(self) -> ModuleType:
+        module = self._lazy_module
+        if module is None:
+            module = importlib.import_module(self._lazy_name)
+            self._lazy_module = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module {self._lazy_name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    module = LazyModule(name)
+    _registry.append(module)
+    return module
+
+
+def warm_up() -> None:
+    """Importa todos los módulos diferidos (los que fallen se registran)."""
+    for module in list(_registry):
+        try:
+            module._load()
+        except Exception:
+            logger.exception("No se pudo precargar %s", module._lazy_name)
+
+
+def start_warm_up() -> threading.Thread:
+    thread = threading.Thread(target=warm_up, name="import-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,364 @@
+"""
+Métricas del proceso en formato Prometheus (GET /metrics).
+
+- Latencia de cada request por ruta (plantilla, no la URL: /clean/clean/jobs/{job_id})
+  con `MetricsMiddleware`.
+- Tiempo, filas y bytes de cada etapa del procesado (lectura, reglas,
+  IMAGEN, render a texto, dedup, escritura...) con `stage()`.
+
+Las etapas se agrupan por ejecución con `collect_stages()`: los jobs de
+limpieza corren en otro proceso, así que el worker devuelve sus tiempos en
+`CleaningRunLog.message` y el proceso de la API los registra al terminar el
+job (`observe_stages`). Fuera de `collect_stages` (p. ej. al materializar una
+variante en la descarga) cada etapa se registra directamente.
+
+Sin dependencias: el formato de texto se genera aquí. Las métricas viven en
+la memoria de cada proceso de la API: con varios workers de uvicorn cada
+scrape ve las del worker que lo atiende.
+"""
+
+import bisect
+import contextvars
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sized, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Segundos: de requests livianos a procesados de millones de filas
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # etiquetas -> (conteo por bucket, suma, total)
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            plain = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{plain} {_format_value(total)}")
+            lines.append(f"{self.name}_count{plain} {count}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de los requests HTTP por ruta.",
+    ("method", "route", "status"),
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "clean_stage_duration_seconds",
+    "Duración de cada etapa del procesado por ejecución.",
+    ("operation", "stage"),
+    buckets=STAGE_BUCKETS,
+)
+STAGE_ROWS = Counter(
+    "clean_stage_rows_total",
+    "Filas procesadas por etapa.",
+    ("operation", "stage"),
+)
+STAGE_BYTES = Counter(
+    "clean_stage_bytes_total",
+    "Bytes leídos o escritos por etapa.",
+    ("operation", "stage"),
+)
+STAGE_PEAK_RSS = Gauge(
+    "clean_stage_peak_rss_bytes",
+    "Pico de memoria (RSS) del proceso al terminar la etapa, última ejecución.",
+    ("operation", "stage"),
+)
+PROCESS_PEAK_RSS = Gauge("process_peak_rss_bytes", "Pico de memoria (RSS) de este proceso.")
+
+REGISTRY: List[_Metric] = [
+    REQUEST_SECONDS,
+    STAGE_SECONDS,
+    STAGE_ROWS,
+    STAGE_BYTES,
+    STAGE_PEAK_RSS,
+    PROCESS_PEAK_RSS,
+]
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Máximo de memoria residente del proceso hasta ahora (None si no se sabe)."""
+    # En Linux ru_maxrss sobrevive al exec: un worker "spawn" informaría el
+    # pico del proceso que lo lanzó. VmHWM es el de su propia memoria.
+    try:
+        with open("/proc/self/status", "rb") as status:
+            for line in status:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB; macOS, bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def render_metrics() -> str:
+    peak = peak_rss_bytes()
+    if peak is not None:
+        PROCESS_PEAK_RSS.set(peak)
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------- Etapas ----------
+
+
+class StageInfo:
+    """Contadores que la etapa completa mientras corre (filas, bytes)."""
+
+    __slots__ = ("rows", "bytes")
+
+    def __init__(self, rows: Optional[int] = None, nbytes: Optional[int] = None) -> None:
+        self.rows = rows
+        self.bytes = nbytes
+
+
+_collector: contextvars.ContextVar[Optional[Dict[str, Dict[str, Any]]]] = contextvars.ContextVar(
+    "stage_collector", default=None
+)
+
+
+def _add_stage(timings: Dict[str, Dict[str, Any]], name: str, seconds: float, info: StageInfo):
+    entry = timings.setdefault(name, {"seconds": 0.0, "calls": 0})
+    entry["seconds"] = round(entry["seconds"] + seconds, 6)
+    entry["calls"] += 1
+    for field in ("rows", "bytes"):
+        value = getattr(info, field)
+        if value is not None:
+            entry[field] = entry.get(field, 0) + int(value)
+    peak = peak_rss_bytes()
+    if peak is not None:
+        entry["peak_rss_bytes"] = peak
+
+
+def _record(name: str, seconds: float, info: StageInfo, operation: str) -> None:
+    timings = _collector.get()
+    if timings is not None:
+        _add_stage(timings, name, seconds, info)
+        return
+    single: Dict[str, Dict[str, Any]] = {}
+    _add_stage(single, name, seconds, info)
+    observe_stages(single, operation)
+
+
+@contextmanager
+def stage(
+    name: str, rows: Optional[int] = None, nbytes: Optional[int] = None, operation: str = "clean"
+) -> Iterator[StageInfo]:
+    """
+    Mide una etapa. Las filas y bytes se pueden pasar al entrar o asignar
+    en el objeto que devuelve (`info.rows = len(df)`). Una etapa que se
+    repite (bloques del modo streaming) se acumula en la misma entrada.
+    """
+    info = StageInfo(rows, nbytes)
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        _record(name, time.perf_counter() - start, info, operation)
+
+
+def iter_stage(name: str, items: Iterable[Sized], operation: str = "clean") -> Iterator[Sized]:
+    """
+    Recorre `items` (p. ej. los bloques de un lector de CSV) midiendo el
+    tiempo de producir cada elemento como la etapa `name`; filas = len().
+    """
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        _record(name, time.perf_counter() - start, StageInfo(len(item)), operation)
+        yield item
+
+
+@contextmanager
+def collect_stages() -> Iterator[Dict[str, Dict[str, Any]]]:
+    """
+    Junta las etapas medidas dentro del bloque en un dict
+    {etapa: {"seconds", "calls", "rows", "bytes", "peak_rss_bytes"}}.
+    """
+    timings: Dict[str, Dict[str, Any]] = {}
+    token = _collector.set(timings)
+    try:
+        yield timings
+    finally:
+        _collector.reset(token)
+
+
+def observe_stages(timings: Optional[Dict[str, Dict[str, Any]]], operation: str) -> None:
+    """Registra en los histogramas las etapas de una ejecución."""
+    for name, entry in (timings or {}).items():
+        STAGE_SECONDS.observe(entry["seconds"], operation=operation, stage=name)
+        if entry.get("rows") is not None:
+            STAGE_ROWS.inc(entry["rows"], operation=operation, stage=name)
+        if entry.get("bytes") is not None:
+            STAGE_BYTES.inc(entry["bytes"], operation=operation, stage=name)
+        if entry.get("peak_rss_bytes") is not None:
+            STAGE_PEAK_RSS.set(entry["peak_rss_bytes"], operation=operation, stage=name)
+
+
+# ---------- Middleware ----------
+
+_PATH_PARAM_RE = re.compile(r"{(\w+)(?::\w+)?}")
+
+
+def _route_template(scope) -> str:
+    """
+    Plantilla de la ruta del request ("/clean/clean/jobs/{job_id}"). En los
+    routers incluidos la ruta no trae el prefijo del include: se toma de la
+    URL, la parte que precede a la ruta con sus parámetros.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    params = scope.get("path_params") or {}
+    rendered = _PATH_PARAM_RE.sub(lambda m: str(params.get(m.group(1), m.group(0))), template)
+    path = scope.get("path", "")
+    if path != rendered and path.endswith(rendered):
+        return path[: len(path) - len(rendered)] + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que registra la latencia de cada request. La ruta es la
+    plantilla que resolvió el router; los 404 van como "unmatched" para no
+    crear una serie por URL.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=_route_template(scope),
+                status=status[0],
+            )
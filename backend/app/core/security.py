@@ -0,0 +1,209 @@
+"""
+Usuario autenticado (Bearer JWT) como dependency de las rutas.
+
+`get_current_user` decodifica el token y busca el usuario una sola vez por
+token: el resultado (un `Principal` inmutable, sin sesión de SQLAlchemy) queda
+en una caché LRU con TTL en memoria del proceso, así las rutas que lo usan no
+consultan `users` en cada request. Las entradas vencen con el TTL o con el
+`exp` del token, lo que ocurra primero.
+
+Los cambios a un usuario hechos por el ORM (update/delete) invalidan sus
+entradas; el TTL acota lo que puede quedar desactualizado si el cambio se
+hizo en otro proceso o con un UPDATE masivo.
+
+`get_optional_user` es la variante para rutas que aún aceptan requests sin
+token (el frontend todavía no lo envía a uploads ni a clean): sin token
+devuelve None, con un token inválido responde 401.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app import models
+from app.config import settings
+from app.core.lazy import lazy_import
+from app.db import SessionLocal
+from app.services import auth
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
+
+jose = lazy_import("jose")
+
+# Clave en session.info con los IDs de usuario modificados en la transacción
+_CHANGED_USERS_KEY = "auth_changed_user_ids"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Datos del usuario autenticado que necesitan las rutas."""
+
+    id: int
+    email: str
+    full_name: Optional[str]
+    role: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            is_active=user.is_active,
+            created_at=user.created_at,
+        )
+
+
+class TokenCache:
+    """LRU con TTL: token -> Principal. Segura entre hilos."""
+
+    def __init__(self, maxsize: int, ttl_seconds: float) -> None:
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Sube con cada invalidación: descarta lo leído de la DB antes de ella
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, token: str) -> Optional[Principal]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires, principal = entry
+            if expires <= now:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def put(
+        self,
+        token: str,
+        principal: Principal,
+        generation: int,
+        token_exp: Optional[float] = None,
+    ) -> None:
+        """
+        Guarda `principal` si no hubo invalidaciones desde `generation`.
+        `token_exp` es el `exp` del JWT (epoch) y acota el TTL de la entrada.
+        """
+        ttl = self.ttl_seconds
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[token] = (time.monotonic() + ttl, principal)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            stale = [t for t, (_, p) in self._entries.items() if p.id == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = TokenCache(settings.auth_cache_size, settings.auth_cache_ttl_seconds)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _user_changed(mapper, connection, target: models.User) -> None:
+    # Se invalida en el flush y otra vez al confirmar: un request que lea el
+    # usuario entre ambos momentos vería la fila aún sin commit
+    token_cache.invalidate_user(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_USERS_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    for user_id in session.info.pop(_CHANGED_USERS_KEY, ()):
+        token_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop(_CHANGED_USERS_KEY, None)
+
+
+def _credentials_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="No se pudo validar las credenciales",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _load_principal(email: str) -> Optional[Principal]:
+    db = SessionLocal()
+    try:
+        user = auth.get_user_by_email(db, email)
+        return Principal.from_user(user) if user is not None else None
+    finally:
+        db.close()
+
+
+async def _resolve_token(token: str) -> Principal:
+    principal = token_cache.get(token)
+    if principal is None:
+        try:
+            payload = auth.jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+        except jose.JWTError:
+            raise _credentials_error()
+        email = payload.get("sub")
+        if email is None:
+            raise _credentials_error()
+        generation = token_cache.generation
+        principal = await run_in_threadpool(_load_principal, email)
+        if principal is None:
+            raise _credentials_error()
+        token_cache.put(token, principal, generation, payload.get("exp"))
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usuario inactivo")
+    return principal
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    return await _resolve_token(token)
+
+
+async def get_optional_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+) -> Optional[Principal]:
+    if token is None:
+        return None
+    return await _resolve_token(token)
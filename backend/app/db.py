@@ -1,14 +1,112 @@
+import logging
 import os
-from sqlalchemy import create_engine
+from typing import List
+
+from sqlalchemy import MetaData, Table, create_engine, inspect, text
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.schema import CreateColumn, CreateTable
+
+from app.config import settings
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+
+def _engine_options(url: str) -> dict:
+    # pre-ping descarta conexiones cortadas por el servidor o un proxy antes
+    # de entregarlas (un SELECT 1 al sacarlas del pool)
+    options = {"pool_pre_ping": settings.db_pool_pre_ping}
+    if url.startswith("sqlite"):
+        # SQLite usa su propio pool (sin tamaño configurable)
+        options["connect_args"] = {"check_same_thread": False}
+        return options
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    return options
+
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+logger = logging.getLogger(__name__)
+
+
+def _rebuild_sqlite_table(connection, table: Table, existing: List[str]) -> None:
+    """
+    SQLite no puede cambiar la nulabilidad de una columna: se crea la tabla
+    con el esquema actual, se copian las filas y se reemplaza la anterior.
+    Los índices se recrean después (create_schema).
+    """
+    metadata = MetaData()
+    for other in Base.metadata.sorted_tables:
+        other.to_metadata(metadata)  # destinos de las claves foráneas
+    staging = table.to_metadata(metadata, name=f"{table.name}__upgrade")
+    staging.indexes.clear()
+    connection.execute(CreateTable(staging))
+    columns = ", ".join(f'"{column.name}"' for column in table.columns if column.name in existing)
+    connection.execute(
+        text(f'INSERT INTO "{staging.name}" ({columns}) SELECT {columns} FROM "{table.name}"')
+    )
+    connection.execute(text(f'DROP TABLE "{table.name}"'))
+    connection.execute(text(f'ALTER TABLE "{staging.name}" RENAME TO "{table.name}"'))
+
+
+def upgrade_schema(bind=None) -> None:
+    """
+    Lleva las tablas existentes al esquema de los modelos: agrega las
+    columnas que falten (ALTER TABLE ... ADD COLUMN) y quita NOT NULL de las
+    que ahora aceptan nulos. Solo cambios aditivos; no borra ni renombra.
+    """
+    bind = bind or engine
+    inspector = inspect(bind)
+    sqlite = bind.dialect.name == "sqlite"
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            current = {column["name"]: column for column in inspector.get_columns(table.name)}
+            missing = [column for column in table.columns if column.name not in current]
+            relaxed = [
+                column
+                for column in table.columns
+                if column.name in current
+                and column.nullable
+                and not column.primary_key
+                and not current[column.name]["nullable"]
+            ]
+            if sqlite and relaxed:
+                logger.info("Reconstruyendo %s (columnas que aceptan nulos)", table.name)
+                _rebuild_sqlite_table(connection, table, list(current))
+                continue
+            for column in missing:
+                logger.info("Agregando columna %s.%s", table.name, column.name)
+                ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN {ddl}'))
+            for column in relaxed:
+                connection.execute(
+                    text(f'ALTER TABLE "{table.name}" ALTER COLUMN "{column.name}" DROP NOT NULL')
+                )
+
+
+def create_schema(bind=None) -> None:
+    """
+    Crea las tablas que faltan, agrega a las existentes las columnas nuevas
+    (upgrade_schema) y crea los índices que falten (create_all no toca
+    tablas creadas antes).
+    """
+    from app import models  # noqa: F401 (registra las tablas en Base.metadata)
+
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    upgrade_schema(bind)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
 
 def get_db():
     db = SessionLocal()
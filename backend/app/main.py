@@ -1,15 +1,20 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from app.routes import uploads
 from app.routes import cleaner
 from app.routes import auth
-from app.db import Base, engine
+from app.config import settings
+from app.core.lazy import start_warm_up
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, render_metrics
+from app.db import create_schema
 from app import models
+from app.services.auth import shutdown_hash_executor
+from app.services.jobs import shutdown_executor
 from fastapi.middleware.cors import CORSMiddleware
 import json
 
-Base.metadata.create_all(bind=engine)
-
 # Custom JSONResponse que fuerza UTF-8
 class UTF8JSONResponse(JSONResponse):
     def render(self, content) -> bytes:
@@ -21,7 +26,21 @@ class UTF8JSONResponse(JSONResponse):
             separators=(",", ":"),
         ).encode("utf-8")
 
-app = FastAPI(default_response_class=UTF8JSONResponse)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fuera del import: importar app.main no toca la base
+    if settings.create_schema_on_startup:
+        create_schema()
+    # pandas/pyarrow/openpyxl se cargan en segundo plano; /health ya responde
+    if settings.warm_up_imports:
+        start_warm_up()
+    yield
+    # Detener el pool de procesos de los jobs de limpieza
+    shutdown_executor()
+    shutdown_hash_executor()
+
+
+app = FastAPI(default_response_class=UTF8JSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,11 +48,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # cursor de la página siguiente en GET /uploads/ sin parámetros
+    expose_headers=["X-Next-Cursor"],
 )
+# Latencia por ruta para /metrics
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/health")
 def read_health():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    # Formato de texto de Prometheus: latencia por ruta y tiempos por etapa
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
 app.include_router(uploads.router)
 app.include_router(cleaner.router, prefix="/clean", tags=["clean"])
+app.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text, func
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.dialects.postgresql import JSON
 
 from .db import Base
@@ -34,12 +34,34 @@ class UserRole(Base):
 
 class FileUpload(Base):
     __tablename__ = "file_uploads"
+    __table_args__ = (
+        # Listado por cursor (upload_listing): orden (uploaded_at, id) descendente
+        Index("ix_file_uploads_uploaded_at_id", "uploaded_at", "id"),
+        Index("ix_file_uploads_uploader_uploaded_at_id", "uploaded_by_user_id", "uploaded_at", "id"),
+        # Filtro por prefijo del nombre (rango sobre el índice)
+        Index("ix_file_uploads_filename_original", "filename_original"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     filename_original = Column(String, nullable=False)
     storage_path = Column(String, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 del contenido
     uploaded_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    profile_json = Column(Text, nullable=True)  # JSON: perfil de columnas (column_profile)
+
+
+class ColumnAlias(Base):
+    """Alias de encabezados confirmados por los usuarios (column_aliases)."""
+
+    __tablename__ = "column_aliases"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    alias_key = Column(String, unique=True, index=True, nullable=False)  # alias_key() del encabezado original
+    canonical_name = Column(String, nullable=False)  # columna normalizada a la que se asigna
+    header = Column(String, nullable=False)  # último encabezado original confirmado (referencia)
+    confirmed_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
 
 
 class CleaningConfig(Base):
@@ -49,16 +71,46 @@ class CleaningConfig(Base):
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
     config_json = Column(JSON, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # subir al editar config_json
     created_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 
+class CleaningBatch(Base):
+    __tablename__ = "cleaning_batches"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    status = Column(String, nullable=False)  # queued, running, succeeded, partial, failed
+    max_concurrency = Column(Integer, nullable=False)
+    merge_outputs = Column(Boolean, default=False, nullable=False)
+    message = Column(Text, nullable=True)  # JSON: resumen agregado y salida combinada
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
 class CleaningRunLog(Base):
     __tablename__ = "cleaning_run_logs"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     file_upload_id = Column(Integer, ForeignKey("file_uploads.id"), nullable=False)
-    cleaning_config_id = Column(Integer, ForeignKey("cleaning_configs.id"), nullable=False)
-    status = Column(String, nullable=False)
-    message = Column(Text, nullable=True)
+    cleaning_config_id = Column(Integer, ForeignKey("cleaning_configs.id"), nullable=True)  # None = reglas por defecto
+    batch_id = Column(Integer, ForeignKey("cleaning_batches.id"), nullable=True, index=True)
+    status = Column(String, nullable=False)  # queued, running, succeeded, failed
+    message = Column(Text, nullable=True)  # JSON: opciones, avance, resultado o error
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class CleanOutput(Base):
+    """Manifiesto de salidas limpias (clave = hash de entrada + opciones)."""
+
+    __tablename__ = "clean_outputs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False)
+    file_upload_id = Column(Integer, ForeignKey("file_uploads.id"), nullable=False, index=True)
+    content_hash = Column(String(64), nullable=False)
+    options_json = Column(Text, nullable=False)
+    rows = Column(Integer, nullable=False)
+    columns_json = Column(Text, nullable=False)
+    table_path = Column(String, nullable=False)  # tabla intermedia Arrow; las variantes CSV se generan al descargar
+    report_json = Column(Text, nullable=True)  # JSON: reporte de duplicados (dedup), si se pidió
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,19 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import timedelta
 
 from app import schemas
+from app.core.security import Principal, get_current_user
 from app.db import get_db
 from app.services import auth
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 @router.post("/login", response_model=schemas.Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = auth.authenticate_user(db, form_data.username, form_data.password)
+    # bcrypt y la consulta corren fuera del event loop
+    user = await auth.authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -29,33 +31,20 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 @router.post("/users", response_model=schemas.User)
 async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     # TODO: Agregar verificación de que solo admin puede crear usuarios
-    db_user = auth.get_user_by_email(db, user.email)
+    db_user = await run_in_threadpool(auth.get_user_by_email, db, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email ya registrado")
-    return auth.create_user(db, user.email, user.password, user.full_name, user.role)
+    hashed_password = await auth.get_password_hash_async(user.password)
+    return await run_in_threadpool(
+        auth.add_user, db, user.email, hashed_password, user.full_name, user.role
+    )
 
 @router.get("/users/me", response_model=schemas.User)
-async def read_users_me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    from jose import JWTError, jwt
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="No se pudo validar las credenciales",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = auth.get_user_by_email(db, email)
-    if user is None:
-        raise credentials_exception
-    return user
+async def read_users_me(current_user: Principal = Depends(get_current_user)):
+    return current_user
 
 @router.get("/users", response_model=List[schemas.User])
-async def list_users(db: Session = Depends(get_db)):
+def list_users(db: Session = Depends(get_db)):
     # TODO: Solo admin puede ver lista de usuarios
     from app import models
     return db.query(models.User).all()
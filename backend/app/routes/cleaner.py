@@ -1,19 +1,31 @@
 import os
+import re
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 
-import pandas as pd
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
+from app.core.lazy import lazy_import
+from app.core.metrics import stage
+from app.core.security import Principal, get_optional_user
 from app.db import get_db
-from app.models import FileUpload
-from app.services.clean_preview import generate_preview
-from app.services.clean_normalize import build_normalization_preview
-from app.services.column_normalizer import normalize_column_name
-from app.services.clean_output import generate_clean_outputs, OutputEngineError
+from app.models import CleanOutput, FileUpload
+from app.services import column_aliases, jobs, output_store
+
+# Servicios de datos (pandas, pyarrow, openpyxl): se importan en el primer
+# request que los usa, no al arrancar el worker (ver app.core.lazy)
+clean_normalize = lazy_import("app.services.clean_normalize")
+clean_output = lazy_import("app.services.clean_output")
+clean_preview = lazy_import("app.services.clean_preview")
+clean_rules = lazy_import("app.services.clean_rules")
+column_profile = lazy_import("app.services.column_profile")
+data_grid = lazy_import("app.services.data_grid")
+dedup = lazy_import("app.services.dedup")
+upload_diff = lazy_import("app.services.upload_diff")
+xlsx_ingest = lazy_import("app.services.xlsx_ingest")
 
 router = APIRouter(prefix="/clean", tags=["clean"])
 
@@ -21,106 +33,546 @@ router = APIRouter(prefix="/clean", tags=["clean"])
 # ---------- Modelo de entrada para el procesado ----------
 
 
+class CleanDedupOptions(BaseModel):
+    # columnas NORMALIZADAS que identifican cada fila (deben estar en columns)
+    key_columns: List[str] = Field(default_factory=lambda: list(upload_diff.DEFAULT_KEY_COLUMNS))
+    # keep_first | keep_last | fail
+    policy: str = "keep_first"
+
+
 class CleanProcessRequest(BaseModel):
     file_id: int
     # nombres NORMALIZADOS (PLU, DESC_PLU, PRECIO_OFERTA, etc.)
     columns: List[str]
     generate_image_names: bool = False
+    # CleaningConfig con las reglas por columna; None = reglas por defecto
+    config_id: Optional[int] = None
+    # Hojas de un XLSX a procesar (se concatenan); None = primera hoja
+    sheets: Optional[List[str]] = None
+    # Detección de claves duplicadas / valores en conflicto; None = no
+    dedup: Optional[CleanDedupOptions] = None
+
+
+class CleanBatchRequest(BaseModel):
+    items: List[CleanProcessRequest]
+    # máximo de archivos procesándose a la vez (tope: JOB_WORKERS)
+    max_concurrency: int = 4
+    # si True, además se genera un CSV combinado con todas las salidas
+    merge_outputs: bool = False
+
+
+class CleanDiffRequest(BaseModel):
+    # lista anterior y lista nueva
+    old_file_id: int
+    new_file_id: int
+    # columnas NORMALIZADAS que identifican cada fila
+    key_columns: List[str] = Field(default_factory=lambda: list(upload_diff.DEFAULT_KEY_COLUMNS))
+    # columnas NORMALIZADAS a comparar; None = todas las comunes
+    columns: Optional[List[str]] = None
+    config_id: Optional[int] = None
+
+
+class ColumnAliasRequest(BaseModel):
+    # {encabezado original: columna NORMALIZADA}, p. ej.
+    # {"Precio Oferta ($)": "PRECIO_OFERTA", "PVP": "PRECIO_OFERTA"}
+    mapping: Dict[str, str]
 
 
 # ---------- Preview (lo que ya teníamos) ----------
 
 
 @router.post("/preview")
-def preview_file(file_id: int, db: Session = Depends(get_db)):
+def preview_file(
+    file_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)
+):
     file = db.query(FileUpload).filter(FileUpload.id == file_id).first()
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
 
-    preview = generate_preview(file.storage_path)
-    normalization = build_normalization_preview(file.storage_path)
+    preview = clean_preview.generate_preview(file.storage_path, file_id=file.id)
+    with stage("normalize", operation="preview"):
+        # alias confirmados antes (y columnas conocidas) aplicados a estos encabezados
+        aliases = column_aliases.resolve_aliases(db, preview["columns"])
+        normalization = clean_normalize.build_normalization_preview(
+            file.storage_path, preview=preview, aliases=aliases
+        )
+    with stage("profile", operation="preview"):
+        # calculado tras el upload; el preview no lee el archivo entero por
+        # él: si aún no hay sidecar se genera después de responder y
+        # `profile` queda en null hasta entonces
+        profile = column_profile.cached_profile(db, file)
+    if profile is None:
+        background_tasks.add_task(column_profile.warm_profile, file.storage_path, file.id)
 
     return {
         "preview": preview,
         "normalization": normalization,
+        "profile": profile,
     }
 
 
-# ---------- Process: genera CSV limpio + rutas de descarga ----------
+# ---------- Aliases: mapeos de encabezados confirmados ----------
+
 
+@router.get("/aliases", summary="List confirmed column aliases")
+def list_column_aliases(db: Session = Depends(get_db)):
+    return [column_aliases.serialize_alias(a) for a in column_aliases.list_aliases(db)]
 
-@router.post("/process")
+
+@router.post("/aliases", summary="Confirm column aliases")
+def confirm_column_aliases(
+    payload: ColumnAliasRequest,
+    db: Session = Depends(get_db),
+    user: Optional[Principal] = Depends(get_optional_user),
+):
+    """
+    Guarda el mapeo de encabezados que el usuario confirmó. Los archivos
+    siguientes con esos encabezados (o variantes que solo difieren en
+    espacios, acentos o signos) se mapean solos en el preview y al procesar.
+    """
+    if not payload.mapping:
+        raise HTTPException(status_code=400, detail="mapping must not be empty")
+    try:
+        aliases = column_aliases.learn_aliases(
+            db, payload.mapping, user_id=user.id if user else None
+        )
+    except column_aliases.AliasError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [column_aliases.serialize_alias(a) for a in aliases]
+
+
+@router.delete("/aliases/{alias_id}", status_code=204, summary="Delete a column alias")
+def delete_column_alias(alias_id: int, db: Session = Depends(get_db)):
+    if not column_aliases.delete_alias(db, alias_id):
+        raise HTTPException(status_code=404, detail="Alias not found")
+    return Response(status_code=204)
+
+
+# ---------- Rows: ventanas de filas para la grilla de datos ----------
+
+
+@router.get("/rows", summary="Get a window of rows of an uploaded file")
+def get_rows(
+    file_id: int,
+    offset: int = 0,
+    limit: int = 100,
+    columns: Optional[List[str]] = Query(None),
+    sort: Optional[str] = None,
+    descending: bool = False,
+    filter: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Devuelve `limit` filas a partir de `offset` (máx. 1000 por ventana),
+    leídas del sidecar Arrow del upload.
+
+    - columns: columnas a devolver, con los nombres del preview (se repite
+      el parámetro: ?columns=PLU&columns=Desc%20Plu); por defecto todas
+    - sort / descending: columna por la que ordenar (nulos al final)
+    - filter: `COLUMNA=texto`, filas cuya columna contiene el texto (sin
+      distinguir mayúsculas); se puede repetir
+
+    `total` es el número de filas que cumplen los filtros.
+    """
+    file = db.query(FileUpload).filter(FileUpload.id == file_id).first()
+    if not file:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not os.path.exists(file.storage_path):
+        raise HTTPException(status_code=404, detail="Stored file not found on disk")
+
+    try:
+        window = data_grid.read_window(
+            file.storage_path,
+            file_id=file.id,
+            offset=offset,
+            limit=limit,
+            columns=columns,
+            sort=sort,
+            descending=descending,
+            filters=filter,
+        )
+    except data_grid.GridError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"file_id": file.id, **window}
+
+
+# ---------- Process: encola el job de limpieza ----------
+
+
+@router.post("/process", status_code=202)
 def process_file(payload: CleanProcessRequest, db: Session = Depends(get_db)):
-    # 1) Buscar archivo en la DB
+    """
+    Encola la limpieza en el pool de procesos y devuelve el ID del job.
+
+    El avance y el resultado (filas, columnas, rutas de descarga) se consultan
+    en GET /clean/jobs/{job_id}. Si se pidió `dedup`, el job trae además el
+    reporte de claves duplicadas y valores en conflicto.
+    """
     file = db.query(FileUpload).filter(FileUpload.id == payload.file_id).first()
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
 
-    # 2) Llamar al motor de salida
-    try:
-        result = generate_clean_outputs(
-            file_path=file.storage_path,
-            selected_columns=payload.columns,
-            generate_image_names=payload.generate_image_names,
+    run = jobs.submit_clean_job(
+        db,
+        file,
+        columns=payload.columns,
+        generate_image_names=payload.generate_image_names,
+        config=_load_config(db, payload.config_id),
+        sheets=_check_sheets(file, payload.sheets),
+        dedup=_check_dedup(payload),
+    )
+    return jobs.serialize_job(run)
+
+
+def _check_dedup(payload: CleanProcessRequest) -> Optional[dict]:
+    """Valida la política y que las columnas clave estén entre las elegidas."""
+    if payload.dedup is None:
+        return None
+    if payload.dedup.policy not in dedup.DEDUP_POLICIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid dedup policy (expected one of: {', '.join(dedup.DEDUP_POLICIES)})",
+        )
+    key_columns = [name.strip() for name in payload.dedup.key_columns]
+    if not key_columns:
+        raise HTTPException(status_code=400, detail="dedup key_columns must not be empty")
+    missing = [name for name in key_columns if name not in payload.columns]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"dedup key columns must be selected: {', '.join(missing)}",
         )
+    return {"key_columns": key_columns, "policy": payload.dedup.policy}
+
+
+def _check_sheets(file: FileUpload, sheets: Optional[List[str]]) -> Optional[List[str]]:
+    """Valida que las hojas pedidas existen en el XLSX."""
+    if not sheets:
+        return None
+    if Path(file.storage_path).suffix.lower() not in {".xlsx", ".xls"}:
+        raise HTTPException(status_code=400, detail="sheets only apply to XLSX files")
+    try:
+        available = set(xlsx_ingest.sheet_names(file.storage_path))
     except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Stored file not found on disk")
+    missing = [name for name in sheets if name not in available]
+    if missing:
         raise HTTPException(
-            status_code=500, detail="Stored file not found on disk"
+            status_code=400, detail=f"Sheets not found: {', '.join(missing)}"
         )
-    except OutputEngineError as e:
+    return sheets
+
+
+def _load_config(db: Session, config_id: Optional[int]):
+    """CleaningConfig pedida, con sus reglas ya compiladas (y validadas)."""
+    if config_id is None:
+        return None
+    try:
+        config = clean_rules.get_config(db, config_id)
+        clean_rules.plan_for_config(config)
+    except clean_rules.ConfigNotFoundError:
+        raise HTTPException(status_code=404, detail="Cleaning config not found")
+    except clean_rules.RulesError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cleaning config: {e}")
+    return config
+
+
+# ---------- Batch: varios archivos en paralelo ----------
+
+
+@router.post("/process/batch", status_code=202)
+def process_batch(payload: CleanBatchRequest, db: Session = Depends(get_db)):
+    """
+    Encola un job por archivo y los reparte en el pool de procesos con un
+    máximo de `max_concurrency` en paralelo. El estado por archivo, el
+    resumen agregado y la salida combinada se consultan en
+    GET /clean/batches/{batch_id}.
+    """
+    if not payload.items:
+        raise HTTPException(status_code=400, detail="items must not be empty")
+
+    file_ids = {item.file_id for item in payload.items}
+    files = {
+        f.id: f for f in db.query(FileUpload).filter(FileUpload.id.in_(file_ids)).all()
+    }
+    missing = sorted(file_ids - files.keys())
+    if missing:
         raise HTTPException(
-            status_code=400,
-            detail=str(e),
+            status_code=404,
+            detail=f"Files not found: {', '.join(str(i) for i in missing)}",
         )
 
-    # 3) Adaptar la respuesta al formato que ya usábamos
-    return {
-        "rows": result["rows"],
-        "columns": result["columns"],
-        "download_semicolon_path": result["semicolon_path"],
-        "download_comma_path": result["comma_path"],
+    configs = {
+        config_id: _load_config(db, config_id)
+        for config_id in {item.config_id for item in payload.items}
     }
 
-@router.get("/download", summary="Download cleaned output CSV")
+    batch = jobs.submit_batch(
+        db,
+        [
+            (
+                files[item.file_id],
+                item.columns,
+                item.generate_image_names,
+                configs[item.config_id],
+                _check_sheets(files[item.file_id], item.sheets),
+                _check_dedup(item),
+            )
+            for item in payload.items
+        ],
+        max_concurrency=payload.max_concurrency,
+        merge_outputs=payload.merge_outputs,
+    )
+    return jobs.serialize_batch(db, batch)
+
+
+@router.get("/batches/{batch_id}", summary="Get cleaning batch status")
+def get_batch_status(batch_id: int, db: Session = Depends(get_db)):
+    batch = jobs.get_batch(db, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return jobs.serialize_batch(db, batch)
+
+
+# ---------- Jobs: estado, avance y resultado ----------
+
+
+@router.get("/jobs/{job_id}", summary="Get cleaning job status")
+def get_job_status(job_id: int, db: Session = Depends(get_db)):
+    run = jobs.get_job(db, job_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return jobs.serialize_job(run)
+
+
+@router.get("/jobs", summary="List cleaning jobs")
+def list_job_statuses(
+    file_id: Optional[int] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+):
+    runs = jobs.list_jobs(db, file_id=file_id, limit=min(max(limit, 1), 200))
+    return [jobs.serialize_job(run) for run in runs]
+
+
+# ---------- Diff: comparación entre dos uploads ----------
+
+
+@router.post("/diff", summary="Compare two uploads by key")
+def diff_files(payload: CleanDiffRequest, db: Session = Depends(get_db)):
+    """
+    Compara el upload nuevo contra el anterior por `key_columns` (PLU) tras
+    aplicar a ambos la misma limpieza. Devuelve los conteos de filas nuevas
+    (added), eliminadas (removed) y con cambios (changed); cada parte se
+    descarga en GET /clean/diff/{diff_id}/download.
+    """
+    files = {}
+    for file_id in (payload.old_file_id, payload.new_file_id):
+        file = db.query(FileUpload).filter(FileUpload.id == file_id).first()
+        if not file:
+            raise HTTPException(status_code=404, detail=f"File not found: {file_id}")
+        files[file_id] = file
+    old_file, new_file = files[payload.old_file_id], files[payload.new_file_id]
+
+    config = _load_config(db, payload.config_id)
+    options = {}
+    if config is not None:
+        options["config"] = {"id": config.id, "version": config.version}
+
+    try:
+        headers = clean_output.source_headers(old_file.storage_path, old_file.id)
+        headers += clean_output.source_headers(new_file.storage_path, new_file.id)
+        summary = upload_diff.diff_uploads(
+            old_file.storage_path,
+            new_file.storage_path,
+            key_columns=payload.key_columns,
+            columns=payload.columns,
+            old_file_id=old_file.id,
+            new_file_id=new_file.id,
+            plan=clean_rules.plan_for_config(config) if config is not None else None,
+            options=options,
+            aliases=column_aliases.resolve_aliases(db, headers),
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Stored file not found on disk")
+    except clean_output.OutputEngineError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"old_file_id": old_file.id, "new_file_id": new_file.id, **summary}
+
+
+@router.get("/diff/{diff_id}/download", summary="Download a diff part")
+def download_diff(
+    request: Request,
+    diff_id: str,
+    part: str = "changed",
+    variant: str = "semicolon",
+    stream: bool = False,
+):
+    """
+    Descarga una parte de la comparación: 'added', 'removed' o 'changed'.
+    Mismas variantes y cabeceras que /clean/download.
+    """
+    if part not in upload_diff.DIFF_PARTS:
+        raise HTTPException(
+            status_code=400, detail="part must be 'added', 'removed' or 'changed'"
+        )
+    _check_variant(variant)
+    if not re.fullmatch(r"[0-9a-f]{64}", diff_id) or upload_diff.load_summary(diff_id) is None:
+        raise HTTPException(status_code=404, detail="Diff not found")
+
+    table_path = str(upload_diff.part_path(diff_id, part))
+    return _table_download(request, table_path, variant, stream)
+
+
+@router.get("/download", summary="Download cleaned output")
 def download_clean(
-    file_id: int,
+    request: Request,
+    output_id: Optional[int] = None,
+    file_id: Optional[int] = None,
+    batch_id: Optional[int] = None,
     variant: str = "semicolon",
+    stream: bool = False,
     db: Session = Depends(get_db),
 ):
     """
-    Devuelve el CSV limpio para descarga.
+    Devuelve la salida limpia para descarga.
 
-    - file_id: ID del FileUpload original
-    - variant: 'semicolon' o 'comma'
+    La variante pedida se genera desde la tabla intermedia la primera vez y
+    queda guardada para las siguientes descargas, junto con sus copias
+    comprimidas (zstd y gzip, solo variantes de texto) que se negocian con
+    Accept-Encoding. Soporta ETag / If-None-Match (304) y Range para reanudar
+    descargas.
+
+    - output_id: ID de la salida (campo `result.output_id` del job); apunta
+      exactamente a la ejecución pedida
+    - file_id: ID del FileUpload original; si no se pasa output_id se sirve la
+      salida más reciente de ese archivo
+    - batch_id: ID de un batch con merge_outputs; sirve la salida combinada
+    - variant: 'semicolon' o 'comma' (CSV), 'xlsx', 'parquet' o 'ndjson'
+    - stream: si True el CSV / NDJSON se genera al vuelo desde la tabla, sin
+      escribir archivo (sin compresión ni Range); XLSX y Parquet se sirven
+      siempre desde archivo
     """
-    file = db.query(FileUpload).filter(FileUpload.id == file_id).first()
-    if not file:
-        raise HTTPException(status_code=404, detail="File not found")
+    _check_variant(variant)
 
-    inputs_path = Path(file.storage_path)
-    stem = inputs_path.stem  # mismo que usamos en generate_clean_outputs
+    table_path = _resolve_table_path(db, output_id, file_id, batch_id)
+    if table_path is None or not Path(table_path).exists():
+        raise HTTPException(
+            status_code=404,
+            detail="Cleaned file not found. Did you run /clean/process?",
+        )
 
-    outputs_dir = Path("outputs")
+    return _table_download(request, table_path, variant, stream)
 
-    if variant == "semicolon":
-        output_path = outputs_dir / f"{stem}_SEMICOLON.csv"
-    elif variant == "comma":
-        output_path = outputs_dir / f"{stem}_COMMA.csv"
-    else:
+
+def _check_variant(variant: str) -> None:
+    if variant not in clean_output.VARIANTS:
         raise HTTPException(
             status_code=400,
-            detail="variant must be 'semicolon' or 'comma'",
+            detail=f"variant must be one of: {', '.join(clean_output.VARIANTS)}",
         )
 
-    if not output_path.exists():
-        raise HTTPException(
-            status_code=404,
-            detail="Cleaned file not found. Did you run /clean/process?",
+
+def _table_download(request: Request, table_path: str, variant: str, stream: bool):
+    """
+    Respuesta de descarga de una variante de una tabla intermedia: archivo
+    (precomprimido según Accept-Encoding, con ETag y Range) o streaming.
+    """
+    _, media_type = clean_output.VARIANTS[variant]
+    stream = stream and variant in clean_output.TEXT_VARIANTS
+    encoding = None
+    if not stream and variant in clean_output.TEXT_VARIANTS:
+        encoding = _negotiate_encoding(request.headers.get("accept-encoding", ""))
+
+    etag = clean_output.variant_etag(table_path, variant, encoding)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    filename = clean_output.variant_path(table_path, variant).name
+    if stream:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return StreamingResponse(
+            clean_output.iter_variant_chunks(table_path, variant),
+            media_type=media_type,
+            headers=headers,
         )
 
+    output_path = clean_output.materialize_variant(table_path, variant, encoding)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+
     return FileResponse(
         path=str(output_path),
-        media_type="text/csv; charset=utf-8",
-        filename=os.path.basename(output_path),
+        media_type=media_type,
+        filename=filename,
+        headers=headers,
     )
 
+
+def _negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Elige la codificación precomprimida según Accept-Encoding (respetando
+    los q-values); None si el cliente no acepta ninguna.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in clean_output.ENCODINGS:
+        q = weights.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(
+        tag.removeprefix("W/") == etag for tag in candidates
+    )
+
+
+def _resolve_table_path(
+    db: Session,
+    output_id: Optional[int],
+    file_id: Optional[int],
+    batch_id: Optional[int],
+) -> Optional[str]:
+    """Tabla intermedia a descargar según el identificador recibido."""
+    if output_id is not None:
+        output = db.query(CleanOutput).filter(CleanOutput.id == output_id).first()
+        return output.table_path if output else None
+
+    if batch_id is not None:
+        batch = jobs.get_batch(db, batch_id)
+        if not batch:
+            raise HTTPException(status_code=404, detail="Batch not found")
+        merged = jobs.serialize_batch(db, batch)["summary"].get("merged")
+        return merged["table_path"] if merged else None
+
+    if file_id is not None:
+        if not db.query(FileUpload).filter(FileUpload.id == file_id).first():
+            raise HTTPException(status_code=404, detail="File not found")
+        output = output_store.latest_output_for_file(db, file_id)
+        return output.table_path if output else None
+
+    raise HTTPException(
+        status_code=400, detail="output_id, file_id or batch_id is required"
+    )
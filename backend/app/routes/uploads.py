@@ -1,39 +1,46 @@
 import datetime
 import os
-import uuid
-
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from typing import Optional
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+)
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.db import SessionLocal
+from app.core.lazy import lazy_import
+from app.core.security import Principal, get_optional_user
+from app.db import get_db
 from app.models import FileUpload
+from app.services.storage import store_upload
+from app.services import upload_listing
 
-# Asegurar que la carpeta de uploads exista
-if not os.path.exists(settings.upload_dir):
-    os.makedirs(settings.upload_dir, exist_ok=True)
+# Cargan pandas/pyarrow: se importan en el primer upload (ver app.core.lazy)
+column_profile = lazy_import("app.services.column_profile")
+ingest_cache = lazy_import("app.services.ingest_cache")
 
 router = APIRouter(prefix="/uploads", tags=["uploads"])
 
 
-# -------------------------------
-# Dependency de DB
-# -------------------------------
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # -------------------------------
 # POST /uploads/ → Subir archivo
 # -------------------------------
 
 @router.post("/")
-async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_file(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    user: Optional[Principal] = Depends(get_optional_user),
+):
     allowed_extensions = {"csv", "xls", "xlsx"}
     filename = file.filename or ""
     extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
@@ -41,20 +48,33 @@ async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db
     if extension not in allowed_extensions:
         raise HTTPException(status_code=400, detail="Unsupported file type")
 
-    # Generar nombre único
-    unique_name = f"{uuid.uuid4()}.{extension}"
-    storage_path = os.path.join(settings.upload_dir, unique_name)
+    # Guardar archivo por bloques (hash SHA-256 en la misma pasada)
+    stored = await run_in_threadpool(
+        store_upload, file.file, settings.upload_dir, extension
+    )
+    storage_path = stored.storage_path
+    ingest_cache.remember_content_hash(storage_path, stored.content_hash)
 
-    # Guardar archivo
-    with open(storage_path, "wb") as buffer:
-        contents = await file.read()
-        buffer.write(contents)
+    # Mismo contenido ya subido: se reutiliza el registro existente
+    existing = (
+        db.query(FileUpload)
+        .filter(FileUpload.content_hash == stored.content_hash)
+        .order_by(FileUpload.id)
+        .first()
+    )
+    if existing and os.path.exists(existing.storage_path):
+        return {
+            "id": existing.id,
+            "filename": existing.filename_original,
+            "duplicate": True,
+        }
 
     # Registrar archivo en DB
     upload_record = FileUpload(
         filename_original=filename,
         storage_path=storage_path,
-        uploaded_by_user_id=None,
+        content_hash=stored.content_hash,
+        uploaded_by_user_id=user.id if user else None,
         uploaded_at=datetime.datetime.now(datetime.timezone.utc),
     )
 
@@ -62,7 +82,10 @@ async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db
     db.commit()
     db.refresh(upload_record)
 
-    return {"id": upload_record.id, "filename": filename}
+    # Convertir a sidecar Arrow y perfilar después de responder (caché de ingesta)
+    background_tasks.add_task(column_profile.warm_profile, storage_path, upload_record.id)
+
+    return {"id": upload_record.id, "filename": filename, "duplicate": False}
 
 
 # -------------------------------
@@ -70,25 +93,48 @@ async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db
 # -------------------------------
 
 @router.get("/", summary="List uploaded files")
-def list_uploads(db: Session = Depends(get_db)):
+def list_uploads(
+    response: Response,
+    uploaded_by: Optional[int] = None,
+    uploaded_from: Optional[datetime.datetime] = None,
+    uploaded_to: Optional[datetime.datetime] = None,
+    filename_prefix: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=upload_listing.MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
     """
-    Devuelve los últimos archivos subidos al sistema.
+    Devuelve los archivos subidos, los más recientes primero, por páginas.
     El frontend usará esta ruta para permitir seleccionar un archivo ya cargado.
-    """
-    files = (
-        db.query(FileUpload)
-        .order_by(FileUpload.uploaded_at.desc())
-        .limit(50)
-        .all()
-    )
 
-    return [
-        {
-            "id": f.id,
-            "filename_original": f.filename_original,
-            "storage_path": f.storage_path,
-            "uploaded_at": f.uploaded_at,
-        }
-        for f in files
-    ]
+    Sin `cursor` ni `limit` responde como antes: la lista de los últimos
+    DEFAULT_LIMIT archivos, con el cursor de la página siguiente en el header
+    X-Next-Cursor. Con `cursor` o `limit` responde
+    {"items": [...], "next_cursor": ...}.
 
+    - uploaded_by: ID del usuario que subió el archivo
+    - uploaded_from / uploaded_to: rango [desde, hasta) de uploaded_at (sin
+      zona horaria se toma como UTC)
+    - filename_prefix: el nombre original empieza con este texto
+    - cursor: `next_cursor` de la página anterior (null = no hay más)
+    """
+    try:
+        files, next_cursor = upload_listing.list_uploads(
+            db,
+            uploaded_by=uploaded_by,
+            uploaded_from=uploaded_from,
+            uploaded_to=uploaded_to,
+            filename_prefix=filename_prefix,
+            cursor=cursor,
+            limit=limit or upload_listing.DEFAULT_LIMIT,
+        )
+    except upload_listing.CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    items = [upload_listing.serialize_upload(f) for f in files]
+    if cursor is None and limit is None:
+        # forma original (lista): los clientes existentes no cambian
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return items
+    return {"items": items, "next_cursor": next_cursor}
@@ -1,21 +1,62 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-import bcrypt
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app import models
+from app.config import settings
+from app.core.lazy import lazy_import
+
+# Se cargan en el primer login (ver app.core.lazy)
+bcrypt = lazy_import("bcrypt")
+jwt = lazy_import("jose.jwt")
 
 # Configuración
 SECRET_KEY = "tu_clave_secreta_super_segura_cambiala_en_produccion"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 horas
 
+# bcrypt tarda ~0.3 s por verificación: corre en un pool propio y acotado
+# (bcrypt libera el GIL) para no bloquear el event loop ni agotar el
+# threadpool que usan los uploads
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_executor_lock = threading.Lock()
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.auth_hash_workers),
+                thread_name_prefix="bcrypt",
+            )
+        return _hash_executor
+
+def shutdown_hash_executor() -> None:
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is not None:
+            _hash_executor.shutdown(wait=False, cancel_futures=True)
+            _hash_executor = None
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 def get_password_hash(password: str) -> str:
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_hash_executor(), verify_password, plain_password, hashed_password
+    )
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_executor(), get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -28,17 +69,25 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def authenticate_user(db: Session, email: str, password: str):
     user = db.query(models.User).filter(models.User.email == email).first()
-    if not user:
+    if not user or not user.hashed_password:
         return False
     if not verify_password(password, user.hashed_password):
         return False
     return user
 
+async def authenticate_user_async(db: Session, email: str, password: str):
+    """Igual que authenticate_user, sin bloquear el event loop."""
+    user = await run_in_threadpool(get_user_by_email, db, email)
+    if not user or not user.hashed_password:
+        return False
+    if not await verify_password_async(password, user.hashed_password):
+        return False
+    return user
+
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, email: str, password: str, full_name: str, role: str):
-    hashed_password = get_password_hash(password)
+def add_user(db: Session, email: str, hashed_password: str, full_name: str, role: str):
     db_user = models.User(
         email=email,
         hashed_password=hashed_password,
@@ -48,5 +97,7 @@ def create_user(db: Session, email: str, password: str, full_name: str, role: st
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
-    return db_userø
+    return db_user
 
+def create_user(db: Session, email: str, password: str, full_name: str, role: str):
+    return add_user(db, email, get_password_hash(password), full_name, role)
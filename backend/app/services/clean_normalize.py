@@ -1,14 +1,33 @@
+from typing import Dict, Optional
+
 from app.services.clean_preview import generate_preview
-from app.services.column_normalizer import normalize_columns
+from app.services.column_normalizer import normalize_column_name
+
 
+def build_normalization_preview(
+    file_path: str,
+    preview: Optional[dict] = None,
+    file_id: Optional[int] = None,
+    aliases: Optional[Dict[str, str]] = None,
+) -> dict:
+    """
+    Construye el mapeo columnas originales -> normalizadas.
 
-def build_normalization_preview(file_path: str) -> dict:
-    preview = generate_preview(file_path)
+    Si se pasa `preview` (resultado de generate_preview) se reutiliza y el
+    archivo no se vuelve a leer. `aliases` ({encabezado: columna canónica},
+    ver column_aliases) reemplaza la normalización de esos encabezados.
+    """
+    if preview is None:
+        preview = generate_preview(file_path, file_id=file_id)
     original_columns = preview["columns"]
-    normalized_columns = normalize_columns(original_columns)
+    aliases = aliases or {}
+    normalized_columns = [
+        aliases.get(str(column)) or normalize_column_name(str(column))
+        for column in original_columns
+    ]
 
     return {
         "original": original_columns,
         "normalized": normalized_columns,
+        "aliases": aliases,
     }
-
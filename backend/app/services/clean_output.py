@@ -1,10 +1,24 @@
+import json
+import os
+import re
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
-import unicodedata
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
+from app.config import settings
+from app.core.metrics import iter_stage, stage
+from app.services.clean_rules import RulePlan, default_plan, remove_accents
 from app.services.column_normalizer import normalize_column_name
+from app.services.dedup import DEDUP_POLICIES, find_duplicates
+from app.services.csv_ingest import read_csv
+from app.services.schema_sniff import read_sample, sniff_dtypes
+from app.services.xlsx_writer import concat_buffer, write_xlsx
+from app.services.ingest_cache import file_content_hash, load_frame, open_cached_table
 
 
 class OutputEngineError(Exception):
@@ -12,146 +26,800 @@ class OutputEngineError(Exception):
     pass
 
 
+class DuplicateKeysError(OutputEngineError):
+    """Claves repetidas con la política "fail"; `report` trae el detalle."""
+
+    def __init__(self, report: Dict[str, Any]):
+        super().__init__(
+            f"Duplicate keys in {', '.join(report['key_columns'])}: "
+            f"{report['duplicate_groups']} keys repeated "
+            f"({report['duplicate_rows']} extra rows)"
+        )
+        self.report = report
+
+    def __reduce__(self):
+        # se lanza en el proceso worker y se recibe en el de la API
+        return type(self), (self.report,)
+
+
+def _report(progress: Optional[Callable[[float], None]], value: float) -> None:
+    if progress is not None:
+        progress(value)
+
+
+def _normalized_column_map(
+    source_columns: List, aliases: Optional[Dict[str, str]] = None, fallbacks: bool = True
+) -> Dict[str, str]:
+    """
+    Mapa de columnas normalizadas -> nombre original.
+
+    `aliases` ({encabezado original: columna canónica}, ver column_aliases)
+    asigna esos encabezados a su columna canónica; con `fallbacks` su nombre
+    normalizado sigue sirviendo si ninguna otra columna lo usa. Sin
+    `fallbacks` cada columna del archivo aparece una sola vez (para listar
+    columnas, no para buscarlas).
+    """
+    normalized_map: Dict[str, str] = {}
+    for col in source_columns:
+        norm = normalize_column_name(str(col))
+        if aliases:
+            norm = aliases.get(str(col), norm)
+        # si se repite una normalización, conservamos la primera
+        if norm not in normalized_map:
+            normalized_map[norm] = col
+    if aliases and fallbacks:
+        for col in source_columns:
+            normalized_map.setdefault(normalize_column_name(str(col)), col)
+    return normalized_map
+
+
+def _check_selected_columns(
+    selected_columns: List[str], normalized_map: Dict[str, str]
+) -> None:
+    """Verifica que todas las columnas seleccionadas existen."""
+    missing = [name for name in selected_columns if name not in normalized_map]
+    if missing:
+        raise OutputEngineError(
+            f"Columns not present in source file: {', '.join(missing)}"
+        )
+
+
+def _check_dedup(dedup: Optional[Dict[str, Any]], selected_columns: List[str]) -> None:
+    """Verifica las opciones de deduplicación antes de leer el archivo."""
+    if dedup is None:
+        return
+    if dedup.get("policy") not in DEDUP_POLICIES:
+        raise OutputEngineError(
+            f"Invalid dedup policy (expected one of: {', '.join(DEDUP_POLICIES)})"
+        )
+    key_columns = dedup.get("key_columns") or []
+    if not key_columns:
+        raise OutputEngineError("Dedup key_columns must not be empty")
+    missing = [name for name in key_columns if name not in selected_columns]
+    if missing:
+        raise OutputEngineError(
+            f"Dedup key columns must be selected: {', '.join(missing)}"
+        )
+
+
+def _dedup_table(
+    table: pa.Table, dedup: Dict[str, Any]
+) -> Tuple[Dict[str, Any], Optional[pa.Array]]:
+    """Reporte de duplicados y máscara de filas a conservar (ver dedup)."""
+    report, keep = find_duplicates(table, dedup["key_columns"], dedup["policy"])
+    if dedup["policy"] == "fail" and report["duplicate_rows"]:
+        raise DuplicateKeysError(report)
+    return report, keep
+
+
+# Variantes de descarga: nombre -> (sufijo del archivo, media type)
+VARIANTS: Dict[str, Tuple[str, str]] = {
+    "semicolon": ("_SEMICOLON.csv", "text/csv; charset=utf-8"),
+    "comma": ("_COMMA.csv", "text/csv; charset=utf-8"),
+    "xlsx": (
+        ".xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "ndjson": (".ndjson", "application/x-ndjson"),
+}
+
+# Delimitador de las variantes CSV
+CSV_DELIMITERS: Dict[str, str] = {"semicolon": ";", "comma": ","}
+
+# Variantes de texto: se pueden generar al vuelo (stream) y precomprimir.
+# XLSX y Parquet ya son formatos comprimidos y se escriben siempre a archivo.
+TEXT_VARIANTS = ("semicolon", "comma", "ndjson")
+
+# Filas por row group en la variante Parquet
+_PARQUET_ROW_GROUP_ROWS = 1_000_000
+# Filas por bloque al generar NDJSON
+_NDJSON_BLOCK_ROWS = 65_536
+# Caracteres de control: JSON exige escaparlos (\u00XX)
+_JSON_CONTROL_RE = r"[\x00-\x1f]"
+
+
+# Codificaciones precomprimidas, en orden de preferencia:
+# nombre HTTP (Content-Encoding) -> (codec de Arrow, sufijo del archivo)
+ENCODINGS: Dict[str, Tuple[str, str]] = {
+    "zstd": ("zstd", ".zst"),
+    "gzip": ("gzip", ".gz"),
+}
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _table_path(path: Path, output_dir: Optional[str] = None) -> Path:
+    """Ruta de la tabla intermedia (Arrow IPC) de la salida limpia."""
+    outputs_dir = Path(output_dir or settings.output_dir)
+    outputs_dir.mkdir(parents=True, exist_ok=True)
+    return outputs_dir / f"{path.stem}.arrow"
+
+
+def variant_path(table_path: str, variant: str) -> Path:
+    """Ruta del archivo de la variante, junto a la tabla intermedia."""
+    suffix, _ = VARIANTS[variant]
+    table = Path(table_path)
+    return table.with_name(f"{table.stem}{suffix}")
+
+
+def tmp_path(target: Path) -> Path:
+    """Ruta temporal única por proceso para escribir y luego renombrar."""
+    return target.with_name(f"{target.name}.{os.getpid()}.part")
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _image_token(series: pd.Series) -> pd.Series:
+    """
+    Parte del nombre de imagen: sin acentos, espacios -> '_' y en mayúsculas.
+
+    Se factoriza la columna y la limpieza se aplica una vez por valor distinto;
+    luego se expande con los códigos (take vectorizado).
+    """
+    text = series.astype(str)
+    codes, uniques = pd.factorize(text, use_na_sentinel=False)
+    tokens = np.array(
+        [_WHITESPACE_RE.sub("_", remove_accents(str(value))).upper() for value in uniques],
+        dtype=object,
+    )
+    return pd.Series(tokens[codes], index=series.index, dtype=object)
+
+
+def _render_text(series: pd.Series) -> pa.Array:
+    """
+    Convierte cada celda al texto que escribiría `to_csv` (vacío para nulos).
+
+    La tabla intermedia guarda este texto, así cualquier variante (`;` o `,`)
+    se produce después sin volver a formatear valores, y con los mismos bytes
+    que daba escribir el DataFrame original.
+
+    Texto y enteros se convierten dentro de Arrow (mismo resultado que
+    `str()`), los floats una vez por valor distinto, y booleanos, fechas y
+    columnas mezcladas pasan por `str()` de cada valor.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        is_text = pd.api.types.infer_dtype(dtype.categories, skipna=True) == "string"
+    elif dtype == object:
+        is_text = pd.api.types.infer_dtype(series, skipna=True) in {"string", "empty"}
+    else:
+        is_text = isinstance(dtype, pd.StringDtype)
+
+    if is_text or (pd.api.types.is_integer_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)):
+        array = pa.array(series, from_pandas=True)
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        return pc.fill_null(pc.cast(array, pa.string()), "")
+
+    if isinstance(dtype, np.dtype) and dtype.kind == "f":
+        values = series.to_numpy()
+        # precios y descuentos se repiten: str() una vez por valor distinto
+        # (factorize une 0.0 y -0.0, que se escriben distinto)
+        if not np.any(np.signbit(values) & (values == 0)):
+            codes, uniques = pd.factorize(values)
+            labels = pa.array([str(value) for value in uniques.tolist()], type=pa.string())
+            indices = pa.array(codes, mask=codes < 0)
+            return pc.fill_null(labels.take(indices), "")
+
+    text = series.astype(str).astype(object)
+    text[series.isna().to_numpy()] = ""
+    return pa.array(text, type=pa.string())
+
+
+def to_text_table(result_df: pd.DataFrame) -> pa.Table:
+    """DataFrame limpio -> tabla Arrow de texto (formato de la tabla intermedia)."""
+    schema = pa.schema([(str(col), pa.string()) for col in result_df.columns])
+    arrays = [_render_text(result_df.iloc[:, index]) for index in range(result_df.shape[1])]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _build_result_frame(
+    df: pd.DataFrame,
+    normalized_map: Dict[str, str],
+    selected_columns: List[str],
+    generate_image_names: bool,
+    plan: Optional[RulePlan] = None,
+) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Construye el DataFrame de salida con cabeceras NORMALIZADAS y aplica las
+    reglas del plan (por defecto, las de `clean_rules.DEFAULT_RULES`).
+    Trabaja fila a fila en forma vectorizada, así que puede aplicarse a un
+    bloque (chunk) del archivo.
+    """
+    result_columns: List[str] = []
+    result_data: Dict[str, pd.Series] = {}
+
+    for norm_name in selected_columns:
+        source_col = normalized_map[norm_name]
+        result_columns.append(norm_name)
+        result_data[norm_name] = df[source_col]
+
+    result_df = pd.DataFrame(result_data, columns=result_columns)
+
+    # Reglas por columna (DESCUENTO en %, IDs como texto, mayúsculas...)
+    with stage("rules", rows=len(result_df)):
+        (plan or default_plan()).apply(result_df)
+
+    # (Opcional) Columna de nombre de imagen
+    if generate_image_names:
+        required = ["PLU", "ID_MARCA", "DESC_PLU", "CONTENIDO"]
+        if all(col in result_df.columns for col in required):
+            with stage("image_names", rows=len(result_df)):
+                result_df["IMAGEN"] = (
+                    result_df["PLU"].astype(str).str.zfill(6)
+                    + "_"
+                    + _image_token(result_df["ID_MARCA"])
+                    + "_"
+                    + _image_token(result_df["DESC_PLU"])
+                    + "_"
+                    + _image_token(result_df["CONTENIDO"])
+                    + ".psd"
+                )
+            if "IMAGEN" not in result_columns:
+                result_columns.append("IMAGEN")
+
+    return result_df, result_columns
+
+
+def source_headers(
+    file_path: str, file_id: Optional[int] = None, sheets: Optional[List[str]] = None
+) -> List:
+    """
+    Encabezados originales del archivo (del sidecar Arrow si ya existe; si
+    no, solo se lee la cabecera).
+    """
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Source file not found: {file_path}")
+
+    # El sidecar de la caché corresponde a la primera hoja
+    cached_table = None if sheets else open_cached_table(file_path, file_id)
+    if cached_table is not None:
+        if cached_table.num_rows == 0:
+            raise OutputEngineError("Source file is empty")
+        return list(cached_table.column_names)
+    return list(read_sample(path, nrows=0, sheets=sheets).columns)
+
+
+def source_column_map(
+    file_path: str,
+    file_id: Optional[int] = None,
+    sheets: Optional[List[str]] = None,
+    aliases: Optional[Dict[str, str]] = None,
+    fallbacks: bool = True,
+) -> Dict[str, str]:
+    """
+    Columnas normalizadas (o canónicas según `aliases`) -> nombre original.
+    Ver `_normalized_column_map` para `fallbacks`.
+    """
+    return _normalized_column_map(
+        source_headers(file_path, file_id, sheets), aliases, fallbacks
+    )
+
+
+def clean_frame(
+    file_path: str,
+    selected_columns: List[str],
+    generate_image_names: bool = False,
+    file_id: Optional[int] = None,
+    plan: Optional[RulePlan] = None,
+    sheets: Optional[List[str]] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    aliases: Optional[Dict[str, str]] = None,
+) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Lee las columnas elegidas del archivo (en memoria) y les aplica la
+    limpieza. Devuelve el DataFrame limpio y sus columnas finales.
+    """
+    normalized_map = source_column_map(file_path, file_id, sheets, aliases)
+    _check_selected_columns(selected_columns, normalized_map)
+
+    # Solo se leen las columnas seleccionadas (del sidecar o del original)
+    needed = list(dict.fromkeys(normalized_map[name] for name in selected_columns))
+    with stage("read") as info:
+        df = load_frame(file_path, columns=needed, file_id=file_id, sheets=sheets)
+        info.rows = len(df)
+    if df.empty:
+        raise OutputEngineError("Source file is empty")
+
+    _report(progress, 0.4)
+
+    # Construir DataFrame de salida con cabeceras NORMALIZADAS
+    return _build_result_frame(
+        df, normalized_map, selected_columns, generate_image_names, plan
+    )
+
+
 def generate_clean_outputs(
     file_path: str,
     selected_columns: List[str],
     generate_image_names: bool = False,
+    file_id: Optional[int] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    output_dir: Optional[str] = None,
+    plan: Optional[RulePlan] = None,
+    sheets: Optional[List[str]] = None,
+    dedup: Optional[Dict[str, Any]] = None,
+    aliases: Optional[Dict[str, str]] = None,
 ) -> Dict:
     """
-    Genera archivos CSV limpios (semicolon y comma) a partir del archivo origen.
+    Genera la salida limpia a partir del archivo origen.
+
+    La tabla limpia se serializa una sola vez a una tabla intermedia Arrow
+    (celdas ya formateadas como texto). Los archivos de cada variante (CSV
+    semicolon / comma, XLSX, Parquet, NDJSON) se producen bajo demanda con
+    `materialize_variant`.
 
     - file_path: ruta al archivo original (por ejemplo 'uploads/uuid.xlsx')
     - selected_columns: lista de nombres NORMALIZADOS que el usuario eligió
       (por ejemplo ['PLU', 'DESC_PLU', 'PRECIO_OFERTA'])
     - generate_image_names: si True, intenta crear columna IMAGEN.
+    - file_id: ID del FileUpload; junto al hash del contenido identifica el
+      sidecar Arrow de la caché de ingesta.
+    - progress: callback opcional que recibe el avance (0.0 a 1.0).
+    - output_dir: carpeta de salida (por defecto settings.output_dir); el
+      almacén de salidas pasa aquí la carpeta de la clave de caché.
+    - plan: reglas compiladas (clean_rules); None = reglas por defecto.
+    - sheets: hojas de un XLSX a procesar (se concatenan); None = primera.
+    - dedup: {"key_columns": [...], "policy": "keep_first" | "keep_last" |
+      "fail"}; detecta claves repetidas y valores en conflicto sobre la
+      salida ya limpia (ver app.services.dedup). None = sin deduplicar.
+    - aliases: {encabezado original: columna canónica} resueltos con
+      column_aliases; None = solo normalización.
 
-W    Retorna:
+    Retorna:
       {
         "rows": <int>,
         "columns": [lista de columnas finales],
-        "semicolon_path": "outputs/..._SEMICOLON.csv",
-        "comma_path": "outputs/..._COMMA.csv",
+        "table_path": "outputs/<clave>/....arrow",
+        "dedup": <reporte>,  # solo si se pidió
       }
 
     Lanza:
-      FileNotFoundError, OutputEngineError
+      FileNotFoundError, OutputEngineError (DuplicateKeysError con "fail")
     """
     path = Path(file_path)
+    _check_dedup(dedup, selected_columns)
 
     if not path.exists():
         raise FileNotFoundError(f"Source file not found: {file_path}")
 
-    # 1) Cargar archivo con pandas
+    # Tipos de archivo soportados
     suffix = path.suffix.lower()
-    if suffix in {".xlsx", ".xls"}:
-        df = pd.read_excel(path, engine="openpyxl")
-    elif suffix == ".csv":
-        df = pd.read_csv(path, encoding="utf-8")
-    else:
+    if suffix not in {".xlsx", ".xls", ".csv"}:
         raise OutputEngineError(f"Unsupported file type: {suffix}")
 
-    if df.empty:
-        raise OutputEngineError("Source file is empty")
+    # CSV grandes: pipeline por bloques con memoria acotada
+    if suffix == ".csv" and path.stat().st_size >= settings.stream_csv_threshold_bytes:
+        return _generate_streaming_csv(
+            path,
+            selected_columns,
+            generate_image_names,
+            progress,
+            output_dir,
+            plan,
+            dedup,
+            aliases,
+        )
 
-    # 2) Mapa de columnas normalizadas -> nombre original
-    normalized_map: Dict[str, str] = {}
-    for col in df.columns:
-        norm = normalize_column_name(str(col))
-        # si se repite una normalización, conservamos la primera
-        if norm not in normalized_map:
-            normalized_map[norm] = col
+    result_df, result_columns = clean_frame(
+        file_path,
+        selected_columns,
+        generate_image_names,
+        file_id,
+        plan,
+        sheets,
+        progress,
+        aliases,
+    )
 
-    # 3) Verificar que todas las columnas seleccionadas existen
-    missing = [name for name in selected_columns if name not in normalized_map]
-    if missing:
-        raise OutputEngineError(
-            f"Columns not present in source file: {', '.join(missing)}"
-        )
+    _report(progress, 0.7)
 
-    # 4) Construir DataFrame de salida con cabeceras NORMALIZADAS
-    result_columns: List[str] = []
-    result_data: Dict[str, pd.Series] = {}
+    # Serializar una sola vez a la tabla intermedia (escritura atómica)
+    table_path = _table_path(path, output_dir)
+    with stage("render", rows=len(result_df)):
+        table = to_text_table(result_df)
 
-    for norm_name in selected_columns:
-        source_col = normalized_map[norm_name]
-        result_columns.append(norm_name)
-        result_data[norm_name] = df[source_col]
+    report = None
+    if dedup is not None:
+        with stage("dedup", rows=table.num_rows):
+            report, keep = _dedup_table(table, dedup)
+            if keep is not None:
+                table = table.filter(keep)
 
-    result_df = pd.DataFrame(result_data, columns=result_columns)
+    tmp = tmp_path(table_path)
+    with stage("write_table", rows=table.num_rows) as info:
+        with pa.OSFile(str(tmp), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        info.bytes = tmp.stat().st_size
+    os.replace(tmp, table_path)
+    _report(progress, 1.0)
 
-    # Convertir columna DESCUENTO si existe (de decimal a porcentaje)
-    if "DESCUENTO" in result_df.columns:
-        result_df["DESCUENTO"] = result_df["DESCUENTO"].apply(
-            lambda x: f"{float(x)*100:.0f}%" if pd.notna(x) and isinstance(x, (int, float)) and 0 <= x <= 1 else x
-        )
+    result = {
+        "rows": table.num_rows,
+        "columns": result_columns,
+        "table_path": str(table_path),
+    }
+    if report is not None:
+        result["dedup"] = report
+    return result
 
-    # Convertir columnas numéricas que deberían ser texto (IDs, PLU, etc.)
-    numeric_to_text_cols = ["ID_MARCA", "PLU", "ID_CATEGORIA", "ID_SUBCATEGORIA"]
-    for col in numeric_to_text_cols:
-        if col in result_df.columns:
-            result_df[col] = result_df[col].astype('Int64').astype(str)
 
-    # Convertir DESC_MARCA a Title Case (Primera Letra Mayúscula)
-    if "DESC_MARCA" in result_df.columns:
-        result_df["DESC_MARCA"] = result_df["DESC_MARCA"].astype(str).str.title()
+# ---------- Modo streaming para CSV grandes ----------
 
-    # Convertir DESC_PLU a Sentence case (solo primera letra mayúscula)
-    if "DESC_PLU" in result_df.columns:
-        result_df["DESC_PLU"] = result_df["DESC_PLU"].astype(str).str.lower().str.capitalize()
 
-    # Convertir CONTENIDO a minúsculas
-    if "CONTENIDO" in result_df.columns:
-        result_df["CONTENIDO"] = result_df["CONTENIDO"].astype(str).str.lower()
+def _unified_chunk_dtypes(
+    path: Path, usecols: List[str], chunksize: int, sniffed: Dict[str, Any]
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Pasada previa (solo columnas seleccionadas) que unifica el dtype numérico
+    de cada columna entre bloques, como hace pandas al leer el archivo entero:
+    un bloque int y otro float (por NaN) terminan ambos como float64, y si un
+    bloque trae texto la columna se lee como texto en todos. Sin esto el mismo
+    valor se escribiría "5" en un bloque y "5.0" (o "10%") en otro.
 
-    # 5) (Opcional) Columna de nombre de imagen
-    if generate_image_names:
-        required = ["PLU", "ID_MARCA", "DESC_PLU", "CONTENIDO"]
-        if all(col in result_df.columns for col in required):
-            # Función auxiliar para quitar acentos
-            def remove_accents(text):
-                import unicodedata
-                nfkd = unicodedata.normalize('NFKD', str(text))
-                return ''.join([c for c in nfkd if not unicodedata.combining(c)])
-            
-            result_df["IMAGEN"] = (
-                result_df["PLU"].astype(str).str.zfill(6)
-                + "_"
-                + result_df["ID_MARCA"]
-                .astype(str)
-                .apply(remove_accents)
-                .str.replace(r"\s+", "_", regex=True)
-                .str.upper()
-                + "_"
-                + result_df["DESC_PLU"]
-                .astype(str)
-                .apply(remove_accents)
-                .str.replace(r"\s+", "_", regex=True)
-                .str.upper()
-                + "_"
-                + result_df["CONTENIDO"]
-                .astype(str)
-                .apply(remove_accents)
-                .str.replace(r"\s+", "_", regex=True)
-                .str.upper()
-                + ".psd"
-            )
-            if "IMAGEN" not in result_columns:
-                result_columns.append("IMAGEN")
+    Las columnas que son texto en todos los bloques usan el dtype compacto
+    detectado en la muestra (`sniffed`, ver schema_sniff).
+
+    Devuelve también el total de filas (para reportar avance).
+    """
+    seen: Dict[str, set] = {col: set() for col in usecols}
+    total_rows = 0
+    for chunk in read_csv(path, usecols=usecols, chunksize=chunksize):
+        total_rows += len(chunk)
+        for col in usecols:
+            seen[col].add(chunk[col].dtype)
+
+    dtypes: Dict[str, Any] = {}
+    for col, kinds in seen.items():
+        if all(isinstance(dtype, pd.StringDtype) or dtype == object for dtype in kinds):
+            # Texto en todos los bloques: dtype compacto de la muestra
+            # (category / strings Arrow), nunca el Int64 de los IDs
+            if sniffed.get(col) not in (None, "Int64"):
+                dtypes[col] = sniffed[col]
+            continue
+        if len(kinds) < 2:
+            continue
+        numeric = [
+            dtype for dtype in kinds if isinstance(dtype, np.dtype) and dtype.kind in "iuf"
+        ]
+        if len(numeric) == len(kinds):
+            dtypes[col] = np.result_type(*kinds)
+        else:
+            # Algún bloque trae texto: el archivo entero se leería como texto
+            dtypes[col] = next(dtype for dtype in kinds if dtype not in numeric)
+    return dtypes, total_rows
+
+
+def _iter_csv_chunks(
+    path: Path, usecols: List[str], chunksize: int, dtypes: Dict[str, Any]
+) -> Iterator[pd.DataFrame]:
+    yield from read_csv(
+        path,
+        usecols=usecols,
+        dtype=dtypes or None,
+        chunksize=chunksize,
+    )
+
+
+def _generate_streaming_csv(
+    path: Path,
+    selected_columns: List[str],
+    generate_image_names: bool,
+    progress: Optional[Callable[[float], None]] = None,
+    output_dir: Optional[str] = None,
+    plan: Optional[RulePlan] = None,
+    dedup: Optional[Dict[str, Any]] = None,
+    aliases: Optional[Dict[str, str]] = None,
+) -> Dict:
+    """
+    Variante por bloques de generate_clean_outputs para CSV grandes.
+
+    Lee `settings.stream_chunk_rows` filas por vez, aplica las mismas
+    transformaciones que el camino en memoria y agrega cada bloque a la tabla
+    intermedia. El resultado es idéntico byte a byte al camino en memoria.
+
+    La deduplicación necesita ver todas las claves: se hace sobre la tabla ya
+    escrita (memory-map) y, si hay filas que quitar, se reescribe por lotes.
+    """
+    header = read_csv(path, nrows=0)
+    normalized_map = _normalized_column_map(list(header.columns), aliases)
+    _check_selected_columns(selected_columns, normalized_map)
+
+    usecols = list(dict.fromkeys(normalized_map[name] for name in selected_columns))
+    table_path = _table_path(path, output_dir)
+    tmp = tmp_path(table_path)
 
-    # 6) Guardar CSVs de salida
-    outputs_dir = Path("outputs")
-    outputs_dir.mkdir(exist_ok=True)
+    chunksize = settings.stream_chunk_rows
+    with stage("sniff") as info:
+        sniffed = sniff_dtypes(path, usecols=usecols)
+        dtypes, total_rows = _unified_chunk_dtypes(path, usecols, chunksize, sniffed)
+        info.rows = total_rows
+    _report(progress, 0.1)
+
+    rows = 0
+    result_columns: List[str] = list(selected_columns)
+    sink = pa.OSFile(str(tmp), "wb")
+    writer = None
+    try:
+        chunks = _iter_csv_chunks(path, usecols, chunksize, dtypes)
+        for chunk in iter_stage("read", chunks):
+            if chunk.empty:
+                continue
+            result_df, result_columns = _build_result_frame(
+                chunk, normalized_map, selected_columns, generate_image_names, plan
+            )
+            with stage("render", rows=len(result_df)):
+                table = to_text_table(result_df)
+            with stage("write_table", rows=table.num_rows):
+                if writer is None:
+                    writer = pa.ipc.new_file(sink, table.schema)
+                writer.write_table(table)
+            rows += len(result_df)
+            _report(progress, 0.1 + 0.9 * rows / max(total_rows, 1))
 
-    base_name = path.stem
-    semicolon_path = outputs_dir / f"{base_name}_SEMICOLON.csv"
-    comma_path = outputs_dir / f"{base_name}_COMMA.csv"
+        if rows == 0:
+            raise OutputEngineError("Source file is empty")
 
-    result_df.to_csv(semicolon_path, sep=";", index=False, encoding="utf-8-sig")
-    result_df.to_csv(comma_path, sep=",", index=False, encoding="utf-8-sig")
+        writer.close()
+        writer = None
+        sink.close()
+        report = None
+        if dedup is not None:
+            with stage("dedup", rows=rows):
+                rows, report = _dedup_table_file(tmp, dedup)
+        os.replace(tmp, table_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        sink.close()
+        if tmp.exists():
+            tmp.unlink()
 
-    return {
-        "rows": int(result_df.shape[0]),
+    result = {
+        "rows": rows,
         "columns": result_columns,
-        "semicolon_path": str(semicolon_path),
-        "comma_path": str(comma_path),
+        "table_path": str(table_path),
     }
+    if report is not None:
+        result["dedup"] = report
+    return result
+
+
+def _dedup_table_file(path: Path, dedup: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    """
+    Deduplica una tabla intermedia ya escrita. Devuelve las filas que quedan
+    y el reporte.
+    """
+    filtered = path.with_name(f"{path.name}.dedup")
+    try:
+        with pa.memory_map(str(path), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            report, keep = _dedup_table(table, dedup)
+            if keep is None:
+                return table.num_rows, report
+
+            offset = 0
+            with pa.OSFile(str(filtered), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    for batch in table.to_batches():
+                        writer.write_batch(batch.filter(keep.slice(offset, batch.num_rows)))
+                        offset += batch.num_rows
+            rows = table.num_rows - report["removed_rows"]
+        os.replace(filtered, path)
+    finally:
+        if filtered.exists():
+            filtered.unlink()
+    return rows, report
+
+
+# ---------- Variantes de descarga (bajo demanda) ----------
+
+
+def iter_variant_chunks(table_path: str, variant: str) -> Iterator[bytes]:
+    """
+    Genera el archivo de una variante de texto (TEXT_VARIANTS) por bloques
+    desde la tabla intermedia (memory-mapped), sin materializar el archivo
+    completo.
+    """
+    if variant == "ndjson":
+        yield from _iter_ndjson_chunks(table_path)
+        return
+
+    sep = CSV_DELIMITERS[variant]
+    with pa.memory_map(str(table_path), "r") as source:
+        reader = pa.ipc.open_file(source)
+        if reader.num_record_batches == 0:
+            header = pd.DataFrame(columns=reader.schema.names)
+            yield header.to_csv(sep=sep, index=False).encode("utf-8-sig")
+            return
+        for index in range(reader.num_record_batches):
+            frame = reader.get_batch(index).to_pandas()
+            text = frame.to_csv(sep=sep, index=False, header=index == 0)
+            yield text.encode("utf-8-sig" if index == 0 else "utf-8")
+
+
+def _json_strings(column: pa.Array) -> pa.Array:
+    """Contenido de un string JSON (sin comillas) para cada valor."""
+    text = pc.replace_substring(column, "\\", "\\\\")
+    text = pc.replace_substring(text, '"', '\\"')
+    if pc.any(pc.match_substring_regex(text, _JSON_CONTROL_RE)).as_py():
+        for code in range(0x20):
+            text = pc.replace_substring(text, chr(code), f"\\u{code:04x}")
+    return text
+
+
+def _iter_ndjson_chunks(table_path: str) -> Iterator[bytes]:
+    """
+    Un objeto JSON por fila ({"COLUMNA": "texto", ...}), por bloques. Las
+    líneas se arman con kernels de texto de Arrow, sin objetos por fila.
+    """
+    with pa.memory_map(str(table_path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+        keys = [json.dumps(name, ensure_ascii=False) for name in table.column_names]
+        # '{"A":"' valor '","B":"' valor ... '"}\n'
+        separators = ["{" + keys[0] + ':"'] + ['",' + key + ':"' for key in keys[1:]]
+        for batch in table.to_batches(max_chunksize=_NDJSON_BLOCK_ROWS):
+            if batch.num_rows == 0:
+                continue
+            parts = []
+            for separator, column in zip(separators, batch.columns):
+                parts += [separator, _json_strings(column)]
+            lines = pc.binary_join_element_wise(*parts, '"}\n', "")
+            yield concat_buffer(lines).to_pybytes()
+
+
+def _write_parquet(table_path: str, target: Path) -> None:
+    """
+    Parquet con diccionario por columna (las columnas de texto repiten
+    mucho: marcas, descripciones) y compresión zstd.
+    """
+    with pa.memory_map(str(table_path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+        pq.write_table(
+            table,
+            str(target),
+            row_group_size=_PARQUET_ROW_GROUP_ROWS,
+            use_dictionary=True,
+            compression="zstd",
+        )
+
+
+def _write_xlsx(table_path: str, target: Path) -> None:
+    with pa.memory_map(str(table_path), "r") as source:
+        write_xlsx(pa.ipc.open_file(source).read_all(), target)
+
+
+# Variantes que no se generan por bloques de texto sino con su propio writer
+_FILE_WRITERS: Dict[str, Callable[[str, Path], None]] = {
+    "parquet": _write_parquet,
+    "xlsx": _write_xlsx,
+}
+
+
+def materialize_variant(
+    table_path: str, variant: str, encoding: Optional[str] = None
+) -> Path:
+    """
+    Devuelve el archivo de la variante, generándolo la primera vez que se
+    pide.
+
+    Con `encoding` ('zstd' o 'gzip', solo variantes de texto) devuelve la
+    copia precomprimida, que se genera desde el archivo también la primera
+    vez. Las siguientes descargas reutilizan los archivos ya escritos.
+    """
+    target = variant_path(table_path, variant)
+    if not target.exists():
+        tmp = tmp_path(target)
+        try:
+            with stage(f"write_{variant}", operation="download") as info:
+                if variant in _FILE_WRITERS:
+                    _FILE_WRITERS[variant](table_path, tmp)
+                else:
+                    with open(tmp, "wb") as out:
+                        for block in iter_variant_chunks(table_path, variant):
+                            out.write(block)
+                info.bytes = tmp.stat().st_size
+            os.replace(tmp, target)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    if encoding is None:
+        return target
+    if variant not in TEXT_VARIANTS:
+        raise OutputEngineError(f"Variant {variant} is not served compressed")
+
+    codec, suffix = ENCODINGS[encoding]
+    compressed = target.with_name(f"{target.name}{suffix}")
+    if not compressed.exists():
+        tmp = tmp_path(compressed)
+        try:
+            with stage(f"compress_{encoding}", operation="download") as info:
+                with open(target, "rb") as src, pa.CompressedOutputStream(str(tmp), codec) as out:
+                    for block in iter(lambda: src.read(_COPY_CHUNK_SIZE), b""):
+                        out.write(block)
+                info.bytes = tmp.stat().st_size
+            os.replace(tmp, compressed)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+    return compressed
+
+
+def variant_etag(table_path: str, variant: str, encoding: Optional[str] = None) -> str:
+    """
+    ETag fuerte de la representación: hash de la tabla intermedia (memoizado
+    por tamaño y mtime), variante y codificación.
+    """
+    tag = f"{file_content_hash(str(table_path))[:32]}-{variant}"
+    if encoding is not None:
+        tag = f"{tag}-{encoding}"
+    return f'"{tag}"'
+
+
+# ---------- Combinación de salidas (batch) ----------
+
+
+def merge_output_tables(sources: List[str], target: str) -> Dict:
+    """
+    Combina varias tablas intermedias en una sola, bloque a bloque.
+
+    Si las columnas difieren se usa la unión (en orden de aparición) y las
+    celdas que un archivo no tiene quedan vacías.
+    """
+    if not sources:
+        raise OutputEngineError("No outputs to merge")
+
+    schemas = []
+    for src in sources:
+        with pa.memory_map(str(src), "r") as source:
+            schemas.append(pa.ipc.open_file(source).schema)
+    columns = list(dict.fromkeys(name for schema in schemas for name in schema.names))
+    schema = pa.schema([(name, pa.string()) for name in columns])
+
+    target_path = Path(target)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = tmp_path(target_path)
+    rows = 0
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            for src in sources:
+                with pa.memory_map(str(src), "r") as source:
+                    reader = pa.ipc.open_file(source)
+                    for index in range(reader.num_record_batches):
+                        batch = reader.get_batch(index)
+                        arrays = [
+                            batch.column(name)
+                            if name in batch.schema.names
+                            else pa.array([""] * batch.num_rows, pa.string())
+                            for name in columns
+                        ]
+                        writer.write_batch(pa.record_batch(arrays, schema=schema))
+                        rows += batch.num_rows
+
+    os.replace(tmp, target_path)
+    return {"rows": rows, "columns": columns, "table_path": str(target_path)}
@@ -1,18 +1,102 @@
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from app.core.metrics import stage
+from app.services.csv_ingest import iter_rows, read_csv
+from app.services.ingest_cache import open_cached_table
+from app.services.schema_sniff import SNIFF_ROWS, dtypes_from_sample
+from app.services.xlsx_ingest import list_sheets, preview_workbook
 
-def generate_preview(file_path: str) -> dict:
+# Filas de datos que se leen para construir el sample (además de la cabecera)
+PREVIEW_SAMPLE_ROWS = 1
+# Sin sidecar, los tipos del sample se infieren de las mismas filas que
+# muestrea la lectura completa (schema_sniff), no solo de la primera
+PREVIEW_INFER_ROWS = SNIFF_ROWS
+
+
+XLSX_SUFFIXES = {".xlsx", ".xls"}
+
+
+def _read_head(path: Path, nrows: int) -> Tuple[pd.DataFrame, Optional[List[Dict]]]:
+    """
+    Lee solo la cabecera y las primeras `nrows` filas del archivo. Para un
+    XLSX devuelve además sus hojas (list_sheets), del mismo libro abierto.
+    """
+    suffix = path.suffix.lower()
+
+    if suffix in XLSX_SUFFIXES:
+        # openpyxl en modo read-only; la lectura se detiene en nrows
+        return preview_workbook(path, nrows)
+    if suffix == ".csv":
+        return read_csv(path, nrows=nrows), None
+
+    raise ValueError(f"Unsupported file type: {suffix}")
+
+
+def _typed_like_cache(data_frame: pd.DataFrame) -> pd.DataFrame:
+    """IDs enteros como Int64, igual que al generar el sidecar (read_with_dtypes)."""
+    for name, dtype in dtypes_from_sample(data_frame).items():
+        if dtype == "Int64":
+            try:
+                data_frame[name] = data_frame[name].astype("Int64")
+            except (ValueError, TypeError):
+                pass
+    return data_frame
+
+
+def _sample_row(data_frame: pd.DataFrame) -> Dict[str, Any]:
+    """Primera fila con valores de Python (None los nulos), con o sin sidecar."""
+    sample = {}
+    for column in data_frame.columns:
+        value = data_frame[column].iloc[0]
+        if pd.isna(value):
+            value = None
+        elif isinstance(value, np.generic):
+            value = value.item()
+        sample[column] = value
+    return sample
+
+
+def _count_csv_rows(path: Path) -> int:
+    """Cuenta filas de datos de un CSV sin construir un DataFrame."""
+    reader = iter_rows(path)
+    next(reader, None)  # cabecera
+    # pandas ignora líneas en blanco (skip_blank_lines=True)
+    return sum(1 for row in reader if row)
+
+
+def generate_preview(
+    file_path: str,
+    sample_rows: int = PREVIEW_SAMPLE_ROWS,
+    file_id: Optional[int] = None,
+) -> dict:
     """
     Generate a preview of the provided CSV or Excel file.
 
+    When the upload already has an Arrow sidecar in the ingest cache, columns,
+    row count and sample come from it. Otherwise only the header and the first
+    `PREVIEW_INFER_ROWS` rows are parsed (the rows the sidecar's dtypes are
+    sniffed from, so the sample has the same types either way); the row count
+    comes from a lightweight counting pass (CSV) or the workbook dimension
+    metadata (XLSX). An XLSX
+    workbook is opened once for the sample and the sheet list. A workbook
+    without dimension metadata reports `rows` as None (unknown) until the
+    sidecar built after the upload is available.
+
     Args:
         file_path: Path to a CSV or Excel file.
+        sample_rows: Minimum number of data rows to parse for the sample.
+        file_id: FileUpload ID, used to locate the ingest cache sidecar.
 
     Returns:
-        A dictionary containing the column names, row count, and the first row as a sample.
+        A dictionary containing the column names, row count (None if unknown), and the
+        first row as a sample.
+        For XLSX files it also lists every sheet (name, row count and columns) so the
+        caller can pick the sheets to process; columns, rows and sample describe the
+        first sheet.
 
     Raises:
         FileNotFoundError: If the file does not exist.
@@ -23,27 +107,38 @@ def generate_preview(file_path: str) -> dict:
     if not path.exists():
         raise FileNotFoundError(f"File not found: {file_path}")
 
-    suffix = path.suffix.lower()
-
-    if suffix in {".xlsx", ".xls"}:
-        data_frame = pd.read_excel(path, engine="openpyxl")
-    elif suffix == ".csv":
-        data_frame = pd.read_csv(path, encoding="utf-8")
-    else:
-        raise ValueError(f"Unsupported file type: {suffix}")
+    sheets: Optional[List[Dict]] = None
+    with stage("read_head", operation="preview"):
+        cached_table = open_cached_table(file_path, file_id)
+        if cached_table is not None:
+            data_frame = cached_table.slice(0, max(sample_rows, 1)).to_pandas()
+        else:
+            data_frame, sheets = _read_head(path, max(sample_rows, PREVIEW_INFER_ROWS))
+            data_frame = _typed_like_cache(data_frame)
 
     if data_frame.empty:
         raise ValueError("File is empty")
 
     columns: List[str] = list(data_frame.columns)
-    rows: int = len(data_frame)
-    sample: Dict = data_frame.iloc[0].to_dict()
+    rows: Optional[int]
+    if cached_table is not None:
+        rows = cached_table.num_rows
+    elif sheets is not None:
+        rows = sheets[0]["rows"]
+    else:
+        # CSV: conteo liviano; el XLSX trae las filas en sus hojas
+        with stage("count_rows", operation="preview") as info:
+            rows = _count_csv_rows(path)
+            info.rows = rows
+    sample = _sample_row(data_frame)
 
-    sample = {k: (None if pd.isna(v) else v) for k, v in sample.items()}
+    if sheets is None and path.suffix.lower() in XLSX_SUFFIXES:
+        with stage("list_sheets", operation="preview"):
+            sheets = list_sheets(path)
 
     return {
         "columns": columns,
         "rows": rows,
         "sample": sample,
+        "sheets": sheets,
     }
-
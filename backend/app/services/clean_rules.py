@@ -0,0 +1,296 @@
+"""
+Motor de reglas de limpieza.
+
+Las reglas por columna (porcentaje en DESCUENTO, IDs como texto, mayúsculas y
+minúsculas en descripciones...) se describen en `CleaningConfig.config_json`:
+
+    {
+      "rules": {
+        "DESCUENTO": ["percent"],
+        "PLU": ["int_text"],
+        "DESC_PLU": ["lower", "capitalize"],
+        "DESC_MARCA": ["strip", "title"],
+        "COD_BARRAS": ["int_text", {"op": "zfill", "width": 13}]
+      }
+    }
+
+Una config se compila una sola vez a un plan (`RulePlan`) que se cachea por
+(ID, versión). Al compilar, las operaciones de texto consecutivas se fusionan
+en una sola función: la columna se factoriza, la función se aplica una vez
+por valor distinto y el resultado se expande con los códigos, sin crear una
+Series intermedia por operación.
+
+Sin config se usan `DEFAULT_RULES`, que reproducen las reglas de siempre.
+"""
+
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy.orm import Session
+
+from app.models import CleaningConfig
+
+
+class RulesError(ValueError):
+    """Config de reglas inválida."""
+    pass
+
+
+class ConfigNotFoundError(LookupError):
+    pass
+
+
+DEFAULT_RULES: Dict[str, Any] = {
+    "rules": {
+        # De decimal a porcentaje
+        "DESCUENTO": ["percent"],
+        # Columnas numéricas que deberían ser texto (IDs, PLU, etc.)
+        "ID_MARCA": ["int_text"],
+        "PLU": ["int_text"],
+        "ID_CATEGORIA": ["int_text"],
+        "ID_SUBCATEGORIA": ["int_text"],
+        # Title Case (Primera Letra Mayúscula)
+        "DESC_MARCA": ["title"],
+        # Sentence case (solo primera letra mayúscula)
+        "DESC_PLU": ["lower", "capitalize"],
+        "CONTENIDO": ["lower"],
+    }
+}
+
+Step = Callable[[pd.Series], pd.Series]
+TextFunc = Callable[[str], str]
+
+
+# ---------- Operaciones de columna (dtype-aware) ----------
+
+
+def _discount_label(value) -> object:
+    if pd.notna(value) and isinstance(value, (int, float)) and 0 <= value <= 1:
+        return f"{float(value)*100:.0f}%"
+    return value
+
+
+def format_discount(series: pd.Series) -> pd.Series:
+    """
+    Convierte DESCUENTO de decimal (0.25) a porcentaje ("25%").
+
+    Solo se formatean los valores en [0, 1]; el resto queda igual. En columnas
+    numéricas se enmascara en bloque y cada valor distinto se formatea una sola
+    vez (los descuentos se repiten mucho).
+    """
+    if series.dtype.kind not in "biuf":
+        # Columna mixta (texto y números): se evalúa valor a valor
+        return series.apply(_discount_label)
+
+    mask = (series.notna() & series.between(0, 1)).fillna(False).astype(bool)
+    if not mask.any():
+        return series
+
+    in_range = series[mask]
+    labels = {value: f"{float(value)*100:.0f}%" for value in pd.unique(in_range)}
+    result = series.astype(object)
+    result[mask] = in_range.map(labels).to_numpy(dtype=object)
+    return result
+
+
+# dtype de `Series.astype(str)` (strings Arrow con NaN como nulo)
+_STR_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+
+
+def _int_text(series: pd.Series) -> pd.Series:
+    """`series.astype("Int64").astype(str)`, con la conversión hecha en Arrow."""
+    text = pc.cast(pa.array(series.astype("Int64"), from_pandas=True), pa.string())
+    return pd.Series(
+        text.to_pandas(types_mapper={pa.string(): _STR_DTYPE}.get).array,
+        index=series.index,
+        name=series.name,
+    )
+
+
+_COLUMN_OPS: Dict[str, Step] = {
+    "percent": format_discount,
+    "int_text": _int_text,
+}
+
+
+# ---------- Operaciones de texto (fusionables) ----------
+
+
+def remove_accents(text: str) -> str:
+    nfkd = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in nfkd if not unicodedata.combining(c))
+
+
+def _replace_op(params: Dict[str, Any]) -> TextFunc:
+    try:
+        pattern = re.compile(params["pattern"])
+    except KeyError:
+        raise RulesError("replace requires 'pattern'")
+    except re.error as e:
+        raise RulesError(f"Invalid replace pattern: {e}")
+    value = str(params.get("value", ""))
+    return lambda text: pattern.sub(value, text)
+
+
+def _zfill_op(params: Dict[str, Any]) -> TextFunc:
+    width = params.get("width")
+    if not isinstance(width, int) or width < 0:
+        raise RulesError("zfill requires a non-negative integer 'width'")
+    return lambda text: text.zfill(width)
+
+
+_TEXT_OPS: Dict[str, Callable[[Dict[str, Any]], TextFunc]] = {
+    "lower": lambda params: str.lower,
+    "upper": lambda params: str.upper,
+    "title": lambda params: str.title,
+    "capitalize": lambda params: str.capitalize,
+    "strip": lambda params: str.strip,
+    "remove_accents": lambda params: remove_accents,
+    "replace": _replace_op,
+    "zfill": _zfill_op,
+}
+
+SUPPORTED_OPS = sorted(set(_COLUMN_OPS) | set(_TEXT_OPS))
+
+
+def _fused_text_step(funcs: List[TextFunc]) -> Step:
+    """
+    Un solo paso para varias operaciones de texto seguidas: equivale a
+    `series.astype(str).str.f1().str.f2()...` (los nulos se conservan).
+    """
+
+    def apply(series: pd.Series) -> pd.Series:
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # las categorías ya son los valores distintos
+            codes = series.cat.codes.to_numpy()
+            uniques = series.cat.categories.astype(str)
+        else:
+            text = series if isinstance(series.dtype, pd.StringDtype) else series.astype(str)
+            codes, uniques = pd.factorize(text)
+        values = []
+        for value in uniques:
+            for func in funcs:
+                value = func(value)
+            values.append(value)
+
+        out = np.full(len(codes), np.nan, dtype=object)
+        present = codes >= 0
+        out[present] = np.array(values, dtype=object)[codes[present]]
+        return pd.Series(out, index=series.index, name=series.name)
+
+    return apply
+
+
+# ---------- Compilación ----------
+
+
+@dataclass(frozen=True)
+class RulePlan:
+    """Pasos por columna, con las operaciones de texto ya fusionadas."""
+
+    steps: Dict[str, Tuple[Step, ...]]
+
+    def apply(self, df: pd.DataFrame) -> None:
+        """Aplica el plan (en sitio) a las columnas presentes en `df`."""
+        for column, steps in self.steps.items():
+            if column not in df.columns:
+                continue
+            series = df[column]
+            for step in steps:
+                series = step(series)
+            df[column] = series
+
+
+def _parse_op(raw: Any) -> Tuple[str, Dict[str, Any]]:
+    if isinstance(raw, str):
+        return raw, {}
+    if isinstance(raw, dict) and isinstance(raw.get("op"), str):
+        return raw["op"], raw
+    raise RulesError(f"Invalid rule: {raw!r}")
+
+
+def compile_rules(config_json: Any) -> RulePlan:
+    """Valida la config y la compila a un `RulePlan`."""
+    if not isinstance(config_json, dict) or not isinstance(config_json.get("rules"), dict):
+        raise RulesError("Config must be an object with a 'rules' mapping")
+
+    steps: Dict[str, Tuple[Step, ...]] = {}
+    for column, ops in config_json["rules"].items():
+        if not isinstance(ops, list):
+            raise RulesError(f"Rules for {column} must be a list")
+
+        column_steps: List[Step] = []
+        pending_text: List[TextFunc] = []
+        for raw in ops:
+            name, params = _parse_op(raw)
+            if name in _TEXT_OPS:
+                pending_text.append(_TEXT_OPS[name](params))
+                continue
+            if name not in _COLUMN_OPS:
+                raise RulesError(
+                    f"Unknown rule '{name}' for {column}. Supported: {', '.join(SUPPORTED_OPS)}"
+                )
+            if pending_text:
+                column_steps.append(_fused_text_step(pending_text))
+                pending_text = []
+            column_steps.append(_COLUMN_OPS[name])
+        if pending_text:
+            column_steps.append(_fused_text_step(pending_text))
+
+        if column_steps:
+            steps[str(column)] = tuple(column_steps)
+
+    return RulePlan(steps=steps)
+
+
+# (config_id, versión) -> plan compilado; None = reglas por defecto
+_plan_cache: Dict[Optional[Tuple[int, int]], RulePlan] = {}
+_plan_lock = threading.Lock()
+
+
+def _cached_plan(key: Optional[Tuple[int, int]], config_json: Any) -> RulePlan:
+    with _plan_lock:
+        plan = _plan_cache.get(key)
+    if plan is not None:
+        return plan
+
+    plan = compile_rules(config_json)
+    with _plan_lock:
+        _plan_cache[key] = plan
+    return plan
+
+
+def default_plan() -> RulePlan:
+    return _cached_plan(None, DEFAULT_RULES)
+
+
+def get_config(db: Session, config_id: int) -> CleaningConfig:
+    config = db.query(CleaningConfig).filter(CleaningConfig.id == config_id).first()
+    if config is None:
+        raise ConfigNotFoundError(f"Cleaning config {config_id} not found")
+    return config
+
+
+def plan_for_config(config: CleaningConfig) -> RulePlan:
+    """Plan compilado de la config (se compila una vez por ID y versión)."""
+    return _cached_plan((config.id, config.version), config.config_json)
+
+
+def load_plan(db: Session, config_id: int, version: Optional[int] = None) -> RulePlan:
+    """
+    Plan de la config `config_id`. Si se pasa `version` y la config ya cambió
+    (p. ej. se editó mientras el job esperaba en cola) se rechaza.
+    """
+    config = get_config(db, config_id)
+    if version is not None and config.version != version:
+        raise RulesError(
+            f"Cleaning config {config_id} changed (version {version} -> {config.version})"
+        )
+    return plan_for_config(config)
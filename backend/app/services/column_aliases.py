@@ -0,0 +1,153 @@
+"""
+Índice de alias de columnas.
+
+La normalización (`normalize_column_name`) solo empareja encabezados que
+quedan exactamente iguales: "Precio Oferta ($)" queda PRECIO_OFERTA_ y no
+coincide con PRECIO_OFERTA. El índice asigna encabezados originales a su
+columna canónica en O(1) por `alias_key` (nombre normalizado sin guiones
+bajos repetidos ni en los extremos):
+
+- alias confirmados: mapeos que un usuario ya eligió (tabla column_aliases),
+  así un archivo nuevo con los mismos encabezados se mapea solo
+- columnas conocidas: si el alias_key coincide con una columna que usan las
+  reglas por defecto, se asigna a esa columna
+
+El índice se cachea en cada proceso y se recarga solo cuando la tabla
+cambia (cantidad de filas y última modificación).
+
+Los alias que afectan a una salida se resuelven al encolar el job y viajan
+en sus opciones (forman parte de la clave del almacén de salidas): cambiar
+un alias no sirve una salida cacheada con el mapeo anterior.
+"""
+
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import ColumnAlias
+from app.services.column_normalizer import alias_key, normalize_column_name
+
+
+class AliasError(ValueError):
+    pass
+
+
+@lru_cache(maxsize=None)
+def known_columns() -> FrozenSet[str]:
+    """Columnas canónicas conocidas sin necesidad de confirmar un alias."""
+    # clean_rules carga pandas/pyarrow: se importa al usarlo, no al arrancar
+    from app.services.clean_rules import DEFAULT_RULES
+
+    return frozenset(DEFAULT_RULES["rules"]) | {"PRECIO_OFERTA"}
+
+
+_cache_lock = threading.Lock()
+_cached_index: Optional[Tuple[Tuple[Any, ...], Dict[str, str]]] = None
+
+
+def _fingerprint(db: Session) -> Tuple[Any, ...]:
+    count, last_update = db.query(
+        func.count(ColumnAlias.id), func.max(ColumnAlias.updated_at)
+    ).one()
+    return count, str(last_update)
+
+
+def alias_index(db: Session) -> Dict[str, str]:
+    """alias_key -> columna canónica de los alias confirmados."""
+    global _cached_index
+    fingerprint = _fingerprint(db)
+    with _cache_lock:
+        if _cached_index is not None and _cached_index[0] == fingerprint:
+            return _cached_index[1]
+
+    index = dict(db.query(ColumnAlias.alias_key, ColumnAlias.canonical_name).all())
+    with _cache_lock:
+        _cached_index = (fingerprint, index)
+    return index
+
+
+def canonical_name(header: str, index: Dict[str, str]) -> str:
+    """Columna canónica del encabezado: alias confirmado, columna conocida o normalización."""
+    key = alias_key(header)
+    if key in index:
+        return index[key]
+    if key in known_columns():
+        return key
+    return normalize_column_name(header)
+
+
+def resolve_aliases(db: Session, headers: Iterable[Any]) -> Dict[str, str]:
+    """
+    Encabezados cuya columna canónica difiere de la normalización:
+    {encabezado original: columna canónica}.
+    """
+    index = alias_index(db)
+    resolved = {}
+    for header in headers:
+        header = str(header)
+        canonical = canonical_name(header, index)
+        if canonical != normalize_column_name(header):
+            resolved[header] = canonical
+    return resolved
+
+
+def learn_aliases(
+    db: Session, mapping: Dict[str, str], user_id: Optional[int] = None
+) -> List[ColumnAlias]:
+    """
+    Guarda (o actualiza) los mapeos confirmados {encabezado original:
+    columna canónica}. La columna canónica debe estar ya normalizada.
+    """
+    now = datetime.now(timezone.utc)
+    aliases = []
+    for header, canonical in mapping.items():
+        key = alias_key(str(header))
+        if not key:
+            raise AliasError(f"Header has no usable characters: {header!r}")
+        if not canonical or normalize_column_name(canonical) != canonical:
+            raise AliasError(
+                f"Canonical name must be a normalized column name: {canonical!r}"
+            )
+
+        alias = db.query(ColumnAlias).filter(ColumnAlias.alias_key == key).first()
+        if alias is None:
+            alias = ColumnAlias(alias_key=key)
+            db.add(alias)
+        alias.canonical_name = canonical
+        alias.header = str(header)
+        alias.confirmed_by_user_id = user_id
+        alias.updated_at = now
+        aliases.append(alias)
+
+    db.commit()
+    for alias in aliases:
+        db.refresh(alias)
+    return aliases
+
+
+def delete_alias(db: Session, alias_id: int) -> bool:
+    alias = db.query(ColumnAlias).filter(ColumnAlias.id == alias_id).first()
+    if alias is None:
+        return False
+    db.delete(alias)
+    db.commit()
+    return True
+
+
+def list_aliases(db: Session) -> List[ColumnAlias]:
+    return db.query(ColumnAlias).order_by(ColumnAlias.canonical_name, ColumnAlias.alias_key).all()
+
+
+def serialize_alias(alias: ColumnAlias) -> Dict[str, Any]:
+    return {
+        "id": alias.id,
+        "alias_key": alias.alias_key,
+        "canonical_name": alias.canonical_name,
+        "header": alias.header,
+        "confirmed_by_user_id": alias.confirmed_by_user_id,
+        "updated_at": alias.updated_at,
+    }
@@ -2,8 +2,18 @@
 
 import re
 import unicodedata
+from functools import lru_cache
 from typing import List
 
+_NEWLINES_RE = re.compile(r"[\r\n]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+_INVALID_CHARS_RE = re.compile(r"[^A-Z0-9_]")
+_UNDERSCORES_RE = re.compile(r"_+")
+
+# Distinct headers seen by a process are few (the same suppliers' files over
+# and over), so the cache rarely evicts
+_CACHE_SIZE = 8192
+
 
 def _remove_diacritics(value: str) -> str:
     """Return the string without diacritical marks."""
@@ -11,18 +21,29 @@ def _remove_diacritics(value: str) -> str:
     return "".join(char for char in normalized if unicodedata.category(char) != "Mn")
 
 
+@lru_cache(maxsize=_CACHE_SIZE)
 def normalize_column_name(name: str) -> str:
     """Normalize a column name to use only uppercase letters, numbers, and underscores."""
 
     text = _remove_diacritics(name)
-    text = re.sub(r"[\r\n]+", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
+    text = _NEWLINES_RE.sub(" ", text)
+    text = _WHITESPACE_RE.sub(" ", text).strip()
     text = text.upper()
     text = text.replace(" ", "_")
-    text = re.sub(r"[^A-Z0-9_]", "", text)
+    text = _INVALID_CHARS_RE.sub("", text)
     return text
 
 
+@lru_cache(maxsize=_CACHE_SIZE)
+def alias_key(name: str) -> str:
+    """
+    Looser form of the normalized name used to look up aliases: repeated and
+    leading/trailing underscores are dropped, so "Precio Oferta ($)" and
+    "PRECIO OFERTA" share the key PRECIO_OFERTA.
+    """
+    return _UNDERSCORES_RE.sub("_", normalize_column_name(name)).strip("_")
+
+
 def normalize_columns(columns: List[str]) -> List[str]:
     """Normalize a list of column names."""
     return [normalize_column_name(column) for column in columns]
@@ -0,0 +1,247 @@
+"""
+Perfil de columnas de un upload.
+
+Para cada columna: tipo detectado, nulos, valores distintos, mínimo/máximo y
+valores más frecuentes. Se calcula una vez tras el upload sobre la tabla
+Arrow de la caché de ingesta (kernels de pyarrow, sin pasar por objetos
+Python) y se guarda como JSON en `FileUpload.profile_json`, así el preview
+lo devuelve sin volver a leer los datos.
+
+En archivos grandes los distintos se estiman con HyperLogLog (error típico
+~1%) en vez de contarlos con una tabla hash de todos los valores; los
+valores más frecuentes solo se calculan para columnas de cardinalidad
+acotada (en un ID todos aparecen una vez y no aportan nada).
+"""
+
+import json
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models import FileUpload
+from app.services.data_grid import open_grid_table
+from app.services.ingest_cache import build_cache, open_cached_table
+
+logger = logging.getLogger(__name__)
+
+# Subir si cambia el contenido del perfil (los guardados se recalculan)
+PROFILE_VERSION = 1
+
+# Por encima de estas filas los distintos se estiman con HyperLogLog
+EXACT_DISTINCT_ROWS = 1_000_000
+# Registros del HyperLogLog = 2**HLL_PRECISION (error ~ 1.04 / sqrt(m))
+HLL_PRECISION = 14
+# Filas por lote al calcular hashes (acota la memoria temporal)
+_HASH_BATCH_ROWS = 1_000_000
+
+TOP_VALUES = 5
+# Solo se calculan valores frecuentes si hay a lo sumo tantos distintos
+TOP_VALUES_MAX_DISTINCT = 100_000
+
+
+def _detected_type(arrow_type: pa.DataType) -> str:
+    if pa.types.is_dictionary(arrow_type):
+        return "category"
+    if pa.types.is_boolean(arrow_type):
+        return "boolean"
+    if pa.types.is_integer(arrow_type):
+        return "integer"
+    if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return "float"
+    if pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type):
+        return "datetime"
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return "text"
+    return str(arrow_type)
+
+
+def _json_value(value: pa.Scalar) -> Any:
+    """Escalar Arrow -> valor serializable (fechas en ISO 8601)."""
+    value = value.as_py()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def hll_distinct(column: pa.ChunkedArray, precision: int = HLL_PRECISION) -> int:
+    """Estimación HyperLogLog de valores distintos no nulos (hash de 64 bits)."""
+    m = 1 << precision
+    registers = np.zeros(m, dtype=np.uint8)
+    for batch_start in range(0, len(column), _HASH_BATCH_ROWS):
+        batch = column.slice(batch_start, _HASH_BATCH_ROWS).drop_null()
+        if len(batch) == 0:
+            continue
+        hashes = pd.util.hash_array(batch.to_numpy())
+        buckets = (hashes >> np.uint64(64 - precision)).astype(np.intp)
+        rest = hashes << np.uint64(precision)
+        # rango = ceros a la izquierda de los bits restantes + 1
+        _, exponent = np.frexp(rest.astype(np.float64))
+        ranks = np.where(rest == 0, 64 - precision + 1, 64 - exponent + 1)
+        np.maximum.at(registers, buckets, ranks.astype(np.uint8))
+
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        # corrección para cardinalidades bajas (linear counting)
+        estimate = m * math.log(m / zeros)
+    return int(round(estimate))
+
+
+def _value_counts(column: pa.ChunkedArray) -> Tuple[pa.Array, pa.Array]:
+    """Valores distintos no nulos y su frecuencia."""
+    counts = pc.value_counts(column)
+    values, frequencies = counts.field("values"), counts.field("counts")
+    valid = pc.is_valid(values)
+    return values.filter(valid), frequencies.filter(valid)
+
+
+def _top_values(values: pa.Array, frequencies: pa.Array) -> List[Dict[str, Any]]:
+    order = pc.select_k_unstable(
+        frequencies, k=TOP_VALUES, sort_keys=[("counts", "descending")]
+    )
+    return [
+        {"value": _json_value(values[i]), "count": frequencies[i].as_py()}
+        for i in order.to_pylist()
+    ]
+
+
+def profile_column(name: str, column: pa.ChunkedArray) -> Dict[str, Any]:
+    """
+    Perfil de una columna. Con pocas filas (o pocos distintos según el
+    HyperLogLog) un solo `value_counts` da distintos exactos, mínimo/máximo
+    (sobre los distintos) y valores frecuentes.
+    """
+    detected = _detected_type(column.type)
+    if pa.types.is_dictionary(column.type):
+        # categorías: se perfilan los valores (los diccionarios pueden
+        # diferir entre chunks)
+        column = pc.cast(column, column.type.value_type)
+
+    profile: Dict[str, Any] = {
+        "name": name,
+        "type": detected,
+        "nulls": column.null_count,
+        "distinct": 0,
+        "distinct_approximate": False,
+        "min": None,
+        "max": None,
+        "top_values": None,
+    }
+    if column.null_count == len(column):
+        return profile
+
+    if len(column) > EXACT_DISTINCT_ROWS:
+        estimate = hll_distinct(column)
+        if estimate > TOP_VALUES_MAX_DISTINCT:
+            min_max = pc.min_max(column)
+            profile.update(
+                distinct=estimate,
+                distinct_approximate=True,
+                min=_json_value(min_max["min"]),
+                max=_json_value(min_max["max"]),
+            )
+            return profile
+
+    values, frequencies = _value_counts(column)
+    min_max = pc.min_max(values)
+    profile.update(
+        distinct=len(values),
+        min=_json_value(min_max["min"]),
+        max=_json_value(min_max["max"]),
+    )
+    if len(values) <= TOP_VALUES_MAX_DISTINCT:
+        profile["top_values"] = _top_values(values, frequencies)
+    return profile
+
+
+def profile_table(table: pa.Table) -> Dict[str, Any]:
+    """Perfil de todas las columnas de la tabla."""
+    return {
+        "version": PROFILE_VERSION,
+        "rows": table.num_rows,
+        "columns": [
+            profile_column(name, table.column(index))
+            for index, name in enumerate(table.column_names)
+        ],
+    }
+
+
+def load_profile(profile_json: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Perfil guardado, o None si no hay o es de una versión anterior."""
+    if not profile_json:
+        return None
+    profile = json.loads(profile_json)
+    if profile.get("version") != PROFILE_VERSION:
+        return None
+    return profile
+
+
+def dump_profile(profile: Dict[str, Any]) -> str:
+    return json.dumps(profile, ensure_ascii=False)
+
+
+def _save_profile(db: Session, file: FileUpload, table: pa.Table) -> Dict[str, Any]:
+    profile = profile_table(table)
+    file.profile_json = dump_profile(profile)
+    db.commit()
+    return profile
+
+
+def get_or_build_profile(db: Session, file: FileUpload) -> Dict[str, Any]:
+    """
+    Perfil del upload: el guardado si existe; si no (uploads anteriores o la
+    tarea de fondo aún no terminó) se calcula ahora y se guarda.
+    """
+    profile = load_profile(file.profile_json)
+    if profile is not None:
+        return profile
+
+    _, table = open_grid_table(file.storage_path, file.id)
+    return _save_profile(db, file, table)
+
+
+def cached_profile(db: Session, file: FileUpload) -> Optional[Dict[str, Any]]:
+    """
+    Perfil del upload sin leer el archivo original: el guardado, o el de la
+    tabla del sidecar si ya existe (y se guarda). None si falta el sidecar.
+    """
+    profile = load_profile(file.profile_json)
+    if profile is not None:
+        return profile
+
+    table = open_cached_table(file.storage_path, file.id)
+    if table is None:
+        return None
+    return _save_profile(db, file, table)
+
+
+def warm_profile(storage_path: str, file_id: int) -> None:
+    """
+    Tarea de fondo: genera el sidecar Arrow y el perfil de columnas; si
+    falla, se harán al usar el archivo.
+    """
+    try:
+        build_cache(storage_path, file_id)
+    except Exception:
+        logger.exception("No se pudo generar la caché de ingesta para %s", storage_path)
+        return
+
+    db = SessionLocal()
+    try:
+        file = db.query(FileUpload).filter(FileUpload.id == file_id).first()
+        if file is not None:
+            get_or_build_profile(db, file)
+    except Exception:
+        logger.exception("No se pudo perfilar %s", storage_path)
+    finally:
+        db.close()
@@ -0,0 +1,127 @@
+"""
+Lectura de CSV compartida por preview, caché de ingesta y procesado.
+
+Los exports del ERP llegan en Latin-1 / Windows-1252 y separados por `;`, así
+que no se puede asumir UTF-8 con comas. Antes de parsear se lee una muestra
+de bytes del inicio del archivo y se detectan:
+
+- encoding: BOM UTF-8, UTF-8 válido, o Windows-1252 (Latin-1 como último
+  recurso, que decodifica cualquier byte)
+- delimitador: el que reparte la muestra en el mismo número de campos por
+  fila (`,`, `;`, tabulador o `|`)
+
+Las lecturas completas usan el motor pyarrow de pandas (multi-hilo). Las
+lecturas parciales (`nrows`) o por bloques (`chunksize`), que ese motor no
+soporta, usan el motor C con el mismo encoding y delimitador.
+"""
+
+import codecs
+import csv
+import io
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterator, List, Union
+
+import pandas as pd
+import pyarrow as pa
+
+SNIFF_BYTES = 64 * 1024
+CANDIDATE_DELIMITERS = [",", ";", "\t", "|"]
+
+# Opciones que el motor pyarrow no soporta
+_C_ENGINE_OPTIONS = {"nrows", "chunksize", "iterator", "skiprows", "converters"}
+
+
+@dataclass(frozen=True)
+class CsvFormat:
+    encoding: str
+    delimiter: str
+
+
+def _detect_encoding(sample: bytes) -> str:
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # final=False: la muestra puede cortar un carácter multibyte al final
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        sample.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def _detect_delimiter(text: str, truncated: bool) -> str:
+    """
+    Delimitador que da el mismo número de campos (>1) en todas las filas de
+    la muestra; a igualdad, el que da más campos. Coma si ninguno encaja.
+    """
+    best, best_fields = ",", 1
+    for delimiter in CANDIDATE_DELIMITERS:
+        rows = [row for row in csv.reader(io.StringIO(text), delimiter=delimiter) if row]
+        if truncated and len(rows) > 1:
+            # la última fila puede venir cortada por el tamaño de la muestra
+            rows = rows[:-1]
+        if not rows:
+            continue
+        counts = {len(row) for row in rows}
+        fields = len(rows[0])
+        if len(counts) == 1 and fields > best_fields:
+            best, best_fields = delimiter, fields
+    return best
+
+
+@lru_cache(maxsize=256)
+def _sniff(path: str, size: int, mtime_ns: int) -> CsvFormat:
+    with open(path, "rb") as handle:
+        sample = handle.read(SNIFF_BYTES)
+    encoding = _detect_encoding(sample)
+    text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(sample)
+    truncated = len(sample) == SNIFF_BYTES
+    return CsvFormat(encoding=encoding, delimiter=_detect_delimiter(text, truncated))
+
+
+def sniff_format(path: Union[str, Path]) -> CsvFormat:
+    """Encoding y delimitador del CSV (memoizado por ruta, tamaño y mtime)."""
+    stat = os.stat(path)
+    return _sniff(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def read_csv(
+    path: Union[str, Path], **kwargs: Any
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """
+    `pd.read_csv` con encoding y delimitador detectados.
+
+    Sin `nrows`/`chunksize` se usa el motor pyarrow; si ese motor rechaza el
+    archivo (filas irregulares, etc.) se repite con el motor C.
+    """
+    fmt = sniff_format(path)
+    kwargs.setdefault("encoding", fmt.encoding)
+    kwargs.setdefault("sep", fmt.delimiter)
+
+    if _C_ENGINE_OPTIONS & kwargs.keys():
+        return _read_csv_c(path, **kwargs)
+    try:
+        return pd.read_csv(path, engine="pyarrow", **kwargs)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return _read_csv_c(path, **kwargs)
+
+
+def _read_csv_c(path: Union[str, Path], **kwargs: Any):
+    # round_trip: mismos floats que pyarrow (el parser rápido del motor C
+    # puede desviarse en el último dígito)
+    kwargs.setdefault("float_precision", "round_trip")
+    return pd.read_csv(path, **kwargs)
+
+
+def iter_rows(path: Union[str, Path]) -> Iterator[List[str]]:
+    """Filas del CSV (cabecera incluida) sin construir un DataFrame."""
+    fmt = sniff_format(path)
+    with open(path, newline="", encoding=fmt.encoding, errors="replace") as handle:
+        yield from csv.reader(handle, delimiter=fmt.delimiter)
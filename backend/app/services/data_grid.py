@@ -0,0 +1,199 @@
+"""
+Ventanas de filas de un upload para la grilla de datos del frontend.
+
+Las filas se sirven desde el sidecar Arrow de la caché de ingesta, abierto
+con memory-map: una ventana sin orden ni filtro es un `slice` (sin copiar
+datos), así que cuesta lo mismo en la fila 0 que en la 900.000.
+
+Con orden o filtros se calcula una vez el vector de índices de las filas
+resultantes (ordenadas) y se guarda en memoria por archivo + orden + filtros;
+las ventanas siguientes solo hacen `take` de `limit` filas.
+
+Si el upload todavía no tiene sidecar se genera en la primera petición
+(camino lento, como `build_cache` tras el upload).
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from app.services.ingest_cache import build_cache, cache_path, load_frame, open_cached_table
+
+# Máximo de filas por ventana
+MAX_WINDOW_ROWS = 1000
+
+# Vectores de índices (orden / filtros) que se mantienen en memoria
+_INDEX_CACHE_SIZE = 32
+
+_index_cache: "OrderedDict[Tuple[Any, ...], pa.Array]" = OrderedDict()
+# Tablas de archivos que no se pueden guardar como sidecar (tipos mezclados)
+_fallback_tables: "OrderedDict[Path, pa.Table]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class GridError(ValueError):
+    pass
+
+
+def _remember(cache: OrderedDict, key: Any, value: Any, size: int) -> None:
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > size:
+            cache.popitem(last=False)
+
+
+def _recall(cache: OrderedDict, key: Any) -> Any:
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _fallback_table(file_path: str, file_id: Optional[int], key: Path) -> pa.Table:
+    """
+    Tabla en memoria para archivos sin sidecar posible: las columnas object
+    con tipos mezclados se pasan a texto (solo para mostrarlas).
+    """
+    table = _recall(_fallback_tables, key)
+    if table is not None:
+        return table
+
+    df = load_frame(file_path, file_id=file_id)
+    df.columns = [str(column) for column in df.columns]
+    for column in df.columns:
+        if df[column].dtype == object:
+            df[column] = df[column].map(lambda value: None if pd.isna(value) else str(value))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    _remember(_fallback_tables, key, table, 4)
+    return table
+
+
+def open_grid_table(file_path: str, file_id: Optional[int] = None) -> Tuple[Path, pa.Table]:
+    """Tabla Arrow del upload (generando el sidecar si falta) y su clave de caché."""
+    key = cache_path(file_path, file_id)
+    table = open_cached_table(file_path, file_id)
+    if table is None and build_cache(file_path, file_id) is not None:
+        table = open_cached_table(file_path, file_id)
+    if table is None:
+        table = _fallback_table(file_path, file_id, key)
+    return key, table
+
+
+def _text(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    return column if pa.types.is_string(column.type) else pc.cast(column, pa.string())
+
+
+def parse_filters(filters: Optional[Sequence[str]]) -> List[Tuple[str, str]]:
+    """`["COLUMNA=texto", ...]` -> `[("COLUMNA", "texto"), ...]`."""
+    parsed = []
+    for item in filters or []:
+        column, sep, value = item.partition("=")
+        if not sep or not column:
+            raise GridError(f"Invalid filter (expected COLUMN=text): {item}")
+        parsed.append((column, value))
+    return parsed
+
+
+def _row_indices(
+    key: Path,
+    table: pa.Table,
+    sort: Optional[str],
+    descending: bool,
+    filters: List[Tuple[str, str]],
+) -> pa.Array:
+    """
+    Índices (en orden) de las filas que cumplen los filtros: contiene el
+    texto, sin distinguir mayúsculas. Los nulos van al final.
+    """
+    index_key = (str(key), sort, descending, tuple(filters))
+    indices = _recall(_index_cache, index_key)
+    if indices is not None:
+        return indices
+
+    indices = None
+    if filters:
+        mask = None
+        for column, value in filters:
+            matches = pc.fill_null(
+                pc.match_substring(_text(table[column]), value, ignore_case=True), False
+            )
+            mask = matches if mask is None else pc.and_(mask, matches)
+        indices = pc.indices_nonzero(mask)
+
+    if sort is not None:
+        keys = table[sort]
+        if pa.types.is_dictionary(keys.type):
+            keys = pc.cast(keys, keys.type.value_type)
+        if indices is not None:
+            keys = pc.take(keys, indices)
+        order = pc.array_sort_indices(
+            keys,
+            order="descending" if descending else "ascending",
+            null_placement="at_end",
+        )
+        indices = order if indices is None else pc.take(indices, order)
+
+    if isinstance(indices, pa.ChunkedArray):
+        indices = indices.combine_chunks()
+    _remember(_index_cache, index_key, indices, _INDEX_CACHE_SIZE)
+    return indices
+
+
+def read_window(
+    file_path: str,
+    file_id: Optional[int] = None,
+    offset: int = 0,
+    limit: int = 100,
+    columns: Optional[Sequence[str]] = None,
+    sort: Optional[str] = None,
+    descending: bool = False,
+    filters: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Devuelve `limit` filas a partir de `offset` del upload.
+
+    - columns: columnas a devolver (nombres como en el preview); None = todas
+    - sort / descending: columna por la que ordenar
+    - filters: `COLUMNA=texto`; se quedan las filas cuya columna contiene el
+      texto (sin distinguir mayúsculas), todas las condiciones a la vez
+
+    `total` es el número de filas que cumplen los filtros.
+    """
+    if offset < 0:
+        raise GridError("offset must be >= 0")
+    if not 1 <= limit <= MAX_WINDOW_ROWS:
+        raise GridError(f"limit must be between 1 and {MAX_WINDOW_ROWS}")
+
+    key, table = open_grid_table(file_path, file_id)
+    parsed_filters = parse_filters(filters)
+
+    requested = list(columns) if columns else list(table.column_names)
+    referenced = requested + [column for column, _ in parsed_filters]
+    if sort is not None:
+        referenced.append(sort)
+    unknown = [column for column in referenced if column not in table.column_names]
+    if unknown:
+        raise GridError(f"Unknown columns: {', '.join(dict.fromkeys(unknown))}")
+
+    if sort is None and not parsed_filters:
+        total = table.num_rows
+        window = table.select(requested).slice(offset, limit)
+    else:
+        indices = _row_indices(key, table, sort, descending, parsed_filters)
+        total = len(indices)
+        window = table.select(requested).take(indices.slice(offset, limit))
+
+    return {
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "columns": requested,
+        "rows": window.to_pylist(),
+    }
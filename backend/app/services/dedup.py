@@ -0,0 +1,176 @@
+"""
+Detección de claves duplicadas en la salida limpia.
+
+Trabaja sobre la tabla intermedia (celdas ya limpias como texto), así que
+"123" y "123.0" en un PLU son la misma clave si la limpieza los deja
+iguales. Un solo `index_in` de Arrow sobre la clave (hash) da, para cada
+fila, la posición de la primera fila con su misma clave: las filas cuya
+primera aparición no son ellas mismas son duplicados. Solo las filas de
+grupos duplicados se comparan columna a columna contra la primera fila del
+grupo para encontrar valores en conflicto (p. ej. el mismo PLU con dos
+precios).
+
+Políticas:
+
+- keep_first: se conserva la primera fila de cada clave
+- keep_last: se conserva la última
+- fail: si hay duplicados la salida no se genera
+
+Las filas con clave vacía no se agrupan (se conservan) y se cuentan aparte.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+DEDUP_POLICIES = ("keep_first", "keep_last", "fail")
+
+# Grupos duplicados que se detallan en el reporte (el resto solo se cuenta)
+MAX_REPORTED_GROUPS = 20
+# Valores distintos por columna en conflicto que se muestran por grupo
+MAX_REPORTED_VALUES = 10
+
+# Separador entre columnas de una clave compuesta
+_KEY_SEPARATOR = "\x1f"
+
+
+def key_array(table: pa.Table, key_columns: List[str]) -> pa.Array:
+    """Clave de cada fila (columnas de texto unidas si es compuesta)."""
+    if len(key_columns) == 1:
+        return table[key_columns[0]].combine_chunks()
+    joined = pc.binary_join_element_wise(
+        *[table[name] for name in key_columns], _KEY_SEPARATOR
+    )
+    return joined.combine_chunks()
+
+
+def empty_key_mask(table: pa.Table, key_columns: List[str]) -> pa.Array:
+    """True en las filas con alguna columna de la clave vacía."""
+    empty = None
+    for name in key_columns:
+        column_empty = pc.equal(pc.utf8_length(table[name].combine_chunks()), 0)
+        empty = column_empty if empty is None else pc.or_(empty, column_empty)
+    return empty
+
+
+def first_occurrence(keys: pa.Array) -> pa.Array:
+    """Posición de la primera fila con la misma clave (hash join consigo misma)."""
+    return pc.index_in(keys, value_set=keys)
+
+
+def _positions(length: int) -> pa.Array:
+    return pa.array(np.arange(length, dtype=np.int32))
+
+
+def _count(mask: pa.Array) -> int:
+    return int(pc.sum(pc.cast(mask, pa.int64())).as_py() or 0)
+
+
+def _group_examples(
+    table: pa.Table,
+    key_columns: List[str],
+    rows: pa.Array,
+    groups: pa.Array,
+    conflict_columns: List[str],
+) -> List[Dict[str, Any]]:
+    """Detalle de los primeros grupos duplicados (en orden de aparición)."""
+    reported = pc.unique(groups).to_pylist()[:MAX_REPORTED_GROUPS]
+    selected = pc.is_in(groups, value_set=pa.array(reported, pa.int32()))
+    frame = table.take(rows.filter(selected)).to_pandas()
+    frame["__group"] = groups.filter(selected).to_numpy()
+
+    examples = []
+    for group, part in frame.groupby("__group", sort=True):
+        conflicts = {}
+        for name in conflict_columns:
+            values = list(dict.fromkeys(part[name].tolist()))
+            if len(values) > 1:
+                conflicts[name] = values[:MAX_REPORTED_VALUES]
+        examples.append(
+            {
+                "key": {name: part[name].iloc[0] for name in key_columns},
+                "rows": len(part),
+                "conflicts": conflicts,
+            }
+        )
+    return examples
+
+
+def find_duplicates(
+    table: pa.Table, key_columns: List[str], policy: str
+) -> Tuple[Dict[str, Any], Optional[pa.Array]]:
+    """
+    Reporte de duplicados de `table` por `key_columns` y máscara de filas a
+    conservar según `policy` (None si no hay que quitar ninguna).
+
+    Con policy="fail" nunca se devuelve máscara: decidir qué hacer con el
+    reporte queda para quien llama.
+    """
+    missing = [name for name in key_columns if name not in table.column_names]
+    if missing:
+        raise ValueError(f"Key columns not present in output: {', '.join(missing)}")
+
+    keys = key_array(table, key_columns)
+    empty = empty_key_mask(table, key_columns)
+    groups = first_occurrence(keys)
+    keyed = pc.invert(empty)
+    duplicate = pc.and_(keyed, pc.not_equal(groups, _positions(len(keys))))
+
+    report: Dict[str, Any] = {
+        "key_columns": key_columns,
+        "policy": policy,
+        "empty_keys": _count(empty),
+        "duplicate_groups": 0,
+        "duplicate_rows": 0,
+        "conflicting_groups": 0,
+        "conflicts_by_column": {},
+        "groups": [],
+        "removed_rows": 0,
+    }
+    duplicate_rows = _count(duplicate)
+    if duplicate_rows == 0:
+        return report, None
+
+    # Todas las filas de los grupos con duplicados, con la primera de su grupo
+    duplicate_groups = pc.unique(groups.filter(duplicate))
+    in_group = pc.and_(keyed, pc.is_in(groups, value_set=duplicate_groups))
+    rows = pc.indices_nonzero(in_group)
+    row_groups = groups.filter(in_group)
+
+    conflict_columns = [name for name in table.column_names if name not in key_columns]
+    conflicting = None
+    for name in conflict_columns:
+        values = table[name].combine_chunks()
+        differs = pc.not_equal(values.take(rows), values.take(row_groups))
+        column_groups = pc.unique(row_groups.filter(differs))
+        if len(column_groups):
+            report["conflicts_by_column"][name] = len(column_groups)
+            conflicting = (
+                column_groups
+                if conflicting is None
+                else pc.unique(pa.concat_arrays([conflicting, column_groups]))
+            )
+
+    report.update(
+        duplicate_groups=len(duplicate_groups),
+        duplicate_rows=duplicate_rows,
+        conflicting_groups=0 if conflicting is None else len(conflicting),
+        groups=_group_examples(table, key_columns, rows, row_groups, conflict_columns),
+    )
+    if policy == "fail":
+        return report, None
+
+    if policy == "keep_last":
+        # última posición de cada grupo (máximo por grupo; una asignación con
+        # índices repetidos no garantiza cuál de los valores queda)
+        group_ids = groups.to_numpy()
+        positions = np.arange(len(keys), dtype=np.int32)
+        last = np.full(len(keys), -1, dtype=np.int32)
+        np.maximum.at(last, group_ids, positions)
+        keep = pc.or_(empty, pa.array(last[group_ids] == positions))
+    else:
+        keep = pc.invert(duplicate)
+    report["removed_rows"] = duplicate_rows
+    return report, keep
@@ -0,0 +1,186 @@
+"""
+Caché columnar de los archivos subidos.
+
+Cada upload se convierte una sola vez a un sidecar Arrow IPC (formato
+Feather v2, sin compresión) guardado en `settings.cache_dir`. El nombre del
+sidecar se deriva del ID del FileUpload y del hash SHA-256 del contenido, de
+modo que un archivo modificado nunca reutiliza un sidecar viejo.
+
+Las etapas posteriores (preview, normalización, procesado) leen del sidecar
+con memory-map y solo las columnas que necesitan.
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from app.config import settings
+from app.services.csv_ingest import read_csv
+from app.services.schema_sniff import read_with_dtypes, sniff_dtypes
+from app.services.xlsx_ingest import read_xlsx
+
+CACHE_SUFFIX = ".arrow"
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# (ruta, tamaño, mtime) -> sha256, para no re-hashear el mismo archivo
+_hash_memo: Dict[Tuple[str, int, int], str] = {}
+_hash_lock = threading.Lock()
+
+
+def _memo_key(file_path: str) -> Tuple[str, int, int]:
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+def remember_content_hash(file_path: str, content_hash: str) -> None:
+    """Registra un hash ya conocido (p. ej. el calculado durante el upload)."""
+    with _hash_lock:
+        _hash_memo[_memo_key(file_path)] = content_hash
+
+
+def file_content_hash(file_path: str) -> str:
+    """Devuelve el SHA-256 (hex) del archivo, memoizado por tamaño y mtime."""
+    memo_key = _memo_key(file_path)
+
+    with _hash_lock:
+        cached = _hash_memo.get(memo_key)
+    if cached is not None:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    content_hash = digest.hexdigest()
+
+    with _hash_lock:
+        _hash_memo[memo_key] = content_hash
+    return content_hash
+
+
+def cache_path(file_path: str, file_id: Optional[int] = None) -> Path:
+    """Ruta del sidecar Arrow para el archivo (exista o no)."""
+    content_hash = file_content_hash(file_path)
+    key = f"{file_id}_{content_hash}" if file_id is not None else content_hash
+    return Path(settings.cache_dir) / f"{key}{CACHE_SUFFIX}"
+
+
+def _read_source(
+    path: Path,
+    columns: Optional[List[str]] = None,
+    sheets: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Parsea el archivo original (camino lento) con los dtypes detectados por
+    muestreo (schema_sniff) y, si se pasan, solo las columnas `columns`.
+    `sheets` elige las hojas de un XLSX (por defecto la primera).
+    """
+    suffix = path.suffix.lower()
+    if suffix in {".xlsx", ".xls"}:
+        read, kwargs = read_xlsx, {"path": path, "sheets": sheets}
+    elif suffix == ".csv":
+        read, kwargs = read_csv, {"path": path}
+    else:
+        raise ValueError(f"Unsupported file type: {suffix}")
+
+    if columns is not None:
+        kwargs["usecols"] = columns
+    dtypes = sniff_dtypes(path, usecols=columns, sheets=sheets)
+    return read_with_dtypes(read, dtypes, **kwargs)
+
+
+def _to_arrow(df: pd.DataFrame) -> Optional[pa.Table]:
+    """
+    Convierte el DataFrame a Arrow, o None si no es representable sin
+    pérdida (cabeceras no-texto o columnas object con tipos mezclados).
+    """
+    if not all(isinstance(col, str) for col in df.columns):
+        return None
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return None
+
+
+def _write_sidecar(table: pa.Table, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, target)
+
+
+def _restore_missing(df: pd.DataFrame) -> pd.DataFrame:
+    """Arrow devuelve None en columnas object; el parser original usa NaN."""
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+def build_cache(file_path: str, file_id: Optional[int] = None) -> Optional[Path]:
+    """
+    Convierte el archivo a sidecar Arrow si aún no existe.
+
+    Devuelve la ruta del sidecar, o None si el archivo no se puede cachear.
+    Pensado para ejecutarse como tarea en segundo plano tras el upload.
+    """
+    target = cache_path(file_path, file_id)
+    if target.exists():
+        return target
+
+    table = _to_arrow(_read_source(Path(file_path)))
+    if table is None:
+        return None
+    _write_sidecar(table, target)
+    return target
+
+
+def open_cached_table(file_path: str, file_id: Optional[int] = None) -> Optional[pa.Table]:
+    """Devuelve la tabla Arrow memory-mapped si el sidecar existe, si no None."""
+    target = cache_path(file_path, file_id)
+    if not target.exists():
+        return None
+    return feather.read_table(target, memory_map=True)
+
+
+def load_frame(
+    file_path: str,
+    columns: Optional[List[str]] = None,
+    file_id: Optional[int] = None,
+    sheets: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Carga el archivo como DataFrame, usando el sidecar si existe.
+
+    Si no existe y se piden `columns`, se leen solo esas columnas del original
+    (el sidecar completo lo genera `build_cache` tras el upload). Sin
+    `columns` se parsea el archivo entero y se deja el sidecar escrito para
+    las siguientes lecturas.
+
+    El sidecar corresponde a la primera hoja: si se eligen `sheets` se lee
+    siempre del original.
+    """
+    path = Path(file_path)
+    if sheets:
+        return _read_source(path, columns, sheets)
+
+    target = cache_path(file_path, file_id)
+    if target.exists():
+        table = feather.read_table(target, columns=columns, memory_map=True)
+        return _restore_missing(table.to_pandas())
+
+    if columns is not None:
+        return _read_source(path, columns)
+
+    df = _read_source(path)
+    table = _to_arrow(df)
+    if table is not None:
+        _write_sidecar(table, target)
+    return df
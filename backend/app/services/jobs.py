@@ -0,0 +1,552 @@
+"""
+Jobs de limpieza asíncronos.
+
+`/clean/process` ya no ejecuta `generate_clean_outputs` dentro del request:
+crea un registro en `cleaning_run_logs` (el ID del registro es el ID del job)
+y envía el trabajo a un `ProcessPoolExecutor`. El proceso worker actualiza el
+mismo registro con el estado, el avance y el resultado, así que el estado es
+visible desde cualquier worker de la API.
+
+`CleaningRunLog.message` guarda un JSON con la forma:
+
+    {"options": {...}, "progress": 0.0-1.0, "result": {...} | null,
+     "error": "..." | null, "cached": bool, "dedup": {...} | null,
+     "timings": {"total_seconds": ..., "stages": {...}} | null}
+
+`dedup` es el reporte de claves duplicadas cuando el job lo pidió; con la
+política "fail" el job falla y el reporte queda igual disponible.
+
+`timings` son los tiempos por etapa del procesado (lectura, reglas, IMAGEN,
+render, dedup, escritura; ver app.core.metrics) medidos en el worker, con
+filas, bytes y pico de memoria del proceso. El proceso de la API los suma a
+/metrics cuando el job termina.
+
+Antes de procesar se consulta el almacén de salidas (output_store): si el
+mismo contenido ya se limpió con las mismas opciones, el job termina al
+instante con la salida existente.
+"""
+
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import wait as wait_futures
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.metrics import collect_stages, observe_stages
+from app.db import SessionLocal, engine
+from app.models import CleaningBatch, CleaningConfig, CleaningRunLog, FileUpload
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+STATUS_PARTIAL = "partial"  # batch con algunos archivos fallidos
+FINISHED_STATUSES = {STATUS_SUCCEEDED, STATUS_FAILED, STATUS_PARTIAL}
+
+# Intervalo mínimo entre escrituras de avance a la DB (segundos)
+_PROGRESS_INTERVAL = 0.5
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+# ---------- Pool de procesos ----------
+
+
+def _init_worker() -> None:
+    # Cada worker abre sus propias conexiones (no se comparten entre procesos)
+    engine.dispose(close=False)
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Devuelve el pool de procesos, creándolo en el primer uso."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.job_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+# ---------- Persistencia del estado ----------
+
+
+def _load_message(record) -> Dict[str, Any]:
+    """JSON de `message` de un CleaningRunLog o CleaningBatch."""
+    if not record.message:
+        return {}
+    try:
+        return json.loads(record.message)
+    except ValueError:
+        # Registros antiguos con texto libre
+        return {"error": record.message}
+
+
+def _update_run(job_id: int, status: Optional[str] = None, **fields: Any) -> None:
+    """Actualiza estado y campos del JSON de `message` en su propia sesión."""
+    _update_record(CleaningRunLog, job_id, status, **fields)
+
+
+def _update_record(model, record_id: int, status: Optional[str] = None, **fields: Any) -> None:
+    db = SessionLocal()
+    try:
+        record = db.query(model).filter(model.id == record_id).first()
+        if record is None:
+            return
+        message = _load_message(record)
+        message.update(fields)
+        record.message = json.dumps(message, ensure_ascii=False, default=str)
+        if status is not None:
+            record.status = status
+        db.commit()
+    finally:
+        db.close()
+
+
+def serialize_job(run: CleaningRunLog) -> Dict[str, Any]:
+    message = _load_message(run)
+    return {
+        "job_id": run.id,
+        "file_id": run.file_upload_id,
+        "batch_id": run.batch_id,
+        "status": run.status,
+        "progress": message.get("progress", 0.0),
+        "options": message.get("options"),
+        "result": message.get("result"),
+        "error": message.get("error"),
+        "cached": message.get("cached", False),
+        "dedup": message.get("dedup"),
+        "timings": message.get("timings"),
+        "created_at": run.created_at,
+    }
+
+
+# ---------- Ejecución (proceso worker) ----------
+
+
+def _run_clean_job(job_id: int, file_path: str, file_id: int, options: Dict[str, Any]) -> Dict:
+    """Punto de entrada en el proceso worker."""
+    from app.services import clean_rules, output_store
+    from app.services.clean_output import (
+        DuplicateKeysError,
+        OutputEngineError,
+        generate_clean_outputs,
+    )
+
+    started = time.perf_counter()
+    key = options["output_key"]
+    config = options.get("config")
+
+    # Acierto de caché: la misma entrada ya se procesó con las mismas opciones
+    db = SessionLocal()
+    try:
+        cached = output_store.find_output(db, key)
+        if cached is not None:
+            result = output_store.serialize_output(cached)
+            _update_run(
+                job_id,
+                status=STATUS_SUCCEEDED,
+                progress=1.0,
+                result=result,
+                cached=True,
+                dedup=result.get("dedup"),
+            )
+            return result
+
+        # Plan compilado (cacheado en el worker por ID y versión de la config)
+        try:
+            if config:
+                plan = clean_rules.load_plan(db, config["id"], config["version"])
+            else:
+                plan = clean_rules.default_plan()
+        except (clean_rules.ConfigNotFoundError, clean_rules.RulesError) as e:
+            _update_run(job_id, status=STATUS_FAILED, error=str(e))
+            raise
+    finally:
+        db.close()
+
+    _update_run(job_id, status=STATUS_RUNNING, progress=0.0)
+
+    last_write = [0.0]
+
+    def report(value: float) -> None:
+        now = time.monotonic()
+        if value >= 1.0 or now - last_write[0] >= _PROGRESS_INTERVAL:
+            last_write[0] = now
+            _update_run(job_id, progress=round(value, 3))
+
+    stages: Dict[str, Any] = {}
+
+    def timings() -> Dict[str, Any]:
+        return {"total_seconds": round(time.perf_counter() - started, 6), "stages": stages}
+
+    try:
+        with collect_stages() as stages:
+            result = generate_clean_outputs(
+                file_path=file_path,
+                selected_columns=options["columns"],
+                generate_image_names=options["generate_image_names"],
+                file_id=file_id,
+                progress=report,
+                output_dir=str(output_store.output_dir(key)),
+                plan=plan,
+                sheets=options.get("sheets"),
+                dedup=options.get("dedup"),
+                aliases=options.get("aliases"),
+            )
+    except FileNotFoundError:
+        _update_run(
+            job_id,
+            status=STATUS_FAILED,
+            error="Stored file not found on disk",
+            timings=timings(),
+        )
+        raise
+    except DuplicateKeysError as e:
+        _update_run(
+            job_id, status=STATUS_FAILED, error=str(e), dedup=e.report, timings=timings()
+        )
+        raise
+    except OutputEngineError as e:
+        _update_run(job_id, status=STATUS_FAILED, error=str(e), timings=timings())
+        raise
+    except Exception as e:
+        _update_run(
+            job_id, status=STATUS_FAILED, error=f"Unexpected error: {e}", timings=timings()
+        )
+        raise
+
+    db = SessionLocal()
+    try:
+        output = output_store.record_output(
+            db,
+            file_id=file_id,
+            content_hash=options["content_hash"],
+            key=key,
+            options=output_store.canonical_options(
+                options["columns"],
+                options["generate_image_names"],
+                config,
+                options.get("sheets"),
+                options.get("dedup"),
+                options.get("aliases"),
+            ),
+            result=result,
+        )
+        result = output_store.serialize_output(output)
+    finally:
+        db.close()
+
+    _update_run(
+        job_id,
+        status=STATUS_SUCCEEDED,
+        progress=1.0,
+        result=result,
+        cached=False,
+        dedup=result.get("dedup"),
+        timings=timings(),
+    )
+    return result
+
+
+def _on_job_done(job_id: int, future: Future) -> None:
+    """
+    En el proceso padre, al terminar el job: suma sus tiempos por etapa a
+    /metrics y, como red de seguridad, si el worker murió sin poder marcar el
+    job (p. ej. BrokenProcessPool), lo marca como fallido.
+    """
+    db = SessionLocal()
+    try:
+        run = db.query(CleaningRunLog).filter(CleaningRunLog.id == job_id).first()
+        status = run.status if run else None
+        message = _load_message(run) if run else {}
+    finally:
+        db.close()
+
+    timings = message.get("timings")
+    if timings:
+        observe_stages(
+            {**timings["stages"], "total": {"seconds": timings["total_seconds"]}}, "clean"
+        )
+
+    error = future.exception() if not future.cancelled() else None
+    if future.cancelled() or error is not None:
+        if status not in FINISHED_STATUSES:
+            reason = "Job cancelled" if future.cancelled() else f"Worker error: {error}"
+            _update_run(job_id, status=STATUS_FAILED, error=reason)
+            logger.warning("Clean job %s failed: %s", job_id, reason)
+
+
+# ---------- API del servicio ----------
+
+
+def _job_options(
+    db: Session,
+    file: FileUpload,
+    columns: List[str],
+    generate_image_names: bool,
+    config: Optional[CleaningConfig] = None,
+    sheets: Optional[List[str]] = None,
+    dedup: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Opciones canónicas del job más la clave del almacén de salidas. Los
+    alias de columnas se resuelven aquí, con la cabecera del archivo.
+    """
+    from app.services import column_aliases, output_store
+    from app.services.clean_output import OutputEngineError, source_headers
+
+    try:
+        headers = source_headers(file.storage_path, file.id, sheets)
+    except (FileNotFoundError, OutputEngineError):
+        # el worker informa el error al procesar
+        headers = []
+    aliases = column_aliases.resolve_aliases(db, headers)
+
+    config_ref = {"id": config.id, "version": config.version} if config else None
+    canonical = output_store.canonical_options(
+        columns, generate_image_names, config_ref, sheets, dedup, aliases
+    )
+    content_hash = output_store.ensure_content_hash(db, file)
+    return {
+        **canonical,
+        "content_hash": content_hash,
+        "output_key": output_store.output_key(content_hash, canonical),
+    }
+
+
+def _create_run(
+    db: Session,
+    file: FileUpload,
+    options: Dict[str, Any],
+    batch_id: Optional[int] = None,
+) -> CleaningRunLog:
+    config = options.get("config")
+    run = CleaningRunLog(
+        file_upload_id=file.id,
+        cleaning_config_id=config["id"] if config else None,
+        batch_id=batch_id,
+        status=STATUS_QUEUED,
+        message=json.dumps({"options": options, "progress": 0.0}, ensure_ascii=False),
+    )
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def _submit(job_id: int, file_path: str, file_id: int, options: Dict[str, Any]) -> Future:
+    future = get_executor().submit(_run_clean_job, job_id, file_path, file_id, options)
+    future.add_done_callback(lambda f: _on_job_done(job_id, f))
+    return future
+
+
+def submit_clean_job(
+    db: Session,
+    file: FileUpload,
+    columns: List[str],
+    generate_image_names: bool = False,
+    config: Optional[CleaningConfig] = None,
+    sheets: Optional[List[str]] = None,
+    dedup: Optional[Dict[str, Any]] = None,
+) -> CleaningRunLog:
+    """
+    Registra el job en cleaning_run_logs y lo encola en el pool.
+
+    `config` es la CleaningConfig con las reglas a aplicar (ya validada con
+    clean_rules.plan_for_config); None = reglas por defecto. `sheets` son las
+    hojas del XLSX a procesar; None = primera hoja. `dedup` es
+    {"key_columns", "policy"} (ver app.services.dedup); None = sin deduplicar.
+
+    Si el almacén de salidas ya tiene el resultado para (contenido, opciones)
+    el job se registra directamente como terminado, sin pasar por el pool.
+    """
+    from app.services import output_store
+
+    options = _job_options(db, file, columns, generate_image_names, config, sheets, dedup)
+    cached = output_store.find_output(db, options["output_key"])
+    if cached is not None:
+        run = _create_run(db, file, options)
+        result = output_store.serialize_output(cached)
+        _update_run(
+            run.id,
+            status=STATUS_SUCCEEDED,
+            progress=1.0,
+            result=result,
+            cached=True,
+            dedup=result.get("dedup"),
+        )
+        db.refresh(run)
+        return run
+
+    run = _create_run(db, file, options)
+    _submit(run.id, file.storage_path, file.id, options)
+    return run
+
+
+# ---------- Batches: varios archivos en paralelo ----------
+
+
+def _coordinate_batch(
+    batch_id: int,
+    specs: List[Tuple[int, str, int, Dict[str, Any]]],
+    max_concurrency: int,
+    merge_outputs: bool,
+) -> None:
+    """
+    Hilo coordinador (proceso de la API): envía los jobs del batch al pool sin
+    superar `max_concurrency` en vuelo, espera a que terminen y, si se pidió,
+    combina los CSV de salida.
+    """
+    _update_record(CleaningBatch, batch_id, status=STATUS_RUNNING)
+    slots = threading.BoundedSemaphore(max_concurrency)
+    futures: List[Future] = []
+
+    for job_id, file_path, file_id, options in specs:
+        slots.acquire()
+        try:
+            future = _submit(job_id, file_path, file_id, options)
+        except Exception as e:
+            slots.release()
+            _update_run(job_id, status=STATUS_FAILED, error=f"Could not start job: {e}")
+            continue
+        future.add_done_callback(lambda f: slots.release())
+        futures.append(future)
+
+    wait_futures(futures)
+
+    results = []
+    for future in futures:
+        if not future.cancelled() and future.exception() is None:
+            results.append(future.result())
+
+    summary: Dict[str, Any] = {
+        "files": len(specs),
+        "succeeded": len(results),
+        "failed": len(specs) - len(results),
+        "rows": sum(result["rows"] for result in results),
+        "merged": None,
+    }
+
+    if merge_outputs and results:
+        import pyarrow as pa
+
+        from app.services.clean_output import VARIANTS, OutputEngineError, merge_output_tables
+
+        target = Path(settings.output_dir) / f"batch_{batch_id}" / "merged.arrow"
+        try:
+            merged = merge_output_tables([result["table_path"] for result in results], str(target))
+            summary["merged"] = {**merged, "variants": list(VARIANTS)}
+        except (OSError, OutputEngineError, pa.ArrowException) as e:
+            summary["merge_error"] = str(e)
+
+    if not results:
+        status = STATUS_FAILED
+    elif len(results) < len(specs) or "merge_error" in summary:
+        status = STATUS_PARTIAL
+    else:
+        status = STATUS_SUCCEEDED
+    _update_record(CleaningBatch, batch_id, status=status, **summary)
+
+
+def submit_batch(
+    db: Session,
+    items: List[
+        Tuple[
+            FileUpload,
+            List[str],
+            bool,
+            Optional[CleaningConfig],
+            Optional[List[str]],
+            Optional[Dict[str, Any]],
+        ]
+    ],
+    max_concurrency: int,
+    merge_outputs: bool = False,
+) -> CleaningBatch:
+    """
+    Crea un batch con un job por archivo y lo reparte en el pool de procesos.
+
+    `items` es una lista de (FileUpload, columnas, generate_image_names,
+    CleaningConfig o None, hojas o None, dedup o None).
+    """
+    max_concurrency = max(1, min(max_concurrency, settings.job_workers))
+    batch = CleaningBatch(
+        status=STATUS_QUEUED,
+        max_concurrency=max_concurrency,
+        merge_outputs=merge_outputs,
+        message=json.dumps({"files": len(items)}),
+    )
+    db.add(batch)
+    db.commit()
+    db.refresh(batch)
+
+    specs = []
+    for file, columns, generate_image_names, config, sheets, dedup in items:
+        options = _job_options(
+            db, file, columns, generate_image_names, config, sheets, dedup
+        )
+        run = _create_run(db, file, options, batch_id=batch.id)
+        specs.append((run.id, file.storage_path, file.id, options))
+
+    threading.Thread(
+        target=_coordinate_batch,
+        args=(batch.id, specs, max_concurrency, merge_outputs),
+        name=f"clean-batch-{batch.id}",
+        daemon=True,
+    ).start()
+    return batch
+
+
+def get_batch(db: Session, batch_id: int) -> Optional[CleaningBatch]:
+    return db.query(CleaningBatch).filter(CleaningBatch.id == batch_id).first()
+
+
+def serialize_batch(db: Session, batch: CleaningBatch) -> Dict[str, Any]:
+    runs = (
+        db.query(CleaningRunLog)
+        .filter(CleaningRunLog.batch_id == batch.id)
+        .order_by(CleaningRunLog.id)
+        .all()
+    )
+    summary = _load_message(batch)
+    return {
+        "batch_id": batch.id,
+        "status": batch.status,
+        "max_concurrency": batch.max_concurrency,
+        "merge_outputs": batch.merge_outputs,
+        "summary": summary,
+        "jobs": [serialize_job(run) for run in runs],
+        "created_at": batch.created_at,
+    }
+
+
+def get_job(db: Session, job_id: int) -> Optional[CleaningRunLog]:
+    return db.query(CleaningRunLog).filter(CleaningRunLog.id == job_id).first()
+
+
+def list_jobs(db: Session, file_id: Optional[int] = None, limit: int = 50) -> List[CleaningRunLog]:
+    query = db.query(CleaningRunLog)
+    if file_id is not None:
+        query = query.filter(CleaningRunLog.file_upload_id == file_id)
+    return query.order_by(CleaningRunLog.id.desc()).limit(limit).all()
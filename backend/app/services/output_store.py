@@ -0,0 +1,167 @@
+"""
+Almacén de salidas direccionado por contenido.
+
+Cada salida limpia vive en `settings.output_dir/<clave>/`, donde la clave es
+el SHA-256 de (hash del archivo de entrada, opciones de limpieza en forma
+canónica, versión del motor). La carpeta contiene la tabla intermedia Arrow
+y, a medida que se descargan, los archivos de cada variante (CSV, XLSX,
+Parquet, NDJSON).
+
+La tabla `clean_outputs` es el manifiesto: procesar otra vez el mismo archivo
+con las mismas opciones es un acierto de caché, y la descarga apunta
+exactamente a la salida pedida.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import CleanOutput, FileUpload
+
+# Subir este número invalida todas las salidas cacheadas (cambio de reglas)
+OUTPUT_ENGINE_VERSION = 2
+
+
+def canonical_options(
+    columns: List[str],
+    generate_image_names: bool,
+    config: Optional[Dict[str, int]] = None,
+    sheets: Optional[List[str]] = None,
+    dedup: Optional[Dict[str, Any]] = None,
+    aliases: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Forma canónica de las opciones de limpieza.
+
+    El orden de `columns` se conserva porque define el orden de la salida.
+    `config` es {"id", "version"} de la CleaningConfig usada, `sheets` las
+    hojas elegidas de un XLSX, `dedup` {"key_columns", "policy"} y
+    `aliases` {encabezado: columna canónica} (column_aliases; solo cuentan
+    los de columnas elegidas); si no se pasan (reglas por defecto, primera
+    hoja, sin deduplicar, sin alias) la clave no cambia respecto a versiones
+    anteriores.
+    """
+    options: Dict[str, Any] = {
+        "columns": [column.strip() for column in columns],
+        "generate_image_names": bool(generate_image_names),
+    }
+    if config is not None:
+        options["config"] = {"id": int(config["id"]), "version": int(config["version"])}
+    if sheets:
+        # el orden de las hojas define el orden de las filas
+        options["sheets"] = list(dict.fromkeys(sheets))
+    if dedup is not None:
+        options["dedup"] = {
+            "key_columns": [column.strip() for column in dedup["key_columns"]],
+            "policy": dedup["policy"],
+        }
+    if aliases:
+        selected = set(options["columns"])
+        applied = {
+            header: canonical
+            for header, canonical in sorted(aliases.items())
+            if canonical in selected
+        }
+        if applied:
+            options["aliases"] = applied
+    return options
+
+
+def output_key(content_hash: str, options: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        {"input": content_hash, "options": options, "engine": OUTPUT_ENGINE_VERSION},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def output_dir(key: str) -> Path:
+    return Path(settings.output_dir) / key
+
+
+def _files_exist(output: CleanOutput) -> bool:
+    return os.path.exists(output.table_path)
+
+
+def find_output(db: Session, key: str) -> Optional[CleanOutput]:
+    """Devuelve la salida registrada para la clave si sus archivos existen."""
+    output = db.query(CleanOutput).filter(CleanOutput.cache_key == key).first()
+    if output is None or not _files_exist(output):
+        return None
+    return output
+
+
+def record_output(
+    db: Session,
+    file_id: int,
+    content_hash: str,
+    key: str,
+    options: Dict[str, Any],
+    result: Dict[str, Any],
+) -> CleanOutput:
+    """Registra (o actualiza) la salida en el manifiesto."""
+    output = db.query(CleanOutput).filter(CleanOutput.cache_key == key).first()
+    if output is None:
+        output = CleanOutput(cache_key=key)
+        db.add(output)
+
+    output.file_upload_id = file_id
+    output.content_hash = content_hash
+    output.options_json = json.dumps(options, ensure_ascii=False)
+    output.rows = result["rows"]
+    output.columns_json = json.dumps(result["columns"], ensure_ascii=False)
+    output.table_path = result["table_path"]
+    if "dedup" in result:
+        output.report_json = json.dumps(result["dedup"], ensure_ascii=False)
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # Otro worker registró la misma clave a la vez: mismo contenido
+        db.rollback()
+        output = db.query(CleanOutput).filter(CleanOutput.cache_key == key).one()
+    db.refresh(output)
+    return output
+
+
+def latest_output_for_file(db: Session, file_id: int) -> Optional[CleanOutput]:
+    return (
+        db.query(CleanOutput)
+        .filter(CleanOutput.file_upload_id == file_id)
+        .order_by(CleanOutput.id.desc())
+        .first()
+    )
+
+
+def serialize_output(output: CleanOutput) -> Dict[str, Any]:
+    """Mismo formato que devuelve generate_clean_outputs, más el ID."""
+    from app.services.clean_output import VARIANTS
+
+    serialized = {
+        "output_id": output.id,
+        "rows": output.rows,
+        "columns": json.loads(output.columns_json),
+        "table_path": output.table_path,
+        "variants": list(VARIANTS),
+    }
+    if output.report_json:
+        serialized["dedup"] = json.loads(output.report_json)
+    return serialized
+
+
+def ensure_content_hash(db: Session, file: FileUpload) -> str:
+    """Hash del upload; para registros previos al hash se calcula y se guarda."""
+    if not file.content_hash:
+        from app.services.ingest_cache import file_content_hash
+
+        file.content_hash = file_content_hash(file.storage_path)
+        db.commit()
+    return file.content_hash
@@ -0,0 +1,123 @@
+"""
+Detección de esquema por muestreo.
+
+Sin dtypes explícitos pandas lee los IDs con nulos como float (y luego se
+pasan a Int64) y guarda cada celda de texto por separado, aunque la marca se
+repita en miles de filas. Aquí se leen las primeras filas del archivo y se
+derivan dtypes compactos para la lectura completa:
+
+- IDs (PLU, ID_MARCA, ID_CATEGORIA...) con valores enteros -> Int64 nullable
+- texto de baja cardinalidad (DESC_MARCA, CONTENIDO...) -> category
+- resto del texto -> strings respaldadas por Arrow
+
+La muestra puede no representar al archivo entero (p. ej. un texto en un ID
+más abajo); en ese caso `read_with_dtypes` deja la columna con el dtype
+inferido.
+"""
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.column_normalizer import normalize_column_name
+from app.services.csv_ingest import read_csv
+from app.services.xlsx_ingest import read_xlsx
+
+SNIFF_ROWS = 2000
+
+# Columnas (normalizadas) que son identificadores enteros aunque traigan nulos
+INTEGER_ID_COLUMNS = {"PLU", "ID_MARCA", "ID_CATEGORIA", "ID_SUBCATEGORIA"}
+
+# Texto con (valores distintos / valores no nulos) por debajo de este ratio
+# se lee como category
+CATEGORY_MAX_RATIO = 0.5
+
+# Strings Arrow con NaN como nulo (el `str` por defecto de pandas 3)
+TEXT_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+
+
+def read_sample(
+    path: Path,
+    nrows: int = SNIFF_ROWS,
+    usecols: Optional[List[str]] = None,
+    sheets: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Lee la cabecera y las primeras `nrows` filas del archivo (de cada hoja
+    elegida, si es un XLSX con `sheets`).
+    """
+    suffix = path.suffix.lower()
+    if suffix in {".xlsx", ".xls"}:
+        return read_xlsx(path, sheets=sheets, usecols=usecols, nrows=nrows)
+    if suffix == ".csv":
+        return read_csv(path, nrows=nrows, usecols=usecols)
+    raise ValueError(f"Unsupported file type: {suffix}")
+
+
+def _is_integer_id(name: Any, series: pd.Series) -> bool:
+    if normalize_column_name(str(name)) not in INTEGER_ID_COLUMNS:
+        return False
+    if series.dtype.kind in "iu":
+        return True
+    if series.dtype.kind != "f":
+        return False
+    values = series.dropna()
+    return not values.empty and bool((values == np.floor(values)).all())
+
+
+def _is_text(series: pd.Series) -> bool:
+    if isinstance(series.dtype, pd.StringDtype):
+        return True
+    # object: solo si todas las celdas no nulas son texto
+    return series.dtype == object and series.dropna().map(type).eq(str).all()
+
+
+def dtypes_from_sample(sample: pd.DataFrame) -> Dict[Any, Any]:
+    """dtypes para la lectura completa según las columnas de la muestra."""
+    dtypes: Dict[Any, Any] = {}
+    for name in sample.columns:
+        series = sample[name]
+        if _is_integer_id(name, series):
+            dtypes[name] = "Int64"
+        elif _is_text(series):
+            values = series.dropna()
+            if not values.empty and values.nunique() <= CATEGORY_MAX_RATIO * len(values):
+                dtypes[name] = "category"
+            else:
+                dtypes[name] = TEXT_DTYPE
+    return dtypes
+
+
+def sniff_dtypes(
+    path: Path,
+    usecols: Optional[List[str]] = None,
+    sheets: Optional[List[str]] = None,
+) -> Dict[Any, Any]:
+    """Muestrea el archivo y devuelve los dtypes explícitos por columna."""
+    return dtypes_from_sample(read_sample(path, usecols=usecols, sheets=sheets))
+
+
+def read_with_dtypes(
+    read: Callable[..., pd.DataFrame], dtypes: Dict[Any, Any], **kwargs: Any
+) -> pd.DataFrame:
+    """
+    Ejecuta `read(**kwargs)` con los dtypes de texto y después convierte los
+    IDs a Int64 (parsear Int64 dentro del lector es mucho más lento que leer
+    el número y convertirlo). Si la muestra no representaba al archivo (un
+    valor no entero en un ID) esa columna queda con el dtype inferido.
+    """
+    text_dtypes = {name: dtype for name, dtype in dtypes.items() if dtype != "Int64"}
+    try:
+        df = read(dtype=text_dtypes, **kwargs) if text_dtypes else read(**kwargs)
+    except (ValueError, TypeError):
+        df = read(**kwargs)
+
+    for name, dtype in dtypes.items():
+        if dtype == "Int64" and name in df.columns:
+            try:
+                df[name] = df[name].astype("Int64")
+            except (ValueError, TypeError):
+                pass
+    return df
@@ -0,0 +1,55 @@
+"""
+Almacenamiento de uploads direccionado por contenido.
+
+El archivo se copia a disco por bloques calculando el SHA-256 en la misma
+pasada, así la memoria usada no depende del tamaño del archivo. El nombre
+final es `<sha256>.<ext>`: dos uploads con los mismos bytes comparten archivo.
+"""
+
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from typing import BinaryIO
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class StoredFile:
+    storage_path: str
+    content_hash: str
+    size_bytes: int
+
+
+def store_upload(source: BinaryIO, upload_dir: str, extension: str) -> StoredFile:
+    """
+    Copia `source` a `upload_dir` por bloques y devuelve ruta, hash y tamaño.
+
+    Si ya existe un archivo con el mismo contenido, se descarta la copia
+    temporal y se devuelve la ruta existente.
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    tmp_path = os.path.join(upload_dir, f"{uuid.uuid4()}.{extension}.part")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as buffer:
+            for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                buffer.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    content_hash = digest.hexdigest()
+    storage_path = os.path.join(upload_dir, f"{content_hash}.{extension}")
+
+    if os.path.exists(storage_path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, storage_path)
+
+    return StoredFile(storage_path=storage_path, content_hash=content_hash, size_bytes=size)
@@ -0,0 +1,261 @@
+"""
+Comparación entre dos uploads (p. ej. la lista de ofertas de esta semana
+contra la de la anterior), por clave (PLU por defecto).
+
+Ambos archivos pasan por la misma limpieza que /clean/process (columnas
+normalizadas + reglas del plan) y se comparan como el texto que tendría el
+CSV limpio, así "5" y "5.0" o "nestlé" y "Nestlé" no cuentan como cambios
+si la limpieza los deja iguales.
+
+El cruce es un hash join de Arrow (`index_in`) y la comparación de columnas
+es vectorizada (`not_equal` sobre las filas emparejadas), sin bucles por
+fila. Resultado, en `settings.output_dir/diffs/<clave>/`:
+
+- added: filas del archivo nuevo cuya clave no estaba en el anterior
+- removed: filas del anterior cuya clave no está en el nuevo
+- changed: clave + columnas comparadas (`<COL>_ANTERIOR` / `<COL>_NUEVO`) y
+  `CAMBIOS` con las columnas que cambiaron
+
+Son tablas intermedias con el mismo formato que las salidas limpias, así que
+se descargan en cualquier variante (CSV, XLSX, ...) con `materialize_variant`.
+La clave de la carpeta se deriva de los hashes de ambos archivos y de las
+opciones: repetir la misma comparación reutiliza el resultado.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from app.config import settings
+from app.services.clean_output import (
+    OutputEngineError,
+    clean_frame,
+    source_column_map,
+    tmp_path,
+    to_text_table,
+)
+from app.services.clean_rules import RulePlan
+from app.services.dedup import empty_key_mask, first_occurrence, key_array
+from app.services.ingest_cache import file_content_hash
+
+# Subir si cambia el formato o la lógica de la comparación
+DIFF_ENGINE_VERSION = 1
+
+DEFAULT_KEY_COLUMNS = ["PLU"]
+DIFF_PARTS = ("added", "removed", "changed")
+
+_SUMMARY_FILE = "summary.json"
+
+
+def diff_dir(key: str) -> Path:
+    return Path(settings.output_dir) / "diffs" / key
+
+
+def part_path(key: str, part: str) -> Path:
+    return diff_dir(key) / f"{part}.arrow"
+
+
+def diff_key(old_hash: str, new_hash: str, options: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        {"old": old_hash, "new": new_hash, "options": options, "engine": DIFF_ENGINE_VERSION},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_summary(key: str) -> Optional[Dict[str, Any]]:
+    """Resumen de una comparación ya calculada, o None."""
+    path = diff_dir(key) / _SUMMARY_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _write_table(table: pa.Table, target: Path) -> None:
+    tmp = tmp_path(target)
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, target)
+
+
+def _unique_keyed(
+    table: pa.Table, key_columns: List[str]
+) -> Tuple[pa.Table, pa.Array, Dict[str, int]]:
+    """
+    Filas con clave no vacía y, si una clave se repite, solo su primera
+    aparición. Devuelve la tabla filtrada, sus claves y lo descartado.
+    """
+    keys = key_array(table, key_columns)
+    empty = empty_key_mask(table, key_columns)
+
+    positions = pa.array(np.arange(len(keys), dtype=np.int32))
+    first = pc.equal(first_occurrence(keys), positions)
+    keep = pc.and_(pc.invert(empty), first)
+
+    skipped = {
+        "empty_keys": pc.sum(pc.cast(empty, pa.int64())).as_py() or 0,
+        "duplicate_keys": pc.sum(
+            pc.cast(pc.and_(pc.invert(empty), pc.invert(first)), pa.int64())
+        ).as_py() or 0,
+    }
+    return table.filter(keep), keys.filter(keep), skipped
+
+
+def _cleaned_table(
+    file_path: str,
+    file_id: Optional[int],
+    columns: List[str],
+    plan: Optional[RulePlan],
+    aliases: Optional[Dict[str, str]] = None,
+) -> pa.Table:
+    result_df, _ = clean_frame(file_path, columns, file_id=file_id, plan=plan, aliases=aliases)
+    return to_text_table(result_df)
+
+
+def compare_columns_for(
+    old_path: str,
+    new_path: str,
+    key_columns: List[str],
+    old_file_id: Optional[int] = None,
+    new_file_id: Optional[int] = None,
+    aliases: Optional[Dict[str, str]] = None,
+) -> List[str]:
+    """
+    Columnas normalizadas presentes en ambos archivos, sin las de la clave.
+    Cada columna del archivo nuevo se compara una vez (con su nombre
+    canónico, no además con el normalizado que reemplaza el alias).
+    """
+    old_columns = source_column_map(old_path, old_file_id, aliases=aliases)
+    new_columns = source_column_map(new_path, new_file_id, aliases=aliases, fallbacks=False)
+    return [
+        name for name in new_columns if name in old_columns and name not in key_columns
+    ]
+
+
+def diff_uploads(
+    old_path: str,
+    new_path: str,
+    key_columns: Optional[List[str]] = None,
+    columns: Optional[List[str]] = None,
+    old_file_id: Optional[int] = None,
+    new_file_id: Optional[int] = None,
+    plan: Optional[RulePlan] = None,
+    options: Optional[Dict[str, Any]] = None,
+    aliases: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Compara `new_path` contra `old_path` y guarda las tablas added / removed
+    / changed.
+
+    - key_columns: columnas normalizadas que identifican una fila (PLU)
+    - columns: columnas normalizadas a comparar; None = todas las comunes
+    - plan: reglas de limpieza (clean_rules); None = reglas por defecto
+    - options: opciones extra que forman parte de la clave (p. ej. la
+      CleaningConfig usada)
+    - aliases: {encabezado original: columna canónica} de ambos archivos
+      (column_aliases); los que se usan forman parte de la clave
+
+    Las filas con clave vacía se descartan y, si una clave se repite en un
+    mismo archivo, se usa su primera aparición; ambos casos se informan en
+    `skipped`.
+
+    Lanza:
+      FileNotFoundError, OutputEngineError
+    """
+    key_columns = [name.strip() for name in (key_columns or DEFAULT_KEY_COLUMNS)]
+    if not key_columns:
+        raise OutputEngineError("key_columns must not be empty")
+    if columns is None:
+        columns = compare_columns_for(
+            old_path, new_path, key_columns, old_file_id, new_file_id, aliases
+        )
+    columns = [name.strip() for name in columns if name.strip() not in key_columns]
+
+    selected = key_columns + columns
+    aliases = {
+        header: canonical
+        for header, canonical in sorted((aliases or {}).items())
+        if canonical in selected
+    }
+    diff_options = {"key_columns": key_columns, "columns": columns, **(options or {})}
+    if aliases:
+        diff_options["aliases"] = aliases
+    key = diff_key(file_content_hash(old_path), file_content_hash(new_path), diff_options)
+    summary = load_summary(key)
+    if summary is not None:
+        return summary
+
+    old_table = _cleaned_table(old_path, old_file_id, selected, plan, aliases)
+    new_table = _cleaned_table(new_path, new_file_id, selected, plan, aliases)
+
+    old_table, old_keys, old_skipped = _unique_keyed(old_table, key_columns)
+    new_table, new_keys, new_skipped = _unique_keyed(new_table, key_columns)
+
+    # Hash join: posición de cada clave nueva en el archivo anterior
+    old_position = pc.index_in(new_keys, value_set=old_keys)
+    matched = pc.is_valid(old_position)
+    added = new_table.filter(pc.invert(matched))
+    removed = old_table.filter(pc.invert(pc.is_in(old_keys, value_set=new_keys)))
+
+    new_index = pc.indices_nonzero(matched)
+    old_index = old_position.filter(matched)
+    old_matched = old_table.take(old_index)
+    new_matched = new_table.take(new_index)
+
+    changed_mask = pa.array(np.zeros(len(new_index), dtype=bool))
+    labels = []
+    for name in columns:
+        differs = pc.not_equal(old_matched[name], new_matched[name]).combine_chunks()
+        changed_mask = pc.or_(changed_mask, differs)
+        labels.append(pc.if_else(differs, f"{name},", ""))
+
+    changed_arrays: List[pa.ChunkedArray] = [new_matched[name] for name in key_columns]
+    changed_names = list(key_columns)
+    for name in columns:
+        changed_arrays += [old_matched[name], new_matched[name]]
+        changed_names += [f"{name}_ANTERIOR", f"{name}_NUEVO"]
+    if labels:
+        # sin nulos: null_handling="skip" descarta filas enteras (pyarrow 26)
+        changes = pc.utf8_rtrim(pc.binary_join_element_wise(*labels, ""), characters=",")
+    else:
+        changes = pa.array([""] * len(new_index), pa.string())
+    changed_arrays.append(changes)
+    changed_names.append("CAMBIOS")
+    changed = pa.Table.from_arrays(changed_arrays, names=changed_names).filter(changed_mask)
+
+    target_dir = diff_dir(key)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    parts = {"added": added, "removed": removed, "changed": changed}
+    for part, table in parts.items():
+        _write_table(table, part_path(key, part))
+
+    summary = {
+        "diff_id": key,
+        "key_columns": key_columns,
+        "columns": columns,
+        "counts": {
+            "added": added.num_rows,
+            "removed": removed.num_rows,
+            "changed": changed.num_rows,
+            "unchanged": len(new_index) - changed.num_rows,
+        },
+        "skipped": {"old": old_skipped, "new": new_skipped},
+        "parts": {
+            part: {"rows": table.num_rows, "columns": table.column_names}
+            for part, table in parts.items()
+        },
+    }
+    summary_path = target_dir / _SUMMARY_FILE
+    tmp = tmp_path(summary_path)
+    tmp.write_text(json.dumps(summary, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, summary_path)
+    return summary
@@ -0,0 +1,125 @@
+"""
+Listado de uploads paginado por cursor (keyset).
+
+Orden: más recientes primero, (uploaded_at, id) descendente; el id desempata
+uploads del mismo instante. El cursor es la clave de la última fila
+devuelta, así cada página es un rango sobre el índice compuesto y cuesta lo
+mismo en la primera página que en la página diez mil (con OFFSET la base
+recorre y descarta todas las filas anteriores).
+
+Filtros: quién subió el archivo, rango de fechas [desde, hasta) y prefijo del
+nombre original (distingue mayúsculas). Cada filtro tiene su índice en
+`FileUpload.__table_args__`.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+import sys
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, tuple_
+from sqlalchemy.orm import Session
+
+from app.models import FileUpload
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class CursorError(ValueError):
+    """Cursor de paginación mal formado."""
+
+
+def encode_cursor(upload: FileUpload) -> str:
+    payload = json.dumps({"at": upload.uploaded_at.isoformat(), "id": upload.id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        return datetime.datetime.fromisoformat(payload["at"]), int(payload["id"])
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise CursorError("Invalid cursor")
+
+
+def _as_utc(value: datetime.datetime) -> datetime.datetime:
+    # uploaded_at se guarda en UTC; una fecha sin zona se toma como UTC
+    if value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc)
+    return value
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Menor cadena mayor que todas las que empiezan con `prefix`."""
+    while prefix:
+        last = ord(prefix[-1])
+        if last < sys.maxunicode:
+            return prefix[:-1] + chr(last + 1)
+        prefix = prefix[:-1]
+    return None
+
+
+def _prefix_filter(prefix: str):
+    column = FileUpload.filename_original
+    # El rango usa el índice; startswith deja el resultado exacto aunque la
+    # collation de la base no ordene como Python (y LIKE de SQLite ignore
+    # mayúsculas)
+    conditions = [column >= prefix, column.startswith(prefix, autoescape=True)]
+    upper = _prefix_upper_bound(prefix)
+    if upper is not None:
+        conditions.append(column < upper)
+    return and_(*conditions)
+
+
+def list_uploads(
+    db: Session,
+    uploaded_by: Optional[int] = None,
+    uploaded_from: Optional[datetime.datetime] = None,
+    uploaded_to: Optional[datetime.datetime] = None,
+    filename_prefix: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+) -> Tuple[List[FileUpload], Optional[str]]:
+    """
+    Una página de uploads y el cursor de la siguiente (None si no hay más).
+    """
+    limit = min(max(limit, 1), MAX_LIMIT)
+    query = db.query(FileUpload)
+    if uploaded_by is not None:
+        query = query.filter(FileUpload.uploaded_by_user_id == uploaded_by)
+    if uploaded_from is not None:
+        query = query.filter(FileUpload.uploaded_at >= _as_utc(uploaded_from))
+    if uploaded_to is not None:
+        query = query.filter(FileUpload.uploaded_at < _as_utc(uploaded_to))
+    if filename_prefix:
+        query = query.filter(_prefix_filter(filename_prefix))
+    if cursor:
+        uploaded_at, upload_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(FileUpload.uploaded_at, FileUpload.id) < tuple_(uploaded_at, upload_id)
+        )
+
+    # Una fila de más indica si hay otra página
+    rows = (
+        query.order_by(FileUpload.uploaded_at.desc(), FileUpload.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
+
+
+def serialize_upload(upload: FileUpload) -> dict:
+    return {
+        "id": upload.id,
+        "filename_original": upload.filename_original,
+        "storage_path": upload.storage_path,
+        "uploaded_by_user_id": upload.uploaded_by_user_id,
+        "uploaded_at": upload.uploaded_at,
+    }
@@ -0,0 +1,351 @@
+"""
+Lectura de XLSX por streaming, con selección de hojas.
+
+`pd.read_excel` arma primero una lista con todas las filas del libro (objetos
+Python por celda) y solo lee la primera hoja. Aquí las filas se recorren con
+openpyxl en modo read-only y se convierten a DataFrame por bloques de
+`settings.stream_chunk_rows` filas, así la memoria de objetos Python queda
+acotada por el bloque y no por la hoja.
+
+Cada celda y cada bloque se convierten con las mismas reglas que
+`pd.read_excel` (celda vacía -> "", números enteros como int, TextParser
+para inferir tipos). De cada bloque solo se guarda el DataFrame: si los
+bloques infieren dtypes distintos para una columna ("007" como número en uno
+y "abc" en otro) y no son solo enteros y floats, una segunda pasada por la
+hoja junta las celdas de esas columnas (y de ninguna otra) y las infiere de
+una vez, así el resultado es el de la hoja parseada entera.
+
+Al unir hojas los dtypes se unifican con las reglas de pandas: int + float
+-> float, bool con nulos o números -> float, hojas sin la columna adoptan el
+dtype del resto, tipos mezclados -> object.
+
+Con varias hojas, cada una se parsea en un proceso aparte
+(`settings.xlsx_sheet_workers`) y después se concatenan; las columnas que
+una hoja no tiene quedan vacías.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+from app.config import settings
+
+
+class SheetNotFoundError(ValueError):
+    pass
+
+
+def _convert_cell(cell) -> Any:
+    """Misma conversión de celda que el lector openpyxl de pandas."""
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        value = int(cell.value)
+        if value == cell.value:
+            return value
+        return float(cell.value)
+    return cell.value
+
+
+def _iter_sheet_rows(sheet) -> Iterator[List[Any]]:
+    """
+    Filas convertidas, sin celdas vacías al final de cada fila y sin las
+    filas vacías del final de la hoja.
+    """
+    sheet.reset_dimensions()
+    pending_empty = 0
+    for row in sheet.rows:
+        converted = [_convert_cell(cell) for cell in row]
+        while converted and converted[-1] == "":
+            converted.pop()
+        if not converted:
+            # solo se emiten si después aparece una fila con datos
+            pending_empty += 1
+            continue
+        for _ in range(pending_empty):
+            yield []
+        pending_empty = 0
+        yield converted
+
+
+def _pad_rows(rows: List[List[Any]], width: int = 1) -> List[List[Any]]:
+    # al menos `width` celdas: un bloque de filas vacías no debe quedar sin filas
+    width = max(width, max(len(row) for row in rows))
+    return [row + [""] * (width - len(row)) for row in rows]
+
+
+def _infer_column(values: List[Any]) -> pd.Series:
+    """Inferencia de tipos de una columna entera a partir de sus celdas."""
+    return TextParser([[value] for value in values], header=None, skip_blank_lines=False).read()[0]
+
+
+def _header_names(header: List[Any], width: int) -> List[str]:
+    """Nombres de columna como los deja pandas ("Unnamed: N", duplicados .1)."""
+    padded = [header + [""] * (width - len(header))]
+    return list(TextParser(padded, header=0, skip_blank_lines=False).read().columns)
+
+
+def _unified_dtype(parts: List[pd.Series]) -> Any:
+    """dtype que tendría la columna si la hoja se hubiera parseado entera."""
+    with_data = [part for part in parts if part.notna().any()]
+    has_nulls = any(part.isna().any() for part in parts)
+    kinds = {part.dtype for part in with_data}
+
+    if not kinds:
+        return parts[0].dtype
+    if all(isinstance(dtype, np.dtype) and dtype.kind in "biuf" for dtype in kinds):
+        dtype = np.result_type(*kinds)
+        if dtype.kind == "b" and not has_nulls:
+            return dtype
+        # como pandas: bool junto a nulos o números se lee como float
+        if has_nulls or any(kind.kind == "b" for kind in kinds):
+            return np.dtype("float64") if dtype.kind in "biu" else dtype
+        return dtype
+    if len(kinds) == 1:
+        return next(iter(kinds))
+    return np.dtype(object)
+
+
+def _as_object(part: pd.Series) -> pd.Series:
+    """
+    Bloque numérico dentro de una columna mixta: en la lectura completa los
+    números enteros quedan como int (no 3.0) y el resto como float.
+    """
+    if part.dtype.kind == "f":
+        values = [
+            int(value) if pd.notna(value) and float(value).is_integer() else value
+            for value in part.tolist()
+        ]
+        return pd.Series(values, index=part.index, dtype=object)
+    return part.astype(object)
+
+
+def _concat_column(parts: List[pd.Series]) -> pd.Series:
+    dtype = _unified_dtype(parts)
+    if dtype == object:
+        parts = [_as_object(part) for part in parts]
+    else:
+        parts = [part if part.dtype == dtype else part.astype(dtype) for part in parts]
+    return pd.concat(parts, ignore_index=True)
+
+
+def _concat_blocks(blocks: List[pd.DataFrame], columns: List[Any]) -> pd.DataFrame:
+    """Une bloques (o hojas) con columnas `columns`, unificando dtypes."""
+    if not blocks:
+        return pd.DataFrame(columns=columns)
+
+    data: Dict[Any, pd.Series] = {}
+    for column in columns:
+        data[column] = _concat_column([
+            block[column] if column in block.columns
+            else pd.Series(np.nan, index=block.index, dtype="float64")
+            for block in blocks
+        ])
+    return pd.DataFrame(data, columns=columns)
+
+
+def _mixed_columns(blocks: List[pd.DataFrame], columns: List[Any]) -> List[Any]:
+    """
+    Columnas de una hoja cuyo dtype cambia entre bloques. Enteros y floats
+    se unen como en la hoja entera (float); cualquier otra mezcla (textos,
+    bool, fechas, bloques sin la columna) hay que inferirla de nuevo.
+    """
+    mixed = []
+    for column in columns:
+        kinds = {block[column].dtype for block in blocks if column in block.columns}
+        if len(kinds) == 1 and all(column in block.columns for block in blocks):
+            continue
+        if all(isinstance(kind, np.dtype) and kind.kind in "iuf" for kind in kinds):
+            continue
+        mixed.append(column)
+    return mixed
+
+
+def _read_columns(
+    worksheet, positions: Dict[Any, int], nrows: Optional[int] = None
+) -> Dict[Any, pd.Series]:
+    """
+    Segunda pasada por la hoja: las celdas de las columnas en `positions`
+    (nombre -> posición), inferidas como columnas enteras.
+    """
+    rows = _iter_sheet_rows(worksheet)
+    if nrows is not None:
+        rows = islice(rows, nrows + 1)
+    next(rows, None)
+    cells: Dict[Any, List[Any]] = {column: [] for column in positions}
+    for row in rows:
+        for column, position in positions.items():
+            cells[column].append(row[position] if position < len(row) else "")
+    return {column: _infer_column(values) for column, values in cells.items()}
+
+
+def read_sheet(
+    path: Union[str, Path],
+    sheet: Optional[str] = None,
+    usecols: Optional[Sequence[Any]] = None,
+    nrows: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Lee una hoja (por defecto la primera) por bloques.
+
+    - usecols: columnas a conservar (por nombre); se descartan las demás en
+      cada bloque. Las que la hoja no tenga quedan vacías.
+    - nrows: máximo de filas de datos (la lectura se detiene ahí).
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        if sheet is None:
+            worksheet = workbook.worksheets[0]
+        elif sheet in workbook.sheetnames:
+            worksheet = workbook[sheet]
+        else:
+            raise SheetNotFoundError(f"Sheet not found: {sheet}")
+        return _read_worksheet(worksheet, usecols, nrows)
+    finally:
+        workbook.close()
+
+
+def _read_worksheet(
+    worksheet, usecols: Optional[Sequence[Any]] = None, nrows: Optional[int] = None
+) -> pd.DataFrame:
+    """Cuerpo de `read_sheet` sobre una hoja de un libro ya abierto."""
+    rows = _iter_sheet_rows(worksheet)
+    if nrows is not None:
+        rows = islice(rows, nrows + 1)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame(columns=list(usecols or []))
+
+    block_rows = max(settings.stream_chunk_rows, 1)
+    width = len(header)
+    blocks: List[pd.DataFrame] = []
+    while True:
+        block = list(islice(rows, block_rows))
+        if not block:
+            break
+        frame = TextParser(_pad_rows(block, len(header)), header=None, skip_blank_lines=False).read()
+        # las filas del bloque se sueltan antes de leer el siguiente
+        del block
+        width = max(width, frame.shape[1])
+        frame.columns = _header_names(header, width)[: frame.shape[1]]
+        if usecols is not None:
+            # solo se conservan las columnas pedidas de cada bloque
+            frame = frame[[name for name in usecols if name in frame.columns]]
+        blocks.append(frame)
+
+    names = _header_names(header, width)
+    columns = list(usecols) if usecols is not None else names
+    mixed = _mixed_columns(blocks, columns)
+    if not mixed:
+        return _concat_blocks(blocks, columns)
+
+    reread = _read_columns(worksheet, {column: names.index(column) for column in mixed}, nrows)
+    rest = _concat_blocks(blocks, [column for column in columns if column not in reread])
+    data = {column: reread[column] if column in reread else rest[column] for column in columns}
+    return pd.DataFrame(data, columns=columns)
+
+
+def sheet_names(path: Union[str, Path]) -> List[str]:
+    workbook = load_workbook(path, read_only=True, keep_links=False)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def _sheet_summary(worksheet) -> Dict[str, Any]:
+    # dimensión declarada en el archivo (se lee antes de recorrer filas, que
+    # la reinicia); None si el libro no la declara. Cuenta las filas vacías
+    # intermedias, como la lectura.
+    rows = max(worksheet.max_row - 1, 0) if worksheet.max_row else None
+    header = next(_iter_sheet_rows(worksheet), [])
+    return {
+        "name": worksheet.title,
+        "rows": rows,
+        "columns": _header_names(header, len(header)) if header else [],
+    }
+
+
+def list_sheets(path: Union[str, Path]) -> List[Dict[str, Any]]:
+    """Hojas del libro con su número de filas de datos y sus columnas."""
+    workbook = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        return [_sheet_summary(worksheet) for worksheet in workbook.worksheets]
+    finally:
+        workbook.close()
+
+
+def preview_workbook(
+    path: Union[str, Path], nrows: int
+) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Primeras `nrows` filas de la primera hoja y `list_sheets`, abriendo el
+    libro una sola vez (abrirlo parsea los strings compartidos de todo el
+    libro, lo más caro en archivos grandes).
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheets = [_sheet_summary(worksheet) for worksheet in workbook.worksheets]
+        head = _read_worksheet(workbook.worksheets[0], nrows=nrows)
+        return head, sheets
+    finally:
+        workbook.close()
+
+
+def _sheet_pool(sheet_count: int) -> Optional[ProcessPoolExecutor]:
+    workers = min(sheet_count, settings.xlsx_sheet_workers)
+    if workers <= 1:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def read_xlsx(
+    path: Union[str, Path],
+    sheets: Optional[Sequence[str]] = None,
+    usecols: Optional[Sequence[Any]] = None,
+    nrows: Optional[int] = None,
+    dtype: Optional[Dict[Any, Any]] = None,
+) -> pd.DataFrame:
+    """
+    Lee una o varias hojas y las concatena.
+
+    Sin `sheets` se lee la primera hoja (comportamiento de `pd.read_excel`).
+    Con varias hojas, cada una se parsea en un proceso aparte. `dtype` se
+    aplica al final columna por columna; si una conversión no es posible la
+    columna conserva el dtype inferido.
+    """
+    names: List[Optional[str]] = list(dict.fromkeys(sheets)) if sheets else [None]
+
+    pool = _sheet_pool(len(names)) if nrows is None else None
+    if pool is None:
+        frames = [read_sheet(path, name, usecols, nrows) for name in names]
+    else:
+        with pool:
+            futures = [pool.submit(read_sheet, str(path), name, usecols) for name in names]
+            frames = [future.result() for future in futures]
+
+    if len(frames) == 1:
+        df = frames[0]
+    else:
+        columns = list(dict.fromkeys(column for frame in frames for column in frame.columns))
+        df = _concat_blocks(frames, columns)
+
+    for column, target in (dtype or {}).items():
+        if column in df.columns:
+            try:
+                df[column] = df[column].astype(target)
+            except (ValueError, TypeError):
+                pass
+    return df
@@ -0,0 +1,176 @@
+"""
+Escritura de XLSX por streaming desde una tabla intermedia Arrow.
+
+openpyxl (incluso en modo write-only) crea objetos Python por celda y tarda
+decenas de segundos en un millón de filas. Aquí el XML de cada hoja se arma
+por bloques de filas con kernels de texto de Arrow (escape + etiquetas de
+celda) y se escribe directo a la entrada del zip con `zipfile`, así la
+memoria queda acotada por el bloque y no por la tabla.
+
+Las celdas se escriben como texto (inline strings), igual que en el CSV
+limpio: los códigos con ceros a la izquierda se conservan. Si la tabla no
+entra en una hoja (límite de filas de Excel) continúa en "Datos 2", etc.,
+cada una con su cabecera.
+"""
+
+import math
+import zipfile
+from pathlib import Path
+from typing import Iterator, List, Union
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Filas por hoja que admite Excel (incluida la cabecera)
+XLSX_MAX_ROWS = 1_048_576
+SHEET_NAME = "Datos"
+
+# Filas por bloque de XML (acota la memoria y los offsets de 32 bits)
+_BLOCK_ROWS = 65_536
+# Nivel de deflate: el XML comprime bien incluso con el nivel más rápido
+_COMPRESS_LEVEL = 1
+
+# Caracteres de control que XML 1.0 no admite
+_ILLEGAL_XML_RE = r"[\x00-\x08\x0b\x0c\x0e-\x1f]"
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_CT_PREFIX = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+
+_XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_STYLES = (
+    f'{_XML_DECLARATION}<styleSheet xmlns="{_MAIN_NS}">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    "</styleSheet>"
+)
+
+_CELL_OPEN = '<c t="inlineStr"><is><t xml:space="preserve">'
+_CELL_CLOSE = "</t></is></c>"
+
+
+def _sheet_names(count: int) -> List[str]:
+    return [SHEET_NAME] + [f"{SHEET_NAME} {index}" for index in range(2, count + 1)]
+
+
+def _package_parts(sheet_names: List[str]) -> List[tuple]:
+    """Partes fijas del paquete (tipos, relaciones, libro y estilos)."""
+    count = len(sheet_names)
+    overrides = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{index}.xml" '
+        f'ContentType="{_CT_PREFIX}.worksheet+xml"/>'
+        for index in range(1, count + 1)
+    )
+    content_types = (
+        f'{_XML_DECLARATION}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        f'<Override PartName="/xl/workbook.xml" ContentType="{_CT_PREFIX}.sheet.main+xml"/>'
+        f'<Override PartName="/xl/styles.xml" ContentType="{_CT_PREFIX}.styles+xml"/>'
+        f"{overrides}</Types>"
+    )
+    root_rels = (
+        f'{_XML_DECLARATION}<Relationships xmlns="{_PKG_REL_NS}">'
+        f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    )
+    sheets = "".join(
+        f'<sheet name={quoteattr(name)} sheetId="{index}" r:id="rId{index}"/>'
+        for index, name in enumerate(sheet_names, start=1)
+    )
+    workbook = (
+        f'{_XML_DECLARATION}<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+        f"<sheets>{sheets}</sheets></workbook>"
+    )
+    sheet_rels = "".join(
+        f'<Relationship Id="rId{index}" Type="{_REL_NS}/worksheet" '
+        f'Target="worksheets/sheet{index}.xml"/>'
+        for index in range(1, count + 1)
+    )
+    workbook_rels = (
+        f'{_XML_DECLARATION}<Relationships xmlns="{_PKG_REL_NS}">{sheet_rels}'
+        f'<Relationship Id="rId{count + 1}" Type="{_REL_NS}/styles" Target="styles.xml"/>'
+        "</Relationships>"
+    )
+    return [
+        ("[Content_Types].xml", content_types),
+        ("_rels/.rels", root_rels),
+        ("xl/workbook.xml", workbook),
+        ("xl/_rels/workbook.xml.rels", workbook_rels),
+        ("xl/styles.xml", _STYLES),
+    ]
+
+
+def _cells(column: pa.Array) -> pa.Array:
+    """XML de la celda de cada fila (vacía si el texto es "")."""
+    text = pc.replace_substring(column, "&", "&amp;")
+    text = pc.replace_substring(text, "<", "&lt;")
+    text = pc.replace_substring(text, ">", "&gt;")
+    text = pc.replace_substring_regex(text, _ILLEGAL_XML_RE, "")
+    cells = pc.binary_join_element_wise(_CELL_OPEN, text, _CELL_CLOSE, "")
+    return pc.if_else(pc.equal(column, ""), "<c/>", cells)
+
+
+def concat_buffer(strings: pa.Array) -> pa.Buffer:
+    """
+    Todas las cadenas de `strings` concatenadas, sin copiar: en Arrow están
+    contiguas en el buffer de datos, así que es un slice.
+    """
+    _, offsets, data = strings.buffers()
+    offsets = np.frombuffer(offsets, dtype=np.int32)
+    start, end = int(offsets[strings.offset]), int(offsets[strings.offset + len(strings)])
+    return data.slice(start, end - start)
+
+
+def _rows_xml(batch: pa.RecordBatch) -> pa.Buffer:
+    """XML de todas las filas del bloque, concatenado."""
+    cells = [_cells(column) for column in batch.columns]
+    return concat_buffer(pc.binary_join_element_wise("<row>", *cells, "</row>", ""))
+
+
+def _header_xml(names: List[str]) -> str:
+    cells = "".join(f"{_CELL_OPEN}{escape(name)}{_CELL_CLOSE}" for name in names)
+    return f"<row>{cells}</row>"
+
+
+def _iter_blocks(table: pa.Table) -> Iterator[pa.RecordBatch]:
+    for batch in table.to_batches(max_chunksize=_BLOCK_ROWS):
+        if batch.num_rows:
+            yield batch
+
+
+def write_xlsx(table: pa.Table, target: Union[str, Path]) -> None:
+    """
+    Escribe `table` (columnas de texto, sin nulos: tabla intermedia) como
+    XLSX en `target`.
+    """
+    per_sheet = XLSX_MAX_ROWS - 1
+    sheet_names = _sheet_names(max(1, math.ceil(table.num_rows / per_sheet)))
+    header = _header_xml(table.column_names)
+
+    with zipfile.ZipFile(
+        str(target), "w", zipfile.ZIP_DEFLATED, compresslevel=_COMPRESS_LEVEL
+    ) as archive:
+        for name, content in _package_parts(sheet_names):
+            archive.writestr(name, content)
+        for index in range(len(sheet_names)):
+            rows = table.slice(index * per_sheet, per_sheet)
+            part = f"xl/worksheets/sheet{index + 1}.xml"
+            with archive.open(part, "w", force_zip64=True) as sheet:
+                sheet.write(
+                    f'{_XML_DECLARATION}<worksheet xmlns="{_MAIN_NS}"><sheetData>{header}'.encode(
+                        "utf-8"
+                    )
+                )
+                for batch in _iter_blocks(rows):
+                    sheet.write(memoryview(_rows_xml(batch)))
+                sheet.write(b"</sheetData></worksheet>")
@@ -0,0 +1,121 @@
+"""
+Benchmark del camino de autenticación (login y resolución del token).
+
+Simula una ráfaga de logins al inicio de turno y mide cuánto se detiene el
+event loop (latencia máxima de un latido cada 10 ms) con bcrypt dentro del
+loop, como antes, y con `verify_password_async` en el pool propio. Después
+compara resolver un token decodificando el JWT y consultando `users` en cada
+request contra la caché de `get_current_user`.
+
+Usa una base SQLite temporal.
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_auth --logins 8 --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+_TMP = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP.name}/auth.db"
+
+from app.core.security import _load_principal, _resolve_token, token_cache  # noqa: E402
+from app.db import Base, SessionLocal, engine  # noqa: E402
+from app.services import auth  # noqa: E402
+
+EMAIL = "bench@example.com"
+PASSWORD = "contraseña-de-prueba"
+
+
+async def _max_loop_lag(work) -> tuple:
+    """(segundos de `work`, latencia máxima del loop en ms) mientras corre."""
+    lag = 0.0
+    done = asyncio.Event()
+
+    async def heartbeat() -> None:
+        nonlocal lag
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag = max(lag, time.perf_counter() - start - 0.01)
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - start
+    done.set()
+    await beat
+    return elapsed, lag * 1e3
+
+
+async def _logins(count: int, hashed: str, offload: bool) -> None:
+    async def one() -> bool:
+        if offload:
+            return await auth.verify_password_async(PASSWORD, hashed)
+        return auth.verify_password(PASSWORD, hashed)
+
+    results = await asyncio.gather(*(one() for _ in range(count)))
+    assert all(results)
+
+
+async def _resolve(token: str, count: int) -> None:
+    for _ in range(count):
+        principal = await _resolve_token(token)
+        assert principal.email == EMAIL
+
+
+async def _run(args) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = auth.create_user(db, EMAIL, PASSWORD, "Bench", "admin")
+        hashed = user.hashed_password
+    finally:
+        db.close()
+
+    print(f"logins={args.logins}")
+    for label, offload in [("bcrypt en el loop", False), ("pool de bcrypt", True)]:
+        elapsed, lag = await _max_loop_lag(lambda: _logins(args.logins, hashed, offload))
+        print(f"{label:>20}: {elapsed:.3f} s  loop bloqueado hasta {lag:8.1f} ms")
+
+    token = auth.create_access_token({"sub": EMAIL})
+    assert _load_principal(EMAIL) is not None
+
+    token_cache.maxsize = 0
+    start = time.perf_counter()
+    await _resolve(token, args.requests)
+    uncached = time.perf_counter() - start
+
+    token_cache.maxsize = 1024
+    token_cache.clear()
+    start = time.perf_counter()
+    await _resolve(token, args.requests)
+    cached = time.perf_counter() - start
+    assert len(token_cache) == 1
+
+    print(f"requests={args.requests:,}")
+    per = 1e6 / args.requests
+    print(f"     sin caché (s): {uncached:.3f}  ({uncached * per:.1f} µs/request)")
+    print(f"     con caché (s): {cached:.3f}  ({cached * per:.1f} µs/request, {uncached / cached:.0f}x)")
+    auth.shutdown_hash_executor()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=8, help="logins simultáneos")
+    parser.add_argument("--requests", type=int, default=2000, help="tokens a resolver")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_run(args))
+    finally:
+        engine.dispose()
+        _TMP.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark de la detección de duplicados (dedup) en /clean/process.
+
+Genera una lista de ofertas donde ~5% de las filas repiten un PLU anterior
+(la mitad con otro precio), mide `generate_clean_outputs` sin deduplicar y
+con cada política, y comprueba filas y conteos contra `drop_duplicates` de
+pandas.
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_dedup --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from app.services.clean_output import DuplicateKeysError, generate_clean_outputs
+from app.services.dedup import find_duplicates
+
+COLUMNS = ["PLU", "DESC_PLU", "DESC_MARCA", "PRECIO_OFERTA"]
+
+
+def build_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    products = np.array([f"café molido {i} tostión media" for i in range(4000)])
+    df = pd.DataFrame(
+        {
+            "PLU": np.arange(1, rows + 1),
+            "Desc Plu": rng.choice(products, rows),
+            "Desc Marca": rng.choice(["nestlé", "la española", "bimbo"], rows),
+            "Precio Oferta": np.round(rng.random(rows) * 100, 2),
+        }
+    )
+    repeated = rng.choice(rows, rows // 20, replace=False)
+    source = rng.choice(rows, len(repeated))
+    df.loc[repeated, "PLU"] = df.loc[source, "PLU"].to_numpy()
+    df.loc[repeated[::2], "Precio Oferta"] = df.loc[source[::2], "Precio Oferta"].to_numpy()
+    return df
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = build_frame(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ofertas.csv")
+        df.to_csv(path, index=False)
+
+        start = time.perf_counter()
+        generate_clean_outputs(path, COLUMNS, output_dir=os.path.join(tmp, "plain"))
+        plain = time.perf_counter() - start
+        print(f"rows={len(df):,}  sin dedup (s): {plain:.3f}")
+
+        for policy, keep in [("keep_first", "first"), ("keep_last", "last")]:
+            start = time.perf_counter()
+            result = generate_clean_outputs(
+                path,
+                COLUMNS,
+                output_dir=os.path.join(tmp, policy),
+                dedup={"key_columns": ["PLU"], "policy": policy},
+            )
+            elapsed = time.perf_counter() - start
+            report = result["dedup"]
+            expected = df.drop_duplicates("PLU", keep=keep)
+            assert result["rows"] == len(expected)
+            assert report["removed_rows"] == len(df) - len(expected)
+            assert report["duplicate_groups"] == (df["PLU"].value_counts() > 1).sum()
+            print(
+                f"{policy} (s): {elapsed:.3f}  (+{elapsed - plain:.3f})  "
+                f"groups={report['duplicate_groups']:,} "
+                f"conflicts={report['conflicts_by_column']}"
+            )
+
+        try:
+            generate_clean_outputs(
+                path,
+                COLUMNS,
+                output_dir=os.path.join(tmp, "fail"),
+                dedup={"key_columns": ["PLU"], "policy": "fail"},
+            )
+            raise AssertionError("policy=fail should raise")
+        except DuplicateKeysError as e:
+            print(f"fail: {e}")
+
+        # solo la detección, sobre una salida ya deduplicada
+        with pa.memory_map(result["table_path"], "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        start = time.perf_counter()
+        find_duplicates(table, ["PLU"], "keep_first")
+        print(f"find_duplicates sin duplicados (s): {time.perf_counter() - start:.3f}")
+
+
+if __name__ == "__main__":
+    main()
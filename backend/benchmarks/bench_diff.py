@@ -0,0 +1,84 @@
+"""
+Benchmark de la comparación entre dos listas de ofertas (upload_diff).
+
+Genera la lista de "la semana pasada" y la de "esta semana" (1% de PLUs
+eliminados, 1% nuevos, ~2% con cambio de precio y algunas descripciones
+que solo cambian en mayúsculas), mide `diff_uploads` y comprueba los
+conteos contra un merge de pandas.
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_diff --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.config import settings
+from app.services.upload_diff import diff_uploads
+
+
+def build_weeks(rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    products = np.array(
+        [f"café molido {i} tostión media" for i in range(2000)]
+        + [f"jamón serrano {i} lonchas" for i in range(2000)]
+    )
+    old = pd.DataFrame(
+        {
+            "PLU": np.arange(1, rows + 1),
+            "ID Marca": rng.integers(1, 400, rows),
+            "Desc Plu": rng.choice(products, rows),
+            "Desc Marca": rng.choice(["nestlé", "la española", "bimbo"], rows),
+            "Descuento": rng.choice([0.05, 0.1, 0.25, np.nan], rows),
+            "Precio Oferta": np.round(rng.random(rows) * 100, 2),
+        }
+    )
+    new = old.drop(index=old.index[::100]).copy()
+    repriced = new.index[::50]
+    new.loc[repriced, "Precio Oferta"] += 1
+    # solo cambia en mayúsculas: la limpieza lo deja igual
+    new.loc[new.index[::70], "Desc Plu"] = new.loc[new.index[::70], "Desc Plu"].str.upper()
+    extra = old.sample(n=rows // 100, random_state=seed).assign(
+        PLU=np.arange(rows + 1, rows + 1 + rows // 100)
+    )
+    return old, pd.concat([new, extra], ignore_index=True), len(repriced)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    old, new, repriced = build_weeks(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.output_dir = os.path.join(tmp, "outputs")
+        old_path, new_path = os.path.join(tmp, "old.csv"), os.path.join(tmp, "new.csv")
+        old.to_csv(old_path, index=False)
+        new.to_csv(new_path, index=False)
+
+        start = time.perf_counter()
+        summary = diff_uploads(old_path, new_path)
+        elapsed = time.perf_counter() - start
+
+        merged = old[["PLU"]].merge(new[["PLU"]], on="PLU", how="outer", indicator=True)
+        assert summary["counts"]["added"] == (merged["_merge"] == "right_only").sum()
+        assert summary["counts"]["removed"] == (merged["_merge"] == "left_only").sum()
+        assert summary["counts"]["changed"] == repriced
+
+        print(f"rows old={len(old):,} new={len(new):,}")
+        print(f"counts: {summary['counts']}")
+        print(f"diff_uploads (s): {elapsed:.3f}  ({(len(old) + len(new)) / elapsed / 1e6:.2f} Mrows/s)")
+
+        start = time.perf_counter()
+        diff_uploads(old_path, new_path)
+        print(f"repeat (cached) (s): {time.perf_counter() - start:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark del arranque en frío: cuánto tarda `import app.main`.
+
+Corre `python -X importtime -c "import app.main"` en procesos nuevos, suma
+el tiempo acumulado de `app.main` (mejor de --runs) y lista los módulos más
+caros. Falla si el import carga alguna librería pesada que debería cargarse
+al usarla (ver app.core.lazy), o si supera --max-ms.
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_import --runs 5
+    python -m benchmarks.bench_import --max-ms 800   # en CI, contra regresiones
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict
+
+# No deben cargarse al importar app.main
+HEAVY_MODULES = ("pandas", "pyarrow", "numpy", "openpyxl", "bcrypt", "jose")
+
+
+def _importtime(cwd: str) -> Dict[str, int]:
+    """Módulo -> microsegundos acumulados, de un proceso nuevo."""
+    env = {**os.environ, "PYTHONPATH": os.getcwd(), "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = line[len("import time:") :].split("|")
+        cumulative[name.strip()] = int(cum)
+    return cumulative
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="módulos a listar")
+    parser.add_argument("--max-ms", type=float, default=None, help="umbral de regresión")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [_importtime(tmp) for _ in range(args.runs)]
+        # importar no debe crear la base (create_schema va en el lifespan)
+        assert not os.listdir(tmp), os.listdir(tmp)
+
+    best = min(runs, key=lambda run: run["app.main"])
+    total_ms = best["app.main"] / 1e3
+    print(f"import app.main (mejor de {args.runs}): {total_ms:.1f} ms")
+    for name, micros in sorted(best.items(), key=lambda item: -item[1])[1 : args.top + 1]:
+        print(f"  {micros / 1e3:8.1f} ms  {name}")
+
+    loaded = sorted({name.split(".")[0] for name in best} & set(HEAVY_MODULES))
+    assert not loaded, f"se importan al arrancar: {', '.join(loaded)}"
+    if args.max_ms is not None:
+        assert total_ms <= args.max_ms, f"{total_ms:.1f} ms > {args.max_ms} ms"
+
+
+if __name__ == "__main__":
+    main()
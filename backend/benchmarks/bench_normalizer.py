@@ -0,0 +1,71 @@
+"""
+Benchmark de la normalización de encabezados (column_normalizer).
+
+Simula el preview / procesado de muchos archivos de los mismos proveedores
+(los mismos encabezados una y otra vez) y compara la normalización sin
+caché (regex compiladas en cada llamada, como antes) contra
+`normalize_column_name` memoizada, más la búsqueda en el índice de alias.
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_normalizer --rows 1000000
+"""
+
+import argparse
+import re
+import time
+
+from app.services.column_aliases import canonical_name, known_columns
+from app.services.column_normalizer import _remove_diacritics, normalize_column_name
+
+HEADERS = [
+    "PLU", "Código PLU", "Id Marca", "ID_MARCA", "Desc Plu", "Descripción PLU",
+    "Desc Marca", "Contenido", "Descuento", "Descuento (%)", "Precio Oferta",
+    "Precio Oferta ($)", "PRECIO OFERTA", "Precio\nOferta", "Stock", "Categoría",
+    "Id Categoría", "Id Subcategoría", "PVP", "Fecha Inicio", "Fecha Fin",
+]
+
+
+def _normalize_uncached(name: str) -> str:
+    text = _remove_diacritics(name)
+    text = re.sub(r"[\r\n]+", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    text = text.upper()
+    text = text.replace(" ", "_")
+    text = re.sub(r"[^A-Z0-9_]", "", text)
+    return text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="llamadas")
+    args = parser.parse_args()
+
+    names = [HEADERS[i % len(HEADERS)] for i in range(args.rows)]
+    assert [_normalize_uncached(n) for n in HEADERS] == [normalize_column_name(n) for n in HEADERS]
+
+    start = time.perf_counter()
+    for name in names:
+        _normalize_uncached(name)
+    uncached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name in names:
+        normalize_column_name(name)
+    cached = time.perf_counter() - start
+
+    index = {"CODIGO_PLU": "PLU", "PVP": "PRECIO_OFERTA"}
+    start = time.perf_counter()
+    for name in names:
+        canonical_name(name, index)
+    lookup = time.perf_counter() - start
+    assert canonical_name("Precio Oferta ($)", index) == "PRECIO_OFERTA" in known_columns()
+
+    print(f"calls={args.rows:,}")
+    print(f"sin caché (s):        {uncached:.3f}")
+    print(f"memoizada (s):        {cached:.3f}  ({uncached / cached:.1f}x)")
+    print(f"canonical_name (s):   {lookup:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark del desglose por etapas de generate_clean_outputs (app.core.metrics).
+
+Procesa una lista de ofertas dentro de `collect_stages()` y muestra el tiempo,
+las filas y la parte del total de cada etapa (lo mismo que queda en
+`CleaningRunLog.message["timings"]`). Mide además el costo de `stage()` por
+llamada, para confirmar que instrumentar no cambia lo que se mide.
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_stages --rows 1000000
+    python -m benchmarks.bench_stages --rows 200000 --chunk-rows 50000   # streaming
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from app.config import settings
+from app.core.metrics import collect_stages, peak_rss_bytes, stage
+from app.services.clean_output import generate_clean_outputs
+from benchmarks.bench_csv_ingest import build_frame
+
+COLUMNS = ["PLU", "ID_MARCA", "DESC_PLU", "DESC_MARCA", "CONTENIDO", "DESCUENTO", "PRECIO_OFERTA"]
+
+
+def _stage_overhead(calls: int) -> float:
+    """Microsegundos por `with stage(...)` vacío, dentro de un collector."""
+    with collect_stages():
+        start = time.perf_counter()
+        for _ in range(calls):
+            with stage("noop"):
+                pass
+        elapsed = time.perf_counter() - start
+    return elapsed / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=None, help="fuerza el modo streaming")
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = build_frame(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ofertas.csv")
+        df.to_csv(path, index=False)
+
+        if args.chunk_rows:
+            settings.stream_csv_threshold_bytes = 0
+            settings.stream_chunk_rows = args.chunk_rows
+        start = time.perf_counter()
+        with collect_stages() as stages:
+            result = generate_clean_outputs(
+                path, COLUMNS, generate_image_names=True, output_dir=os.path.join(tmp, "out")
+            )
+        total = time.perf_counter() - start
+
+    print(f"rows={result['rows']:,}  total={total:.3f} s")
+    for name, entry in sorted(stages.items(), key=lambda item: -item[1]["seconds"]):
+        rows = f"{entry['rows']:>12,}" if "rows" in entry else " " * 12
+        print(
+            f"{name:>12}: {entry['seconds']:8.3f} s  {entry['seconds'] / total:6.1%}"
+            f"  calls={entry['calls']:<4} rows={rows}"
+        )
+    peak = peak_rss_bytes()
+    if peak is not None:
+        print(f"peak RSS: {peak / 1e6:.1f} MB")
+
+    assert sum(entry["seconds"] for entry in stages.values()) <= total
+    assert stages["read"]["rows"] == args.rows, stages["read"]
+    assert stages["write_table"]["rows"] == result["rows"], stages["write_table"]
+
+    overhead = _stage_overhead(args.calls)
+    print(f"stage(): {overhead:.2f} µs por llamada")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Suite de benchmarks de los servicios de limpieza, con resultados en JSON.
+
+Para cada tamaño y formato genera una lista de ofertas sintética
+(benchmarks.synthetic) y mide:
+
+- preview: generate_preview (cabecera, muestra y conteo de filas).
+- normalize: alias y build_normalization_preview sobre el preview.
+- process / process_images: generate_clean_outputs sin y con
+  generate_image_names, con el desglose por etapas de app.core.metrics.
+
+Cada caso corre en un proceso nuevo, así el pico de memoria (RSS) es el del
+caso y no el de los anteriores. Los resultados (tiempo, pico de RSS,
+crecimiento de RSS durante el caso, etapas, commit y versiones) se guardan
+en --output; con --compare se contrastan con los de otra corrida y
+--max-regression falla si algún caso es más lento que lo permitido.
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_suite --sizes 10k,100k
+    python -m benchmarks.bench_suite --sizes 10k,100k,1m,5m --data-dir /tmp/ofertas \\
+        --output base.json
+    python -m benchmarks.bench_suite --data-dir /tmp/ofertas --compare base.json \\
+        --max-regression 0.2
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.metrics import collect_stages, peak_rss_bytes
+from app.services.clean_normalize import build_normalization_preview
+from app.services.clean_output import generate_clean_outputs
+from app.services.clean_preview import generate_preview
+from app.services.xlsx_ingest import sheet_names
+from benchmarks.synthetic import FORMATS, SELECTED_COLUMNS, SIZES, offer_aliases, offer_file
+
+CASES = ("preview", "normalize", "process", "process_images")
+
+
+def _sheets(path: str) -> Optional[List[str]]:
+    """Todas las hojas si el XLSX tiene más de una (None = la primera)."""
+    if not path.endswith(".xlsx"):
+        return None
+    names = sheet_names(path)
+    return names if len(names) > 1 else None
+
+
+def _run_case(case: str, path: str) -> Dict[str, Any]:
+    """Corre un caso en este proceso y devuelve tiempo, memoria y etapas."""
+    with tempfile.TemporaryDirectory() as tmp:
+        if case == "preview":
+            run = lambda: generate_preview(path)  # noqa: E731
+        elif case == "normalize":
+            preview = generate_preview(path)
+
+            def run():
+                aliases = offer_aliases(preview["columns"])
+                return build_normalization_preview(path, preview=preview, aliases=aliases)
+
+        else:
+            sheets = _sheets(path)
+            headers = generate_preview(path)["columns"]
+            aliases = offer_aliases(headers)
+
+            def run():
+                return generate_clean_outputs(
+                    path,
+                    SELECTED_COLUMNS,
+                    generate_image_names=case == "process_images",
+                    output_dir=tmp,
+                    sheets=sheets,
+                    aliases=aliases,
+                )
+
+        baseline = peak_rss_bytes()
+        start = time.perf_counter()
+        with collect_stages() as stages:
+            run()
+        seconds = time.perf_counter() - start
+        peak = peak_rss_bytes()
+
+    return {
+        "seconds": round(seconds, 6),
+        "peak_rss_bytes": peak,
+        "rss_growth_bytes": peak - baseline if peak is not None else None,
+        "stages": stages,
+    }
+
+
+def _run_isolated(case: str, path: str) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_run_case, case, path).result()
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        result = subprocess.run(["git", *args], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def _environment() -> Dict[str, Any]:
+    import openpyxl
+    import pandas
+    import pyarrow
+
+    commit = _git("rev-parse", "HEAD")
+    return {
+        "commit": commit,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")) if commit else None,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "versions": {
+            "pandas": pandas.__version__,
+            "pyarrow": pyarrow.__version__,
+            "openpyxl": openpyxl.__version__,
+        },
+    }
+
+
+def _key(result: Dict[str, Any]) -> Tuple[str, str, int]:
+    return result["case"], result["format"], result["rows"]
+
+
+def _compare(
+    results: List[Dict[str, Any]],
+    base_path: str,
+    max_regression: Optional[float],
+    min_seconds: float,
+) -> None:
+    with open(base_path, encoding="utf-8") as source:
+        base = json.load(source)
+    previous = {_key(result): result for result in base["results"]}
+    print(f"\ncontra {base_path} (commit {(base['environment'].get('commit') or '?')[:10]}):")
+
+    slower = []
+    for result in results:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        ratio = result["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        memory = ""
+        if result["peak_rss_bytes"] and old["peak_rss_bytes"]:
+            memory = f"  RSS x{result['peak_rss_bytes'] / old['peak_rss_bytes']:.2f}"
+        case, fmt, rows = _key(result)
+        print(
+            f"{case:>15} {fmt:>4} {rows:>10,}: {old['seconds']:9.3f} -> "
+            f"{result['seconds']:9.3f} s  x{ratio:.2f}{memory}"
+        )
+        # los casos de milisegundos son puro ruido entre corridas
+        measurable = max(result["seconds"], old["seconds"]) >= min_seconds
+        if max_regression is not None and measurable and ratio > 1 + max_regression:
+            slower.append(f"{case}/{fmt}/{rows} x{ratio:.2f}")
+
+    assert not slower, f"más lentos que {1 + max_regression:.2f}x: {', '.join(slower)}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10k,100k", help=f"de {', '.join(SIZES)}")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--repeat", type=int, default=1, help="corridas por caso (mejor tiempo)")
+    parser.add_argument("--data-dir", default=None, help="reutiliza los archivos generados")
+    parser.add_argument("--output", default=None, help="JSON de resultados")
+    parser.add_argument("--compare", default=None, help="JSON de una corrida anterior")
+    parser.add_argument("--max-regression", type=float, default=None, help="p. ej. 0.2 = +20 %%")
+    parser.add_argument(
+        "--min-seconds", type=float, default=0.05, help="casos más rápidos no cuentan como regresión"
+    )
+    args = parser.parse_args()
+
+    sizes = [name.strip().lower() for name in args.sizes.split(",")]
+    formats = [name.strip().lower() for name in args.formats.split(",")]
+    cases = [name.strip() for name in args.cases.split(",")]
+    for values, allowed in ((sizes, SIZES), (formats, FORMATS), (cases, CASES)):
+        unknown = sorted(set(values) - set(allowed))
+        assert not unknown, f"desconocidos: {', '.join(unknown)} (válidos: {', '.join(allowed)})"
+
+    environment = _environment()
+    output = args.output or f"suite-{(environment['commit'] or 'local')[:10]}.json"
+    temp_dir = None
+    data_dir = args.data_dir
+    if data_dir is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        data_dir = temp_dir.name
+    os.makedirs(data_dir, exist_ok=True)
+
+    results: List[Dict[str, Any]] = []
+    try:
+        for size in sizes:
+            rows = SIZES[size]
+            for fmt in formats:
+                start = time.perf_counter()
+                path = offer_file(data_dir, rows, fmt)
+                file_bytes = os.path.getsize(path)
+                print(
+                    f"{fmt} {rows:,} filas: {file_bytes / 1e6:.1f} MB"
+                    f" (listo en {time.perf_counter() - start:.1f} s)"
+                )
+                for case in cases:
+                    runs = [_run_isolated(case, path) for _ in range(args.repeat)]
+                    best = min(runs, key=lambda run: run["seconds"])
+                    peaks = [run["peak_rss_bytes"] for run in runs if run["peak_rss_bytes"]]
+                    result = {
+                        "case": case,
+                        "format": fmt,
+                        "rows": rows,
+                        "file_bytes": file_bytes,
+                        "runs": len(runs),
+                        **best,
+                        "peak_rss_bytes": max(peaks) if peaks else None,
+                    }
+                    results.append(result)
+                    peak = f"{result['peak_rss_bytes'] / 1e6:9.1f} MB" if peaks else ""
+                    print(f"{case:>15}: {result['seconds']:9.3f} s  {peak}")
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    with open(output, "w", encoding="utf-8") as target:
+        json.dump({"environment": environment, "results": results}, target, indent=2)
+    print(f"resultados en {output}")
+
+    if args.compare:
+        _compare(results, args.compare, args.max_regression, args.min_seconds)
+
+
+if __name__ == "__main__":
+    main()
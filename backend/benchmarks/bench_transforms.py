@@ -0,0 +1,99 @@
+"""
+Benchmark de las transformaciones DESCUENTO e IMAGEN de clean_output.
+
+Compara la implementación vectorizada actual contra la versión anterior
+(apply fila a fila), copiada aquí como referencia.
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_transforms --rows 1000000
+"""
+
+import argparse
+import time
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from app.services.clean_output import _image_token
+from app.services.clean_rules import format_discount
+
+
+# ---------- Implementación anterior (referencia) ----------
+
+
+def legacy_format_discount(series: pd.Series) -> pd.Series:
+    return series.apply(
+        lambda x: f"{float(x)*100:.0f}%" if pd.notna(x) and isinstance(x, (int, float)) and 0 <= x <= 1 else x
+    )
+
+
+def legacy_image_token(series: pd.Series) -> pd.Series:
+    def remove_accents(text):
+        nfkd = unicodedata.normalize('NFKD', str(text))
+        return ''.join([c for c in nfkd if not unicodedata.combining(c)])
+
+    return (
+        series.astype(str)
+        .apply(remove_accents)
+        .str.replace(r"\s+", "_", regex=True)
+        .str.upper()
+    )
+
+
+# ---------- Datos sintéticos ----------
+
+
+def build_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    products = np.array(
+        [f"Café molido {i} tostión media" for i in range(2000)]
+        + [f"Jamón serrano {i} lonchas" for i in range(2000)]
+        + [f"Piña en almíbar {i}" for i in range(1000)]
+    )
+    return pd.DataFrame(
+        {
+            "ID_MARCA": rng.integers(1, 400, rows).astype(str),
+            "DESC_PLU": rng.choice(products, rows),
+            "CONTENIDO": rng.choice(["500 g", "1 kg", "12 uds", "1,5 l", "250 ml"], rows),
+            "DESCUENTO": rng.choice([0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.5, np.nan], rows),
+        }
+    )
+
+
+def _time(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = build_frame(args.rows)
+
+    assert legacy_format_discount(df["DESCUENTO"]).astype(str).equals(
+        format_discount(df["DESCUENTO"]).astype(str)
+    )
+    for col in ["ID_MARCA", "DESC_PLU", "CONTENIDO"]:
+        assert legacy_image_token(df[col]).astype(str).equals(_image_token(df[col]).astype(str))
+
+    print(f"rows={args.rows:,}")
+    print(f"{'transform':<22}{'legacy (s)':>12}{'vectorized (s)':>16}{'speedup':>10}")
+
+    cases = [("DESCUENTO", legacy_format_discount, format_discount, "DESCUENTO")]
+    cases += [
+        (f"IMAGEN[{col}]", legacy_image_token, _image_token, col)
+        for col in ["ID_MARCA", "DESC_PLU", "CONTENIDO"]
+    ]
+    for name, legacy, current, column in cases:
+        legacy_s = _time(legacy, df[column])
+        current_s = _time(current, df[column])
+        print(f"{name:<22}{legacy_s:>12.3f}{current_s:>16.3f}{legacy_s / current_s:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark del listado de uploads (GET /uploads/) con muchos registros.
+
+Siembra `file_uploads` y mide el listado anterior (ORDER BY uploaded_at sin
+índice, y una página profunda con OFFSET) contra `upload_listing.list_uploads`
+con los índices compuestos: primera página, página profunda por cursor y
+cada filtro. Comprueba que recorrer por cursor devuelve exactamente las filas
+del filtro, sin repetir.
+
+Por defecto usa una base SQLite temporal; con --database-url corre contra
+otra base (p. ej. un PostgreSQL local de prueba), creando y borrando sus
+propias tablas: no usar con una base real.
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_upload_listing --rows 1000000
+    python -m benchmarks.bench_upload_listing --rows 1000000 \\
+        --database-url postgresql://postgres@localhost/bench
+"""
+
+import argparse
+import datetime
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, insert, text
+from sqlalchemy.orm import Session
+
+from app.db import Base, _engine_options, create_schema
+from app.models import FileUpload, User
+from app.services.upload_listing import encode_cursor, list_uploads
+
+USERS = 50
+SUPPLIERS = ["nestle", "bimbo", "alpina", "colanta", "postobon", "zenu", "quala", "familia"]
+START = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+_SEED_CHUNK = 50_000
+
+
+def _seed(engine, rows: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {"email": f"user{i}@example.com", "full_name": f"User {i}", "is_active": True}
+                for i in range(1, USERS + 1)
+            ],
+        )
+        for offset in range(0, rows, _SEED_CHUNK):
+            conn.execute(
+                insert(FileUpload),
+                [
+                    {
+                        "filename_original": f"{SUPPLIERS[i % len(SUPPLIERS)]}_ofertas_{i}.xlsx",
+                        "storage_path": f"uploads/{i:08d}.xlsx",
+                        # de a dos por segundo: el id desempata
+                        "uploaded_by_user_id": None if i % 10 == 0 else i % USERS + 1,
+                        "uploaded_at": START + datetime.timedelta(seconds=i // 2),
+                    }
+                    for i in range(offset, min(offset + _SEED_CHUNK, rows))
+                ],
+            )
+
+
+def _timed(label: str, fn, repeat: int = 5):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:>36}: {best * 1e3:9.2f} ms")
+    return result
+
+
+def _walk(db: Session, **filters) -> list:
+    ids, cursor = [], None
+    while True:
+        page, cursor = list_uploads(db, cursor=cursor, limit=200, **filters)
+        ids.extend(upload.id for upload in page)
+        if cursor is None:
+            return ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    url = args.database_url or f"sqlite:///{os.path.join(tmp.name, 'listing.db')}"
+    engine = create_engine(url, **_engine_options(url))
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    for index in FileUpload.__table__.indexes:
+        index.drop(bind=engine)
+
+    start = time.perf_counter()
+    _seed(engine, args.rows)
+    print(f"{engine.dialect.name} rows={args.rows:,}  seed (s): {time.perf_counter() - start:.1f}")
+    deep = args.rows // 2
+
+    with Session(engine) as db:
+        old = db.query(FileUpload).order_by(FileUpload.uploaded_at.desc())
+        _timed("antes: primera página", lambda: old.limit(50).all(), repeat=2)
+        expected = _timed(
+            f"antes: OFFSET {deep:,}", lambda: old.offset(deep).limit(50).all(), repeat=2
+        )
+
+    start = time.perf_counter()
+    create_schema(bind=engine)
+    print(f"{'crear índices':>36}: {(time.perf_counter() - start) * 1e3:9.2f} ms")
+
+    with Session(engine) as db:
+        first, _ = _timed("keyset: primera página", lambda: list_uploads(db))
+        assert first[0].id == args.rows
+
+        # cursor de la fila anterior a la página profunda
+        before = (
+            db.query(FileUpload)
+            .order_by(FileUpload.uploaded_at.desc(), FileUpload.id.desc())
+            .offset(deep - 1)
+            .first()
+        )
+        cursor = encode_cursor(before)
+        page, _ = _timed("keyset: página profunda", lambda: list_uploads(db, cursor=cursor))
+        # el orden anterior no desempataba por id: se comparan los conjuntos
+        assert {u.id for u in page[1:-1]} <= {u.id for u in expected}
+
+        _timed("keyset: uploaded_by", lambda: list_uploads(db, uploaded_by=7))
+        week = START + datetime.timedelta(seconds=deep // 2)
+        _timed(
+            "keyset: rango de fechas",
+            lambda: list_uploads(
+                db, uploaded_from=week, uploaded_to=week + datetime.timedelta(days=7)
+            ),
+        )
+        _timed("keyset: prefijo del nombre", lambda: list_uploads(db, filename_prefix="alpina_"))
+
+        for filters in [{"uploaded_by": 7}, {"filename_prefix": "zenu_ofertas_1"}]:
+            start = time.perf_counter()
+            ids = _walk(db, **filters)
+            elapsed = time.perf_counter() - start
+            query = db.query(func.count(FileUpload.id))
+            if "uploaded_by" in filters:
+                query = query.filter(FileUpload.uploaded_by_user_id == filters["uploaded_by"])
+            else:
+                query = query.filter(FileUpload.filename_original.like("zenu_ofertas_1%"))
+            assert len(ids) == len(set(ids)) == query.scalar(), filters
+            print(f"{'recorrido ' + str(filters):>36}: {elapsed:.3f} s  ({len(ids):,} filas)")
+
+        plan = db.execute(
+            text(
+                ("EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN ")
+                + "SELECT id FROM file_uploads ORDER BY uploaded_at DESC, id DESC LIMIT 50"
+            )
+        ).fetchall()
+        print("plan:", " | ".join(str(row[-1]) for row in plan))
+
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
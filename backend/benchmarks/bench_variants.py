@@ -0,0 +1,80 @@
+"""
+Benchmark de las variantes de descarga (materialize_variant).
+
+Genera la salida limpia de una lista de ofertas y mide la primera
+generación de cada variante (CSV, XLSX, Parquet, NDJSON) desde la tabla
+intermedia, con su tamaño. Comprueba que cada archivo trae todas las filas.
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_variants --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import zipfile
+
+import pyarrow.parquet as pq
+
+from app.services.clean_output import VARIANTS, generate_clean_outputs, materialize_variant
+from benchmarks.bench_csv_ingest import build_frame
+
+COLUMNS = ["PLU", "ID_MARCA", "DESC_PLU", "DESC_MARCA", "CONTENIDO", "DESCUENTO", "PRECIO_OFERTA"]
+
+
+def _count(stream, token: bytes) -> int:
+    """Apariciones de `token` leyendo por bloques (sin perder las que cruzan bloques)."""
+    count, tail = 0, b""
+    for block in iter(lambda: stream.read(1 << 20), b""):
+        data = tail + block
+        count += data.count(token)
+        tail = data[len(data) - len(token) + 1 :]
+    return count
+
+
+def _row_count(path: str, variant: str) -> int:
+    if variant == "parquet":
+        return pq.ParquetFile(path).metadata.num_rows
+    if variant == "xlsx":
+        with zipfile.ZipFile(path) as archive:
+            sheets = [name for name in archive.namelist() if name.startswith("xl/worksheets/")]
+            rows = 0
+            for name in sheets:
+                with archive.open(name) as sheet:
+                    rows += _count(sheet, b"<row>")
+            # una fila de cabecera por hoja
+            return rows - len(sheets)
+    with open(path, "rb") as source:
+        lines = _count(source, b"\n")
+    return lines - (variant != "ndjson")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = build_frame(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ofertas.csv")
+        df.to_csv(path, index=False)
+        result = generate_clean_outputs(path, COLUMNS, output_dir=os.path.join(tmp, "out"))
+        print(f"rows={result['rows']:,}")
+
+        for variant in VARIANTS:
+            start = time.perf_counter()
+            target = materialize_variant(result["table_path"], variant)
+            elapsed = time.perf_counter() - start
+            assert _row_count(str(target), variant) == result["rows"], variant
+
+            start = time.perf_counter()
+            materialize_variant(result["table_path"], variant)
+            cached = time.perf_counter() - start
+            size = os.path.getsize(target) / 1e6
+            print(f"{variant:>10}: {elapsed:.3f} s  {size:8.1f} MB  (cached {cached * 1e3:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Listas de ofertas sintéticas para los benchmarks.
+
+Imitan los archivos de los proveedores: descripciones en español con
+acentos y espacios de más, PLU e IDs numéricos, DESCUENTO como fracción
+(0.25 = 25 %) con celdas vacías, columnas que no se procesan y encabezados
+desordenados ("Código PLU", "Precio\\nOferta ($)", "Desc. Marca"...). Dos
+de ellos solo se reconocen con un alias confirmado (`CONFIRMED_ALIASES`),
+como pasa con un proveedor nuevo.
+
+Los archivos se generan una vez por tamaño y formato en una carpeta y se
+reutilizan (`offer_file`); un XLSX de millones de filas tarda minutos.
+"""
+
+import os
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.services.column_aliases import canonical_name
+from app.services.column_normalizer import normalize_column_name
+from app.services.xlsx_writer import XLSX_MAX_ROWS
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "5m": 5_000_000}
+FORMATS = ("csv", "xlsx")
+
+# alias_key -> columna canónica, como los que guarda POST /clean/aliases
+CONFIRMED_ALIASES = {"CODIGO_PLU": "PLU", "DESCRIPCION_PLU": "DESC_PLU"}
+
+# Columnas que el usuario elige al procesar (nombres canónicos)
+SELECTED_COLUMNS = [
+    "PLU", "ID_MARCA", "DESC_PLU", "DESC_MARCA", "CONTENIDO", "DESCUENTO", "PRECIO_OFERTA",
+]
+
+_PRODUCTS = [
+    "Café molido", "Jamón serrano", "Azúcar morena", "Atún en aceite de oliva",
+    "Galletas de avena", "Leche semidesnatada", "Piña en almíbar", "Champú anticaspa",
+    "Yogur griego", "Pan de molde integral", "Turrón de Jijona", "Aceite de girasol",
+    "Salmón ahumado", "Chocolate con almendras", "Detergente líquido", "Crème fraîche",
+]
+_QUALIFIERS = [
+    "tostión media", "ecológico", "sin lactosa", "receta tradicional", "edición limitada",
+    "extra suave", "pack ahorro", "bajo en sal", "sin azúcar añadido", "categoría extra",
+]
+_BRANDS = [
+    "Nestlé", "La Española", "Bimbo", "Pascual", "Cuétara", "Ñaming", "Hacendado",
+    "Dánone", "García Baquero", "Calvo",
+]
+_CONTENTS = ["500 g", "1 kg", "12 uds", "250 ml", "1,5 L", "6 x 33 cl", "200 g", "750 ml"]
+_CATEGORIES = ["Alimentación", "Droguería", "Lácteos", "Panadería y bollería", "Perfumería"]
+_DISCOUNTS = [0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.5, np.nan]
+
+
+def _descriptions(rng: np.random.Generator, count: int = 5000) -> np.ndarray:
+    """Vocabulario de descripciones, con mayúsculas y espacios desparejos."""
+    products = rng.choice(_PRODUCTS, count)
+    qualifiers = rng.choice(_QUALIFIERS, count)
+    codes = rng.integers(1, 999, count)
+    values = [f"{p} {q} {c}" for p, q, c in zip(products, qualifiers, codes)]
+    for i in range(0, count, 7):
+        values[i] = f"  {values[i].upper()} "
+    return np.array(values)
+
+
+def offer_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """DataFrame de `rows` ofertas con los encabezados tal como llegan."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2026-01-01")
+    return pd.DataFrame(
+        {
+            " Código PLU ": rng.integers(1, 999_999, rows),
+            "Id Marca": rng.integers(1, 400, rows),
+            "Descripción PLU": rng.choice(_descriptions(rng), rows),
+            "Desc. Marca": rng.choice(_BRANDS, rows),
+            "CONTENIDO ": rng.choice(_CONTENTS, rows),
+            "Descuento (%)": rng.choice(_DISCOUNTS, rows),
+            "Precio\nOferta ($)": np.round(rng.random(rows) * 100, 2),
+            "Stock": rng.integers(0, 5000, rows),
+            "Categoría": rng.choice(_CATEGORIES, rows),
+            "Fecha Inicio": (start + rng.integers(0, 90, rows)).astype(str),
+        }
+    )
+
+
+def offer_aliases(headers: List) -> Dict[str, str]:
+    """
+    {encabezado: columna canónica} de los encabezados cuya columna canónica
+    difiere de la normalización (lo que arma resolve_aliases con la base).
+    """
+    aliases = {}
+    for header in map(str, headers):
+        canonical = canonical_name(header, CONFIRMED_ALIASES)
+        if canonical != normalize_column_name(header):
+            aliases[header] = canonical
+    return aliases
+
+
+def _write_xlsx(df: pd.DataFrame, path: str) -> None:
+    # openpyxl escribe celdas numéricas, como los archivos reales (el writer
+    # de la app escribe todo como texto). Más filas que las de una hoja se
+    # reparten en varias.
+    from openpyxl import Workbook
+
+    per_sheet = XLSX_MAX_ROWS - 1
+    workbook = Workbook(write_only=True)
+    for index, first in enumerate(range(0, max(len(df), 1), per_sheet)):
+        sheet = workbook.create_sheet("Ofertas" if index == 0 else f"Ofertas {index + 1}")
+        sheet.append(list(df.columns))
+        part = df.iloc[first : first + per_sheet].astype(object)
+        part = part.where(part.notna(), None)
+        for row in part.itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(path)
+
+
+def write_offer_file(path: str, rows: int, seed: int = 0) -> None:
+    df = offer_frame(rows, seed)
+    if path.endswith(".xlsx"):
+        _write_xlsx(df, path)
+    else:
+        df.to_csv(path, index=False)
+
+
+def offer_file(data_dir: str, rows: int, fmt: str, seed: int = 0) -> str:
+    """Ruta del archivo de `rows` ofertas en `fmt`; lo genera si no existe."""
+    path = os.path.join(data_dir, f"ofertas_{rows}_{seed}.{fmt}")
+    if not os.path.exists(path):
+        # a un temporal primero: una generación interrumpida no se reutiliza
+        tmp = os.path.join(data_dir, f".tmp_ofertas_{rows}_{seed}.{fmt}")
+        write_offer_file(tmp, rows, seed)
+        os.replace(tmp, path)
+    return path
@@ -0,0 +1,36 @@
+import os
+import tempfile
+
+# Antes de importar app: base, uploads y salidas en una carpeta temporal
+_TMP = tempfile.mkdtemp(prefix="ge-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/test.db"
+os.environ["UPLOAD_DIR"] = os.path.join(_TMP, "uploads")
+os.environ["CACHE_DIR"] = os.path.join(_TMP, "cache")
+os.environ["OUTPUT_DIR"] = os.path.join(_TMP, "outputs")
+os.environ["WARM_UP_IMPORTS"] = "0"
+os.environ["JOB_WORKERS"] = "1"
+os.environ["XLSX_SHEET_WORKERS"] = "1"
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Cliente de la API con el lifespan (esquema creado) activo."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db(client):
+    from app.db import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,121 @@
+import time
+import uuid
+
+import pytest
+
+from app import models
+from app.core import security
+from app.core.security import Principal, TokenCache
+
+
+def _principal(user_id=1):
+    return Principal(
+        id=user_id, email=f"{user_id}@x.co", full_name=None, role=None, is_active=True, created_at=None
+    )
+
+
+def test_cache_evicts_the_least_recently_used():
+    cache = TokenCache(maxsize=2, ttl_seconds=60)
+    cache.put("a", _principal(1), cache.generation)
+    cache.put("b", _principal(2), cache.generation)
+    cache.get("a")
+
+    cache.put("c", _principal(3), cache.generation)
+
+    assert cache.get("b") is None
+    assert cache.get("a").id == 1
+    assert cache.get("c").id == 3
+
+
+def test_entries_expire_with_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(security.time, "monotonic", lambda: now[0])
+    cache = TokenCache(maxsize=10, ttl_seconds=30)
+    cache.put("a", _principal(), cache.generation)
+
+    now[0] += 29
+    assert cache.get("a") is not None
+    now[0] += 1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_token_exp_bounds_the_ttl():
+    cache = TokenCache(maxsize=10, ttl_seconds=300)
+
+    cache.put("expired", _principal(), cache.generation, token_exp=time.time() - 1)
+    cache.put("valid", _principal(), cache.generation, token_exp=time.time() + 60)
+
+    assert cache.get("expired") is None
+    assert cache.get("valid") is not None
+
+
+def test_lookup_started_before_an_invalidation_is_not_cached():
+    cache = TokenCache(maxsize=10, ttl_seconds=60)
+    generation = cache.generation
+    # el usuario cambia mientras se leía de la DB
+    cache.invalidate_user(1)
+
+    cache.put("a", _principal(1), generation)
+
+    assert cache.get("a") is None
+
+
+def test_invalidate_user_drops_only_their_tokens():
+    cache = TokenCache(maxsize=10, ttl_seconds=60)
+    for token, user_id in (("a", 1), ("b", 1), ("c", 2)):
+        cache.put(token, _principal(user_id), cache.generation)
+
+    cache.invalidate_user(1)
+
+    assert cache.get("a") is None and cache.get("b") is None
+    assert cache.get("c").id == 2
+
+
+@pytest.fixture
+def token(client):
+    security.token_cache.clear()
+    email = f"{uuid.uuid4().hex[:8]}@ofertas.cl"
+    client.post(
+        "/auth/users", json={"email": email, "full_name": "Ana", "role": "admin", "password": "pw"}
+    )
+    response = client.post("/auth/login", data={"username": email, "password": "pw"})
+    return response.json()["access_token"]
+
+
+def test_token_is_resolved_from_the_db_once(client, token, monkeypatch):
+    loads = []
+    original = security._load_principal
+    monkeypatch.setattr(
+        security, "_load_principal", lambda email: loads.append(email) or original(email)
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    responses = [client.get("/auth/users/me", headers=headers) for _ in range(3)]
+
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert len(loads) == 1
+
+
+def test_deactivating_a_user_invalidates_the_cached_token(client, db, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    email = client.get("/auth/users/me", headers=headers).json()["email"]
+
+    user = db.query(models.User).filter(models.User.email == email).one()
+    user.is_active = False
+    db.commit()
+
+    assert client.get("/auth/users/me", headers=headers).status_code == 403
+
+
+def test_invalid_or_missing_token(client):
+    assert client.get("/auth/users/me").status_code == 401
+    assert client.get("/auth/users/me", headers={"Authorization": "Bearer x"}).status_code == 401
+    # rutas con usuario opcional: sin token pasan, con token inválido no
+    assert client.get("/clean/clean/aliases").status_code == 200
+    response = client.post(
+        "/clean/clean/aliases",
+        json={"mapping": {"Codigo": "PLU"}},
+        headers={"Authorization": "Bearer x"},
+    )
+    assert response.status_code == 401
@@ -0,0 +1,78 @@
+from openpyxl import Workbook
+
+from app.services import clean_preview, ingest_cache, xlsx_ingest
+
+ROWS = [["Code", "Price"], ["007", 1.5], [None, None], ["008", 2.0]]
+
+
+def _save(path, write_only=False):
+    workbook = Workbook(write_only=write_only)
+    sheet = workbook.create_sheet("Ofertas") if write_only else workbook.active
+    for row in ROWS:
+        sheet.append(row)
+    workbook.save(path)
+    return path
+
+
+def test_xlsx_preview_opens_workbook_once(tmp_path, monkeypatch):
+    path = _save(tmp_path / "offers.xlsx")
+    opened = []
+    original = xlsx_ingest.load_workbook
+
+    def counting_load_workbook(*args, **kwargs):
+        opened.append(args[0])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(xlsx_ingest, "load_workbook", counting_load_workbook)
+
+    preview = clean_preview.generate_preview(str(path))
+
+    assert len(opened) == 1
+    assert preview["columns"] == ["Code", "Price"]
+    assert [sheet["name"] for sheet in preview["sheets"]] == ["Sheet"]
+
+
+def test_xlsx_row_count_matches_reader(tmp_path):
+    path = _save(tmp_path / "offers.xlsx")
+
+    preview = clean_preview.generate_preview(str(path))
+
+    # la fila vacía intermedia cuenta, como en la lectura
+    assert preview["rows"] == len(xlsx_ingest.read_xlsx(path)) == 3
+    assert preview["sheets"][0]["rows"] == 3
+
+
+def test_xlsx_without_dimension_reports_unknown_rows(tmp_path):
+    path = _save(tmp_path / "offers.xlsx", write_only=True)
+
+    preview = clean_preview.generate_preview(str(path))
+
+    assert preview["rows"] is None
+    assert preview["sheets"] == [{"name": "Ofertas", "rows": None, "columns": ["Code", "Price"]}]
+
+
+def test_csv_row_count_skips_blank_lines_like_the_reader(tmp_path):
+    path = tmp_path / "offers.csv"
+    path.write_text("Code,Price\n007,1.5\n\n008,2.0\n\n", encoding="utf-8")
+
+    preview = clean_preview.generate_preview(str(path))
+
+    assert preview["rows"] == 2
+    assert preview["sheets"] is None
+
+
+def test_sample_has_the_same_types_with_and_without_sidecar(tmp_path):
+    # la primera fila sola diría int en Code, Price y Mixed y float en PLU
+    path = tmp_path / "offers.csv"
+    path.write_text(
+        "PLU,Code,Price,Mixed,Desc\n1,007,1,5,Café\n,abc,2.5,x,Té\n3,008,3,6,Café\n",
+        encoding="utf-8",
+    )
+    file_id = 424242
+
+    before = clean_preview.generate_preview(str(path), file_id=file_id)["sample"]
+    assert ingest_cache.build_cache(str(path), file_id) is not None
+    after = clean_preview.generate_preview(str(path), file_id=file_id)["sample"]
+
+    assert before == after == {"PLU": 1, "Code": "007", "Price": 1.0, "Mixed": "5", "Desc": "Café"}
+    assert [type(value) for value in before.values()] == [type(value) for value in after.values()]
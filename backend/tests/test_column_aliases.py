@@ -0,0 +1,94 @@
+import pytest
+
+from app.models import ColumnAlias
+from app.services import column_aliases
+from app.services.column_normalizer import alias_key, normalize_column_name
+
+
+@pytest.fixture
+def aliases_db(db):
+    db.query(ColumnAlias).delete()
+    db.commit()
+    yield db
+    db.query(ColumnAlias).delete()
+    db.commit()
+
+
+@pytest.mark.parametrize(
+    "header, normalized, key",
+    [
+        ("Precio Oferta ($)", "PRECIO_OFERTA_", "PRECIO_OFERTA"),
+        ("  Código\nPLU ", "CODIGO_PLU", "CODIGO_PLU"),
+        ("__Desc__Plu", "__DESC__PLU", "DESC_PLU"),
+    ],
+)
+def test_alias_key_is_a_looser_normalization(header, normalized, key):
+    assert normalize_column_name(header) == normalized
+    assert alias_key(header) == key
+
+
+def test_known_columns_match_without_a_confirmed_alias():
+    assert column_aliases.canonical_name("Precio Oferta ($)", {}) == "PRECIO_OFERTA"
+    assert column_aliases.canonical_name("Stock Local", {}) == "STOCK_LOCAL"
+
+
+def test_confirmed_alias_maps_header_variants(aliases_db):
+    column_aliases.learn_aliases(aliases_db, {"Código PLU": "PLU"})
+
+    resolved = column_aliases.resolve_aliases(
+        aliases_db, ["CODIGO  PLU ", "_codigo_plu", "Precio Oferta ($)", "PLU", "Stock"]
+    )
+
+    # solo los encabezados cuya columna difiere de la normalización
+    assert resolved == {
+        "CODIGO  PLU ": "PLU",
+        "_codigo_plu": "PLU",
+        "Precio Oferta ($)": "PRECIO_OFERTA",
+    }
+
+
+def test_index_is_reloaded_only_when_the_table_changes(aliases_db):
+    column_aliases.learn_aliases(aliases_db, {"Código PLU": "PLU"})
+    index = column_aliases.alias_index(aliases_db)
+
+    assert column_aliases.alias_index(aliases_db) is index
+
+    column_aliases.learn_aliases(aliases_db, {"Codigo PLU": "COD_PLU"})
+    assert column_aliases.alias_index(aliases_db) == {"CODIGO_PLU": "COD_PLU"}
+
+    alias = aliases_db.query(ColumnAlias).one()
+    assert column_aliases.delete_alias(aliases_db, alias.id)
+    assert column_aliases.alias_index(aliases_db) == {}
+
+
+@pytest.mark.parametrize("mapping", [{"($)": "PLU"}, {"Código": "plu"}, {"Código": ""}])
+def test_invalid_mappings_are_rejected(aliases_db, mapping):
+    with pytest.raises(column_aliases.AliasError):
+        column_aliases.learn_aliases(aliases_db, mapping)
+
+
+def test_alias_routes(client, aliases_db):
+    assert client.post("/clean/clean/aliases", json={"mapping": {}}).status_code == 400
+    assert client.post("/clean/clean/aliases", json={"mapping": {"x": "plu"}}).status_code == 400
+
+    created = client.post("/clean/clean/aliases", json={"mapping": {"Código PLU": "PLU"}})
+
+    assert created.status_code == 200
+    [alias] = created.json()
+    assert (alias["alias_key"], alias["canonical_name"]) == ("CODIGO_PLU", "PLU")
+    assert [item["id"] for item in client.get("/clean/clean/aliases").json()] == [alias["id"]]
+    assert client.delete(f"/clean/clean/aliases/{alias['id']}").status_code == 204
+    assert client.delete(f"/clean/clean/aliases/{alias['id']}").status_code == 404
+
+
+def test_preview_normalization_applies_aliases(client, aliases_db):
+    content = "Código PLU,Precio Oferta ($),Desc\n1,1.5,a\n".encode()
+    file_id = client.post("/uploads/", files={"file": ("ofertas.csv", content)}).json()["id"]
+    column_aliases.learn_aliases(aliases_db, {"Código PLU": "PLU"})
+
+    normalization = client.post("/clean/clean/preview", params={"file_id": file_id}).json()[
+        "normalization"
+    ]
+
+    assert normalization["normalized"] == ["PLU", "PRECIO_OFERTA", "DESC"]
+    assert normalization["aliases"] == {"Código PLU": "PLU", "Precio Oferta ($)": "PRECIO_OFERTA"}
@@ -0,0 +1,102 @@
+import pandas as pd
+import pytest
+
+from app.services import data_grid, ingest_cache
+
+OFFERS = pd.DataFrame(
+    {
+        "PLU": list(range(1, 31)),
+        "Desc Plu": [f"{'Café' if index % 3 else 'Té'} {index}" for index in range(1, 31)],
+        "Precio": [None if index % 10 == 0 else float(index % 7) for index in range(1, 31)],
+    }
+)
+
+
+@pytest.fixture
+def offers_csv(tmp_path):
+    path = tmp_path / "ofertas.csv"
+    OFFERS.to_csv(path, index=False)
+    return str(path)
+
+
+def test_window_is_a_slice_of_the_sidecar(offers_csv):
+    window = data_grid.read_window(offers_csv, offset=25, limit=10, columns=["PLU"])
+
+    assert ingest_cache.open_cached_table(offers_csv) is not None
+    assert window["total"] == 30
+    assert window["columns"] == ["PLU"]
+    assert window["rows"] == [{"PLU": plu} for plu in range(26, 31)]
+
+
+def test_sort_puts_nulls_last(offers_csv):
+    window = data_grid.read_window(offers_csv, limit=30, sort="Precio", descending=True)
+
+    prices = [row["Precio"] for row in window["rows"]]
+    expected = OFFERS.sort_values("Precio", ascending=False, kind="stable", na_position="last")
+    assert prices[:27] == expected["Precio"].tolist()[:27]
+    assert prices[27:] == [None, None, None]
+
+
+def test_filters_are_case_insensitive_and_combined(offers_csv):
+    window = data_grid.read_window(
+        offers_csv, limit=5, filters=["Desc Plu=té", "Precio=3"], sort="PLU", descending=True
+    )
+
+    expected = OFFERS[
+        OFFERS["Desc Plu"].str.contains("té", case=False)
+        & OFFERS["Precio"].map(lambda value: "3" in str(value) if pd.notna(value) else False)
+    ].sort_values("PLU", ascending=False)
+    assert window["total"] == len(expected)
+    assert [row["PLU"] for row in window["rows"]] == expected["PLU"].tolist()[:5]
+
+
+def test_sorted_indices_are_reused_between_windows(offers_csv, monkeypatch):
+    first = data_grid.read_window(offers_csv, offset=0, limit=10, sort="Desc Plu")
+    calls = []
+    monkeypatch.setattr(
+        data_grid.pc, "array_sort_indices", lambda *args, **kwargs: calls.append(args)
+    )
+
+    second = data_grid.read_window(offers_csv, offset=10, limit=10, sort="Desc Plu")
+
+    assert calls == []
+    assert first["rows"][-1]["Desc Plu"] <= second["rows"][0]["Desc Plu"]
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    [
+        ({"offset": -1}, "offset"),
+        ({"limit": 0}, "limit"),
+        ({"limit": data_grid.MAX_WINDOW_ROWS + 1}, "limit"),
+        ({"columns": ["STOCK"]}, "STOCK"),
+        ({"sort": "STOCK"}, "STOCK"),
+        ({"filters": ["PLU"]}, "COLUMN=text"),
+    ],
+)
+def test_invalid_windows(offers_csv, kwargs, message):
+    with pytest.raises(data_grid.GridError, match=message):
+        data_grid.read_window(offers_csv, **kwargs)
+
+
+def test_rows_route(client, tmp_path):
+    content = OFFERS.to_csv(index=False).encode()
+    file_id = client.post("/uploads/", files={"file": ("ofertas.csv", content)}).json()["id"]
+
+    response = client.get(
+        "/clean/clean/rows",
+        params={"file_id": file_id, "offset": 2, "limit": 2, "columns": ["PLU", "Desc Plu"]},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "file_id": file_id,
+        "offset": 2,
+        "limit": 2,
+        "total": 30,
+        "columns": ["PLU", "Desc Plu"],
+        "rows": [{"PLU": 3, "Desc Plu": "Té 3"}, {"PLU": 4, "Desc Plu": "Café 4"}],
+    }
+    bad = client.get("/clean/clean/rows", params={"file_id": file_id, "sort": "STOCK"})
+    assert bad.status_code == 400
+    assert client.get("/clean/clean/rows", params={"file_id": 999999}).status_code == 404
@@ -0,0 +1,114 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.db import create_schema
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Esquema de la base antes de content_hash, profile_json, version, batch_id...
+BASELINE_DDL = [
+    """CREATE TABLE users (
+        id INTEGER NOT NULL, email VARCHAR NOT NULL, full_name VARCHAR,
+        hashed_password VARCHAR, role VARCHAR, is_active BOOLEAN NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, PRIMARY KEY (id))""",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    """CREATE TABLE roles (
+        id INTEGER NOT NULL, name VARCHAR NOT NULL, description VARCHAR,
+        PRIMARY KEY (id), UNIQUE (name))""",
+    """CREATE TABLE user_roles (
+        id INTEGER NOT NULL, user_id INTEGER NOT NULL, role_id INTEGER NOT NULL,
+        PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id),
+        FOREIGN KEY(role_id) REFERENCES roles (id))""",
+    """CREATE TABLE file_uploads (
+        id INTEGER NOT NULL, filename_original VARCHAR NOT NULL,
+        storage_path VARCHAR NOT NULL, uploaded_by_user_id INTEGER,
+        uploaded_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, PRIMARY KEY (id),
+        FOREIGN KEY(uploaded_by_user_id) REFERENCES users (id))""",
+    """CREATE TABLE cleaning_configs (
+        id INTEGER NOT NULL, name VARCHAR NOT NULL, description VARCHAR,
+        config_json JSON NOT NULL, created_by_user_id INTEGER NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, PRIMARY KEY (id),
+        FOREIGN KEY(created_by_user_id) REFERENCES users (id))""",
+    """CREATE TABLE cleaning_run_logs (
+        id INTEGER NOT NULL, file_upload_id INTEGER NOT NULL,
+        cleaning_config_id INTEGER NOT NULL, status VARCHAR NOT NULL, message TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, PRIMARY KEY (id),
+        FOREIGN KEY(file_upload_id) REFERENCES file_uploads (id),
+        FOREIGN KEY(cleaning_config_id) REFERENCES cleaning_configs (id))""",
+    "INSERT INTO users (id, email, is_active) VALUES (1, 'ana@example.com', 1)",
+    """INSERT INTO file_uploads (id, filename_original, storage_path)
+        VALUES (1, 'ofertas.csv', 'uploads/old.csv')""",
+    """INSERT INTO cleaning_configs (id, name, config_json, created_by_user_id)
+        VALUES (1, 'base', '{}', 1)""",
+    """INSERT INTO cleaning_run_logs (id, file_upload_id, cleaning_config_id, status)
+        VALUES (1, 1, 1, 'success')""",
+]
+
+
+def _baseline_db(path: Path) -> str:
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        for statement in BASELINE_DDL:
+            connection.execute(text(statement))
+    engine.dispose()
+    return url
+
+
+def _columns(inspector, table):
+    return {column["name"]: column for column in inspector.get_columns(table)}
+
+
+def test_create_schema_upgrades_baseline_db(tmp_path):
+    engine = create_engine(_baseline_db(tmp_path / "baseline.db"))
+
+    create_schema(engine)
+    create_schema(engine)  # idempotente
+
+    inspector = inspect(engine)
+    uploads = _columns(inspector, "file_uploads")
+    assert {"content_hash", "profile_json"} <= set(uploads)
+    assert "ix_file_uploads_content_hash" in {i["name"] for i in inspector.get_indexes("file_uploads")}
+    assert "version" in _columns(inspector, "cleaning_configs")
+    runs = _columns(inspector, "cleaning_run_logs")
+    assert "batch_id" in runs
+    assert runs["cleaning_config_id"]["nullable"]
+    with engine.begin() as connection:
+        assert connection.execute(text("SELECT version FROM cleaning_configs")).scalar() == 1
+        assert connection.execute(text("SELECT status FROM cleaning_run_logs")).scalar() == "success"
+        connection.execute(
+            text("INSERT INTO cleaning_run_logs (file_upload_id, status) VALUES (1, 'queued')")
+        )
+
+
+def test_app_starts_on_baseline_db(tmp_path):
+    url = _baseline_db(tmp_path / "baseline.db")
+    script = textwrap.dedent(
+        """
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        with TestClient(app) as client:
+            response = client.get("/uploads/")
+            assert response.status_code == 200, response.text
+            assert "ofertas.csv" in response.text
+        """
+    )
+    env = {
+        **os.environ,
+        "DATABASE_URL": url,
+        "UPLOAD_DIR": str(tmp_path / "uploads"),
+        "OUTPUT_DIR": str(tmp_path / "outputs"),
+        "CACHE_DIR": str(tmp_path / "cache"),
+        "PYTHONPATH": str(BACKEND_DIR),
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=tmp_path, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
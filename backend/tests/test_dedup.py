@@ -0,0 +1,136 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from app.services import clean_output
+from app.services.dedup import find_duplicates
+
+# PLU 1 aparece 4 veces con precios distintos; las filas sin PLU no se agrupan
+TABLE = pa.table(
+    {
+        "PLU": ["1", "2", "1", "3", "1", "", "2", "1", ""],
+        "PRECIO": ["10", "20", "11", "30", "12", "0", "20", "13", "0"],
+    }
+)
+
+
+def test_report_counts_groups_and_conflicts():
+    report, _ = find_duplicates(TABLE, ["PLU"], "keep_first")
+
+    assert report["empty_keys"] == 2
+    assert report["duplicate_groups"] == 2
+    assert report["duplicate_rows"] == 4
+    assert report["conflicting_groups"] == 1
+    assert report["conflicts_by_column"] == {"PRECIO": 1}
+    assert report["groups"] == [
+        {"key": {"PLU": "1"}, "rows": 4, "conflicts": {"PRECIO": ["10", "11", "12", "13"]}},
+        {"key": {"PLU": "2"}, "rows": 2, "conflicts": {}},
+    ]
+
+
+def test_keep_first_keeps_the_first_row_of_each_key():
+    report, keep = find_duplicates(TABLE, ["PLU"], "keep_first")
+
+    assert TABLE.filter(keep).to_pydict() == {
+        "PLU": ["1", "2", "3", "", ""],
+        "PRECIO": ["10", "20", "30", "0", "0"],
+    }
+    assert report["removed_rows"] == 4
+
+
+def test_keep_last_keeps_the_last_row_of_each_key():
+    report, keep = find_duplicates(TABLE, ["PLU"], "keep_last")
+
+    assert TABLE.filter(keep).to_pydict() == {
+        "PLU": ["3", "", "2", "1", ""],
+        "PRECIO": ["30", "0", "20", "13", "0"],
+    }
+    assert report["removed_rows"] == 4
+
+
+def test_keep_last_matches_pandas_on_many_repeats():
+    rng = np.random.default_rng(0)
+    plu = rng.integers(0, 50, 100_000).astype(str)
+    table = pa.table({"PLU": plu, "PRECIO": np.arange(len(plu)).astype(str)})
+
+    _, keep = find_duplicates(table, ["PLU"], "keep_last")
+
+    expected = table.to_pandas().drop_duplicates("PLU", keep="last")
+    assert table.filter(keep)["PRECIO"].to_pylist() == expected["PRECIO"].tolist()
+
+
+def test_fail_reports_without_mask():
+    report, keep = find_duplicates(TABLE, ["PLU"], "fail")
+
+    assert keep is None
+    assert report["duplicate_rows"] == 4
+    assert report["removed_rows"] == 0
+
+
+def test_composite_key():
+    table = pa.table({"PLU": ["1", "1", "1"], "LOCAL": ["a", "b", "a"], "PRECIO": ["1", "2", "3"]})
+
+    report, keep = find_duplicates(table, ["PLU", "LOCAL"], "keep_first")
+
+    assert keep.to_pylist() == [True, True, False]
+    assert report["groups"] == [
+        {"key": {"PLU": "1", "LOCAL": "a"}, "rows": 2, "conflicts": {"PRECIO": ["1", "3"]}}
+    ]
+
+
+def test_without_duplicates_nothing_is_removed():
+    report, keep = find_duplicates(TABLE.slice(0, 4), ["PLU", "PRECIO"], "keep_last")
+
+    assert keep is None
+    assert report["duplicate_rows"] == 0
+
+
+def test_missing_key_column_is_an_error():
+    with pytest.raises(ValueError, match="LOCAL"):
+        find_duplicates(TABLE, ["PLU", "LOCAL"], "keep_first")
+
+
+@pytest.fixture
+def offers_csv(tmp_path):
+    path = tmp_path / "ofertas.csv"
+    TABLE.to_pandas().rename(columns={"PRECIO": "Precio"}).to_csv(path, index=False)
+    return path
+
+
+def test_clean_outputs_keep_last(offers_csv, tmp_path):
+    result = clean_output.generate_clean_outputs(
+        str(offers_csv),
+        ["PLU", "PRECIO"],
+        output_dir=str(tmp_path / "out"),
+        dedup={"key_columns": ["PLU"], "policy": "keep_last"},
+    )
+
+    assert result["rows"] == 5
+    assert result["dedup"]["removed_rows"] == 4
+
+
+def test_clean_outputs_fail_raises_with_the_report(offers_csv, tmp_path):
+    with pytest.raises(clean_output.DuplicateKeysError) as error:
+        clean_output.generate_clean_outputs(
+            str(offers_csv),
+            ["PLU", "PRECIO"],
+            output_dir=str(tmp_path / "out"),
+            dedup={"key_columns": ["PLU"], "policy": "fail"},
+        )
+
+    assert error.value.report["duplicate_groups"] == 2
+
+
+@pytest.mark.parametrize(
+    "dedup",
+    [
+        {"key_columns": ["PLU"], "policy": "nope"},
+        {"key_columns": [], "policy": "keep_first"},
+        {"key_columns": ["STOCK"], "policy": "keep_first"},
+    ],
+)
+def test_clean_outputs_rejects_invalid_options(offers_csv, tmp_path, dedup):
+    with pytest.raises(clean_output.OutputEngineError):
+        clean_output.generate_clean_outputs(
+            str(offers_csv), ["PLU", "PRECIO"], output_dir=str(tmp_path / "out"), dedup=dedup
+        )
@@ -0,0 +1,126 @@
+import time
+import uuid
+
+import pyarrow as pa
+import pytest
+
+from app.routes.cleaner import _negotiate_encoding
+
+
+@pytest.fixture(scope="module")
+def url(client):
+    rows = "".join(f"{index},Café {index % 7}\n" for index in range(2000))
+    content = f"PLU,Desc Plu\n{uuid.uuid4().int % 10**6},Piña\n{rows}".encode()
+    file_id = client.post("/uploads/", files={"file": ("ofertas.csv", content)}).json()["id"]
+    job = client.post(
+        "/clean/clean/process", json={"file_id": file_id, "columns": ["PLU", "DESC_PLU"]}
+    ).json()
+    deadline = time.monotonic() + 60
+    while job["status"] not in ("succeeded", "failed"):
+        assert time.monotonic() < deadline, job
+        time.sleep(0.1)
+        job = client.get(f"/clean/clean/jobs/{job['job_id']}").json()
+    assert job["status"] == "succeeded", job
+    return f"/clean/clean/download?output_id={job['result']['output_id']}"
+
+
+@pytest.fixture(scope="module")
+def plain(client, url):
+    return client.get(url, headers={"Accept-Encoding": "identity"})
+
+
+def test_plain_download_has_etag_and_ranges(plain):
+    assert plain.status_code == 200
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["accept-ranges"] == "bytes"
+    assert plain.headers["vary"].startswith("Accept-Encoding")
+    # BOM para que Excel abra el CSV como UTF-8
+    assert plain.content.startswith("\ufeffPLU;DESC_PLU".encode("utf-8"))
+
+
+def test_gzip_is_served_precompressed(client, url, plain):
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(plain.content)
+    assert response.headers["etag"] != plain.headers["etag"]
+    # httpx descomprime el cuerpo
+    assert response.content == plain.content
+
+
+def test_zstd_is_preferred_by_q_value(client, url, plain):
+    with client.stream("GET", url, headers={"Accept-Encoding": "gzip;q=0.5, zstd"}) as response:
+        assert response.headers["content-encoding"] == "zstd"
+        raw = b"".join(response.iter_raw())
+
+    assert pa.CompressedInputStream(pa.BufferReader(raw), "zstd").read() == plain.content
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("gzip;q=0.5, zstd", "zstd"),
+        ("zstd;q=0.1, gzip", "gzip"),
+        ("gzip;q=0, zstd;q=0", None),
+        ("*", "zstd"),
+        ("*;q=0.5, zstd;q=0", "gzip"),
+        ("GZIP", "gzip"),
+    ],
+)
+def test_negotiate_encoding(header, expected):
+    assert _negotiate_encoding(header) == expected
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", "W/{etag}", '"other", {etag}', "*"])
+def test_matching_etag_is_not_modified(client, url, plain, if_none_match):
+    etag = plain.headers["etag"]
+    response = client.get(
+        url,
+        headers={"Accept-Encoding": "identity", "If-None-Match": if_none_match.format(etag=etag)},
+    )
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_stale_etag_downloads_again(client, url, plain):
+    response = client.get(url, headers={"Accept-Encoding": "identity", "If-None-Match": '"old"'})
+
+    assert response.status_code == 200
+
+
+def test_range_resumes_a_download(client, url, plain):
+    size = len(plain.content)
+
+    response = client.get(url, headers={"Accept-Encoding": "identity", "Range": "bytes=100-"})
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 100-{size - 1}/{size}"
+    assert response.content == plain.content[100:]
+
+
+def test_stream_matches_the_file(client, url, plain):
+    response = client.get(url + "&stream=true", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == plain.headers["etag"]
+    assert response.content == plain.content
+
+
+def test_binary_variants_are_not_recompressed(client, url):
+    response = client.get(url + "&variant=xlsx", headers={"Accept-Encoding": "gzip, zstd"})
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.content[:2] == b"PK"
+
+
+def test_invalid_requests(client, url):
+    assert client.get(url + "&variant=pdf").status_code == 400
+    assert client.get("/clean/clean/download?output_id=999999").status_code == 404
+    assert client.get("/clean/clean/download").status_code == 400
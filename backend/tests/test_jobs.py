@@ -0,0 +1,87 @@
+import time
+import uuid
+from concurrent.futures import Future
+
+import pytest
+
+from app.models import CleaningRunLog
+from app.services import jobs
+
+
+def _wait(client, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/clean/clean/jobs/{job_id}").json()
+        if job["status"] in jobs.FINISHED_STATUSES:
+            return job
+        assert time.monotonic() < deadline, job
+        time.sleep(0.1)
+
+
+@pytest.fixture
+def file_id(client):
+    # contenido único: el almacén de salidas no debe responder por otro test
+    content = f"PLU,Desc Plu,Precio\n1,a,10\n2,b,20\n{uuid.uuid4().int % 10**6},c,30\n"
+    response = client.post("/uploads/", files={"file": ("ofertas.csv", content.encode())})
+    return response.json()["id"]
+
+
+def test_process_runs_as_a_job_and_reports_the_result(client, file_id):
+    body = {"file_id": file_id, "columns": ["PLU", "PRECIO"]}
+
+    queued = client.post("/clean/clean/process", json=body)
+
+    assert queued.status_code == 202
+    assert queued.json()["status"] == jobs.STATUS_QUEUED
+    assert queued.json()["options"]["columns"] == ["PLU", "PRECIO"]
+
+    job = _wait(client, queued.json()["job_id"])
+
+    assert job["status"] == jobs.STATUS_SUCCEEDED, job
+    assert job["progress"] == 1.0
+    assert job["cached"] is False
+    assert job["result"]["rows"] == 3
+    assert job["timings"]["total_seconds"] > 0
+    listed = client.get("/clean/clean/jobs", params={"file_id": file_id}).json()
+    assert [item["job_id"] for item in listed] == [job["job_id"]]
+
+
+def test_same_options_reuse_the_stored_output(client, file_id):
+    body = {"file_id": file_id, "columns": ["PLU", "PRECIO"]}
+    first = _wait(client, client.post("/clean/clean/process", json=body).json()["job_id"])
+
+    second = client.post("/clean/clean/process", json=body).json()
+
+    # sin pasar por el pool: el job nace terminado
+    assert second["status"] == jobs.STATUS_SUCCEEDED
+    assert second["cached"] is True
+    assert second["result"]["table_path"] == first["result"]["table_path"]
+
+
+def test_failed_job_keeps_the_error(client, file_id):
+    body = {"file_id": file_id, "columns": ["PLU", "STOCK"]}
+
+    job = _wait(client, client.post("/clean/clean/process", json=body).json()["job_id"])
+
+    assert job["status"] == jobs.STATUS_FAILED
+    assert "STOCK" in job["error"]
+    assert job["result"] is None
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/clean/clean/jobs/999999").status_code == 404
+
+
+def test_worker_crash_marks_the_job_failed(client, db, file_id):
+    run = CleaningRunLog(file_upload_id=file_id, status=jobs.STATUS_RUNNING, message="{}")
+    db.add(run)
+    db.commit()
+    future = Future()
+    future.set_exception(RuntimeError("worker died"))
+
+    jobs._on_job_done(run.id, future)
+
+    db.refresh(run)
+    job = jobs.serialize_job(run)
+    assert job["status"] == jobs.STATUS_FAILED
+    assert job["error"] == "Worker error: worker died"
@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from app.models import FileUpload
+from app.services import column_profile, ingest_cache
+
+
+@pytest.fixture
+def upload(db, tmp_path):
+    path = tmp_path / "ofertas.csv"
+    pd.DataFrame({"PLU": [1, 2, 3], "Precio": [1.5, 2.5, None]}).to_csv(path, index=False)
+    file = FileUpload(filename_original="ofertas.csv", storage_path=str(path))
+    db.add(file)
+    db.commit()
+    yield file
+    db.delete(file)
+    db.commit()
+
+
+def test_preview_without_sidecar_profiles_after_responding(client, db, upload, monkeypatch):
+    built = []
+    original = column_profile.warm_profile
+
+    def warm_profile(storage_path, file_id):
+        # el perfil aún no existe mientras se arma la respuesta
+        built.append(file_id)
+        original(storage_path, file_id)
+
+    monkeypatch.setattr(column_profile, "warm_profile", warm_profile)
+
+    first = client.post("/clean/clean/preview", params={"file_id": upload.id})
+
+    assert first.status_code == 200
+    assert first.json()["profile"] is None
+    # TestClient corre las tareas de fondo antes de volver
+    assert built == [upload.id]
+    assert ingest_cache.open_cached_table(upload.storage_path, upload.id) is not None
+
+    second = client.post("/clean/clean/preview", params={"file_id": upload.id})
+
+    profile = second.json()["profile"]
+    assert profile["rows"] == 3
+    assert [column["name"] for column in profile["columns"]] == ["PLU", "Precio"]
+    assert built == [upload.id]
+
+
+def test_preview_profiles_an_existing_sidecar(client, db, upload):
+    ingest_cache.build_cache(upload.storage_path, upload.id)
+
+    response = client.post("/clean/clean/preview", params={"file_id": upload.id})
+
+    assert response.json()["profile"]["rows"] == 3
+    db.refresh(upload)
+    assert column_profile.load_profile(upload.profile_json) is not None
@@ -0,0 +1,19 @@
+import pandas as pd
+
+from app.services.upload_diff import compare_columns_for
+
+ALIASES = {"Precio Oferta ($)": "PRECIO_OFERTA"}
+
+
+def test_aliased_column_is_compared_once(tmp_path):
+    old_path, new_path = tmp_path / "old.csv", tmp_path / "new.csv"
+    pd.DataFrame({"PLU": [1], "Precio Oferta ($)": [1.5], "Desc Plu": ["a"]}).to_csv(
+        old_path, index=False
+    )
+    pd.DataFrame({"PLU": [1], "Precio Oferta ($)": [2.5], "Desc Plu": ["a"]}).to_csv(
+        new_path, index=False
+    )
+
+    columns = compare_columns_for(str(old_path), str(new_path), ["PLU"], aliases=ALIASES)
+
+    assert columns == ["PRECIO_OFERTA", "DESC_PLU"]
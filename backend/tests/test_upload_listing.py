@@ -0,0 +1,90 @@
+import datetime
+
+import pytest
+
+from app.models import FileUpload
+
+BASE = datetime.datetime(2026, 3, 1, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture
+def uploads(db):
+    """60 uploads; de a tres comparten uploaded_at (el desempate es el id)."""
+    db.query(FileUpload).delete()
+    rows = [
+        FileUpload(
+            filename_original=f"{'lider' if i % 2 else 'acme'}_ofertas_{i:02d}.csv",
+            storage_path=f"uploads/{i}.csv",
+            uploaded_by_user_id=1 if i % 3 == 0 else 2,
+            uploaded_at=BASE + datetime.timedelta(hours=i // 3),
+        )
+        for i in range(60)
+    ]
+    db.add_all(rows)
+    db.commit()
+    expected = sorted(rows, key=lambda row: (row.uploaded_at, row.id), reverse=True)
+    yield [row.id for row in expected]
+    db.query(FileUpload).delete()
+    db.commit()
+
+
+def test_without_parameters_keeps_the_list_shape(client, uploads):
+    response = client.get("/uploads/")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert isinstance(body, list)
+    assert [item["id"] for item in body] == uploads[:50]
+
+    rest = client.get("/uploads/", params={"cursor": response.headers["X-Next-Cursor"]}).json()
+    assert [item["id"] for item in rest["items"]] == uploads[50:]
+    assert rest["next_cursor"] is None
+
+
+def test_keyset_pages_cover_every_upload_once_in_order(client, uploads):
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 7, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/uploads/", params=params).json()
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == uploads
+
+
+def test_filters_combine_with_pagination(client, uploads, db):
+    params = {
+        "uploaded_by": 1,
+        "filename_prefix": "acme",
+        "uploaded_from": (BASE + datetime.timedelta(hours=2)).isoformat(),
+        "uploaded_to": (BASE + datetime.timedelta(hours=12)).isoformat(),
+        "limit": 2,
+    }
+    ids, cursor = [], None
+    while True:
+        page = client.get("/uploads/", params={**params, **({"cursor": cursor} if cursor else {})})
+        ids.extend(item["id"] for item in page.json()["items"])
+        cursor = page.json()["next_cursor"]
+        if cursor is None:
+            break
+
+    def matches(row):
+        return (
+            row.uploaded_by_user_id == 1
+            and row.filename_original.startswith("acme")
+            and BASE + datetime.timedelta(hours=2)
+            <= row.uploaded_at.replace(tzinfo=datetime.timezone.utc)
+            < BASE + datetime.timedelta(hours=12)
+        )
+
+    expected = [upload_id for upload_id in uploads if matches(db.get(FileUpload, upload_id))]
+    assert expected
+    assert ids == expected
+
+
+def test_invalid_cursor_is_rejected(client, uploads):
+    response = client.get("/uploads/", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
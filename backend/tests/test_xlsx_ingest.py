@@ -0,0 +1,103 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from app.config import settings
+from app.services import xlsx_ingest
+
+HEADER = ["Code", "Flag", "Amount", "Text"]
+ROWS = [
+    ["007", 1, 1, "a"],
+    ["008", None, 2, None],
+    ["009", 0, 3, "b"],
+    ["abc", True, 4.5, "c"],
+    ["010", True, None, "d"],
+    ["x", False, 6, "e"],
+    [None, None, None, None],
+    ["011", None, 7, "f"],
+]
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER)
+    for row in ROWS:
+        sheet.append(row)
+    path = tmp_path / "mixed.xlsx"
+    workbook.save(path)
+    return path
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 3, 100])
+def test_read_xlsx_matches_read_excel_across_blocks(workbook_path, monkeypatch, chunk_rows):
+    monkeypatch.setattr(settings, "stream_chunk_rows", chunk_rows)
+
+    result = xlsx_ingest.read_xlsx(workbook_path)
+
+    pd.testing.assert_frame_equal(result, pd.read_excel(workbook_path))
+
+
+def test_codes_keep_leading_zeros_when_later_block_has_text(workbook_path, monkeypatch):
+    monkeypatch.setattr(settings, "stream_chunk_rows", 3)
+
+    result = xlsx_ingest.read_xlsx(workbook_path, usecols=["Code"])
+
+    assert result["Code"].tolist()[:6] == ["007", "008", "009", "abc", "010", "x"]
+
+
+def test_bool_and_null_blocks_read_as_float(workbook_path, monkeypatch):
+    monkeypatch.setattr(settings, "stream_chunk_rows", 3)
+
+    flags = xlsx_ingest.read_xlsx(workbook_path)["Flag"]
+
+    assert flags.dtype == np.float64
+    np.testing.assert_array_equal(flags.to_numpy(), [1.0, np.nan, 0.0, 1.0, 1.0, 0.0, np.nan, np.nan])
+
+
+def test_unified_dtype_bool_with_nulls_is_float():
+    parts = [pd.Series([True, False]), pd.Series([np.nan, np.nan])]
+
+    assert xlsx_ingest._unified_dtype(parts) == np.float64
+
+
+class _Row(list):
+    """Fila con weakref, para contar cuántas siguen vivas."""
+
+    __hash__ = object.__hash__
+
+
+def test_at_most_one_block_of_rows_is_alive(tmp_path, monkeypatch):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER)
+    for index in range(30):
+        # Code mezcla números y textos entre bloques: fuerza la segunda pasada
+        sheet.append([f"{index:03d}" if index < 20 else f"x{index}", index % 2, index, "t"])
+    path = tmp_path / "long.xlsx"
+    workbook.save(path)
+
+    alive = weakref.WeakSet()
+    peak = []
+    original = xlsx_ingest._iter_sheet_rows
+
+    def tracked_rows(worksheet):
+        for row in original(worksheet):
+            row = _Row(row)
+            alive.add(row)
+            peak.append(len(alive))
+            yield row
+            del row
+
+    monkeypatch.setattr(xlsx_ingest, "_iter_sheet_rows", tracked_rows)
+    monkeypatch.setattr(settings, "stream_chunk_rows", 4)
+
+    result = xlsx_ingest.read_xlsx(path)
+
+    pd.testing.assert_frame_equal(result, pd.read_excel(path))
+    # la cabecera más un bloque
+    assert max(peak) <= 1 + 4
@@ -35,6 +35,7 @@ const Logo = () => (
 function App() {
   const [step, setStep] = useState<Step>('upload')
   const [fileId, setFileId] = useState<number | null>(null)
+  const [outputId, setOutputId] = useState<number | null>(null)
   const [fileName, setFileName] = useState<string>('')
   const [preview, setPreview] = useState<PreviewData | null>(null)
   const [selectedColumns, setSelectedColumns] = useState<string[]>([])
@@ -146,6 +147,17 @@ function App() {
 
       if (!res.ok) throw new Error('Error al procesar el archivo')
 
+      // El backend encola la limpieza: consultar el job hasta que termine
+      let job = await res.json()
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1000))
+        const jobRes = await fetch(`${API_BASE}/clean/clean/jobs/${job.job_id}`)
+        if (!jobRes.ok) throw new Error('Error al consultar el proceso')
+        job = await jobRes.json()
+      }
+      if (job.status !== 'succeeded') throw new Error(job.error || 'Error al procesar el archivo')
+
+      setOutputId(job.result.output_id)
       setStep('result')
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Error al procesar')
@@ -155,13 +167,14 @@ function App() {
   }
 
   const handleDownload = (variant: 'semicolon' | 'comma') => {
-    if (!fileId) return
-    window.open(`${API_BASE}/clean/clean/download?file_id=${fileId}&variant=${variant}`, '_blank')
+    if (!outputId) return
+    window.open(`${API_BASE}/clean/clean/download?output_id=${outputId}&variant=${variant}`, '_blank')
   }
 
   const handleReset = () => {
     setStep('upload')
     setFileId(null)
+    setOutputId(null)
     setFileName('')
     setPreview(null)
     setSelectedColumns([])